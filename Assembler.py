@@ -3,15 +3,27 @@
 My own proprietary low level language for my CPU Schön Core Alpha v.0.1.0
 Major non-user functions:
 
-inline(bool, line, filename, used_in_escape) -> Handles if statements
-getBinLine(lines, line, marks) -> Handles line indexing for assembled file
-gin(if_marks, ts) -> Handles if statement orders, able to handle nested if statements and if elif else statements
-find_marks(lines) -> Handles marks for absolute line ignorant jumping
+tokenize(lines) -> Line table of the source, every line split into its tokens once for all the passes
+getBinLine(tokens, line, marks) -> Handles line indexing for assembled file
+bin_line_index(tokens, marks) -> Binary line number of every source line, worked out in one pass
+find_marks(lines) -> Handles marks for absolute line ignorant jumping and nested if elif else statements, returns a SymbolTable
+SymbolTable() -> Marks, functions and if/elif/else chains of a source with the lines they start and end at, looked up by name or line
 get_var_order(MainType: int, FuncNum: int, BVL: list, BVI: list, ReorderDict: dict) -> Handles variable ordering for easier conversion between assembly and machine instruction
 
 Major user functions:
 
-Assemble(filename: str, dest_name: str) -> Function to call for assembly of filename to dest_name, dest_name automatically apllies ".schonexe" postfix
+Assemble(filename: str, dest_name: str, binary: bool = False) -> Function to call for assembly of filename to dest_name, dest_name automatically apllies ".schonexe" postfix,
+	with binary also to the packed dest_name.schonbin
+assemble_file(source_path: str, dest_path: str, binary: bool = False, cache: bool = None) -> Same as Assemble() with full paths instead of names in the folders of BaseCPUInfo,
+	only writing the files whose contents changed
+assemble_string(source: str) -> Assembles source code in memory, returns the list of integer words without touching any files
+assemble_lines(lines: list, cache: dict = None) -> Assembles a list of source lines in memory, returns the .schonexe1 lines
+
+Incremental assembly:
+
+The lines are split into chunks starting at every mark and def outside of blocks, see chunk_lines(), each keyed by a hash of its tokens
+Assemble() keeps the assembled lines of every chunk in (dest_name).schoncache, with the words holding addresses as relocations,
+and on the next assembly reuses the ones whose chunk is unchanged, only working out their addresses again
 
 """
 
@@ -22,10 +34,15 @@ import BaseCPUInfo
 
 import importlib as il 
 import math 
+import os
+import json
+import hashlib
 import BasicMath as bm
+import BinaryFormat				#Packed .schonbin executables
 import logging as lgn			#Logging for custom exceptions
 
 LOGLEVEL = lgn.INFO
+ASSEMBLYCACHE = True		#If True Assemble() reuses the chunks of (dest_name).schoncache that haven't changed
 
 lgn.basicConfig(format="%(levelname)s: %(message)s", level=lgn.DEBUG)
 lgn.getLogger().setLevel(LOGLEVEL)
@@ -36,6 +53,9 @@ bf = BaseCPUInfo.base_folder
 pf = BaseCPUInfo.programs_folder
 exeff = BaseCPUInfo.executable_files_folder
 
+cache_extension_name = ".schoncache"
+cache_format_version = 1
+
 class CustomException(Exception):
 	pass
 
@@ -136,22 +156,6 @@ wtf_excp = [
 	define,
 	"",
 ]
-#Function to manage if statements
-def inline( bool, line, filename, used_in_escape ):
-	fh = open( bf + pf + filename, "r" )
-	lines = fh.readlines()
-	fh.close()
-	if bool:
-		if used_in_escape == 1 and sei[1] in lines[line]:
-			return False
-		else:
-			return True
-	else:
-		if sei[0] in lines[line]:
-			return False
-		else:
-			return True
-
 def getFuncNum( func_var, bool=False ):
 	if bool == False:
 		m = 1
@@ -164,165 +168,165 @@ def getFuncNum( func_var, bool=False ):
 	else:
 		raise NameError
 
-def getBinLine( lines, line, marks ):
-	"""getBinLine(lines: list, line: int, marks: dict) -> Handles line indexing for assembled file
+def tokenize( lines ):
+	"""tokenize(lines: list) -> Line table of lines, every line split into its tokens
 	Parameters:
 	
-	lines: list of lines to handle
+	lines: list of source lines
+	
+	Returns: list of token lists, one per line
+	"""
+	return [ line.split() for line in lines ]
+
+blns = {	#Length of binary lines
+	function_names[1][0]: 2,	#rom
+	function_names[1][1]: 2,	#ram
+	function_names[1][5]: 2,	#io
+	function_names[3][0]: 0,	#mark
+	function_names[3][1]: 1,	#else
+	function_names[3][2]: 3,	#elif
+	sei[1]: 0,
+}
+
+def binLineLength( func_var, marks ):
+	#Binary lines a source line starting with func_var assembles to, jumps to marks taking 2
+	if func_var in blns:
+		return blns[func_var]
+	elif func_var in marks:
+		return 2
+	return 1
+
+def getBinLine( tokens, line, marks ):
+	"""getBinLine(tokens: list, line: int, marks: dict) -> Handles line indexing for assembled file, for many lines use bin_line_index()
+	Parameters:
+	
+	tokens: line table of tokenize() of the lines to handle
 	line: number of the line to compute to
 	marks: dict of marks and if marks to take into consideration
 	
 	Returns: int of the binary line number post assembled
 	"""
-	blns = {	#Length of binary lines
-		function_names[1][0]: 2,	#rom
-		function_names[1][1]: 2,	#ram
-		function_names[1][5]: 2,	#io
-		function_names[3][0]: 0,	#mark
-		function_names[3][1]: 1,	#else
-		function_names[3][2]: 3,	#elif
-		sei[1]: 0,
-	}
-	l = 0
 	bin_rel_ln = 0
-	for i in range( line ):
-		gblln = lines[l].split()
-		gblf = gblln.pop( 0 )
-		if gblf in blns:
-			bin_rel_ln += blns[gblf]
-		elif gblf in marks:
-			bin_rel_ln += 2
-		else:
-			bin_rel_ln += 1
-		l += 1
+	for l in range( line ):
+		bin_rel_ln += binLineLength( tokens[l][0], marks )
 	return bin_rel_ln
-	
-#Function to manage if statement order
-def gin( marks, ts, f=False ):
-	if f==False:
-		if len( marks[ts] ) == 0:
-			return str( ts )
-		else:
-			ts = int( ts )
-			for j, _ in enumerate( marks ):
-				t = marks[str(ts-j)]
-				if len( t ) == 0:
-					return str( ts-j )
-				else:
-					iint = 1
-					for i, _ in enumerate( t ):
-						if t[str(i)]["0"] == 0:
-							break
-						elif iint == len( t ):
-							return str( ts-j )
-						iint += 1
-	else:
-		if len( marks[ts] ) == 0:
-			return str( ts )
-		else:
-			ts = int( ts )
-			for j, _ in enumerate( marks ):
-				t = marks[str(ts-j)]
-				if len( t ) == 0:
-					return str( ts-j )
-				else:
-					iint = 1
-					for i, _ in enumerate( t ):
-						if t[str(i)]["0"] == 0:
-							break
-						elif iint == len( t ):
-							return str( ts-j )
-						iint += 1
-	return str( 0 )
 
-def find_marks(lines: list):
-	"""find_marks(lines: list) -> Handles marks for absolute line ignorant jumping
+def bin_line_index( tokens, marks ):
+	"""bin_line_index(tokens: list, marks: dict) -> Binary line number of every source line in one pass, index[line] being getBinLine(tokens, line, marks)
 	Parameters:
 	
-	lines: list of lines to handle
+	tokens: line table of tokenize() of the lines to handle
+	marks: dict of marks to take into consideration
 	
-	Format of marks found:
-	dict of line numbers where marks are found, where the key is the number of mark it is, and the value is the line number it's at
-	example: {"0": 5, "1": 9, "2": 15}
+	Returns: list of len(tokens) + 1 ints, the last being the length of the assembled file
+	"""
+	index = [0] * ( len( tokens ) + 1 )
+	bin_rel_ln = 0
+	for l, e in enumerate( tokens ):
+		index[l] = bin_rel_ln
+		bin_rel_ln += binLineLength( e[0], marks )
+	index[len( tokens )] = bin_rel_ln
+	return index
+	
+class Block:
+	"""Block(kind, line, name=None) -> An if/elif/else chain or a def found by find_marks()
+	
+	kind: function_names[0][0] for if chains, define for function definitions
+	line: line of the if or def
+	name: name of the function for defs
+	clauses: list of [line of the if, elif or else, line of the } closing its body] in order
+	close: line of the } ending the whole block
+	"""
+	
+	def __init__(self, kind, line, name=None):
+		self.kind = kind
+		self.line = line
+		self.name = name
+		self.clauses = [[line, None]]
+		self.close = None
+
+class SymbolTable:
+	"""SymbolTable() -> Marks, functions and block structure of a source, filled in one pass by find_marks()
+	
+	marks: dict of mark name to the line it's at
+	funcs: dict of function name to its def Block
+	blocks: list of every Block in the order they start
+	clause_at: dict of the line of every if, elif, else and def to (Block, index of its clause)
+	"""
+	
+	def __init__(self):
+		self.marks = dict()
+		self.funcs = dict()
+		self.blocks = []
+		self.clause_at = dict()
 	
-	Format of if statements found:
-	2d dict of information about if statements found, 
-	the outer dict contains all if statements, the inner dict is the specific if statement.
-	Information about the specific if statement is formatted by 
+	def add_block(self, block):
+		self.blocks.append(block)
+		self.clause_at[block.line] = (block, 0)
+		if block.kind == define:
+			self.funcs[block.name] = block
+	
+	def add_clause(self, block, line):
+		block.clauses.append([line, None])
+		self.clause_at[line] = (block, len(block.clauses) - 1)
+
+def find_marks(lines: list):
+	"""find_marks(lines: list) -> Handles marks for absolute line ignorant jumping and the block structure of if statements and functions, in one pass
+	Parameters:
 	
-	key "0" is the type of function found,
-	if it's:
-	0 it's a closing curly bracket
-	1 it's an else statement
-	2 it's an elif statement
+	lines: list of lines to handle
 	
-	key "1" is the line at which it's found
+	Every { opens the block of the if, elif, else or def on the line before it, or a bare block, on a stack,
+	and every } closes the block on top of it, an if chain going on if the next line is an else or elif
 	
-	Returns: dict if marks found, dict of if_marks found
+	Returns: SymbolTable of the lines
 	"""
-	marks = dict()
-	funcs = dict()
-	funcs_names = dict()
-	funcs
-	if_marks = dict()
-	vars = ["","","",""]
-	iml = []
+	symbols = SymbolTable()
+	stack = []			#Blocks of the open {, None for bare ones
+	pending = None		#Block whose { is expected on the next line
+	chain = None		#If chain whose } was just closed with an else or elif on the next line
 	for ln, line in enumerate(lines):
 		func = line.split()
-		# lgn.debug("FindMarks: func: %s" % (func))
+		if len( func ) == 0:
+			raise CustomException("Error: ln %s, Schön Assembly does not allow white-space lines." % (ln+1))
+		func_var = func[0]
+		var = func[1] if len( func ) > 1 else None
 		try:
-			func_snd = lines[ln+1].split()
-			func_snd_var = func_snd.pop( 0 )
-		except:
-			func_snd = None
+			func_snd_var = lines[ln+1].split()[0]
+		except IndexError:
 			func_snd_var = None
-		try:
-			func_var = func.pop( 0 )
-		except Exception:
-			raise CustomException("Error: ln %s, Schön Assembly does not allow white-space lines." % (ln+1))
-		for i in range( 3 ):
-			try:
-				vars[i] = func.pop( 0 )
-			except:
-				vars[i] = None
+		opens, pending = pending, None
+		continued, chain = chain, None
+		
 		if func_var == function_names[3][0]:
-			marks[vars[0]] = ln
+			symbols.marks[var] = ln
 		elif func_var == define:
 			lgn.debug("FindMarks: Found definition of function: %s" % (ln))
-			lgn.debug("index: %s" % (len(funcs)))
-			funcs[str(len(funcs))] = dict()
-			funcs_names[vars[0]] = {"index" : len(funcs)}
-		elif func_var == function_names[0][0] and func_snd_var != function_names[3][0] and func_snd_var != function_names[3][1] and vars[0] != "jump":
-			if_marks[ str( len( if_marks ) ) ] = dict()
-		elif func_var == function_names[3][1]:
-			ts = str( len( if_marks ) - 1 )
-			ts = gin( if_marks, ts )
-			tss = str( len( if_marks[ ts ] ) )
-			lines[ln] = function_names[3][1] + " # " + str( ts ) + " " + str( tss )
-			if_marks[ ts ][tss] = {'0': 1, '1': ln}
-		elif func_var == function_names[3][2]:
-			ts = str( len( if_marks ) - 1 )
-			ts = gin( if_marks, ts )
-			tss = str( len( if_marks[ ts ] ) )
-			if vars[1] != None:
-				lines[ln] = function_names[3][2] + " " + str( vars[0] ) + " " + str( vars[1] ) + " " + str( vars[2] ) + " # " + str( ts ) + " " + str( tss )
-			else:
-				lines[ln] = function_names[3][2] + " " + str( vars[0] ) + " # " + str( ts ) + " " + str( tss )
-			if_marks[ ts ][tss] = {'0': 2, '1': ln}
-		elif func_var == sei[1] and func_snd_var != function_names[3][1] and func_snd_var != function_names[3][2]:
-			ts = str( len( if_marks ) - 1 )
-			try:
-				ts = gin( if_marks, ts )
-				tss = str( len( if_marks[ ts ] ) )
-			except KeyError:
-				lgn.debug("Probably func:")
-				lgn.debug("funcs: %s" % (funcs))
-				ts = str( len( funcs ) - 1)
-				ts = gin( funcs, ts, True )
-				tss = str( len( funcs[ts] ) )
-				funcs[ ts ][tss] = {'0': 0, '1': ln}
-		ln += 1
-	return marks, if_marks, funcs, funcs_names
+			pending = Block( define, ln, var )
+			symbols.add_block( pending )
+		elif func_var == function_names[0][0] and func_snd_var != function_names[3][0] and func_snd_var != function_names[3][1] and var != jump_name:
+			pending = Block( function_names[0][0], ln )
+			symbols.add_block( pending )
+		elif func_var == function_names[3][1] or func_var == function_names[3][2]:
+			if continued == None:
+				raise CustomException("Error: ln %s, %s without if." % (ln+1, func_var))
+			symbols.add_clause( continued, ln )
+			pending = continued
+		elif func_var == sei[0]:
+			stack.append( opens )
+		elif func_var == sei[1]:
+			if len( stack ) == 0:
+				raise CustomException("Error: ln %s, %s without %s." % (ln+1, sei[1], sei[0]))
+			block = stack.pop()
+			if block != None:
+				block.clauses[-1][1] = ln
+				if block.kind == function_names[0][0] and (func_snd_var == function_names[3][1] or func_snd_var == function_names[3][2]):
+					chain = block
+				else:
+					block.close = ln
+	if len( stack ) > 0:
+		raise CustomException("Error: %s %s without %s." % (len( stack ), sei[0], sei[1]))
+	return symbols
 
 #Test For Binary Or Hexadicmal
 def tfbh( var ):
@@ -379,43 +383,185 @@ def init_bin_vars(bvi: list, bvl: list):
 	
 	return bin_vars
 
+def chunk_lines( tokens, marks ):
+	"""chunk_lines(tokens: list, marks: dict) -> Splits a line table into chunks starting at every mark and def outside of blocks
+	Parameters:
+	
+	tokens: line table of tokenize()
+	marks: dict of marks, which lines jump to a mark changing how they assemble
+	
+	The hash of a chunk covers its tokens, which of its lines jump to marks and the first token of the line after it,
+	everything the lines of the chunk assemble from besides addresses
+	
+	Returns: list of (first line, line after the last, hash) of the chunks in order
+	"""
+	starts = [0]
+	depth = 0
+	for ln, e in enumerate( tokens ):
+		if depth == 0 and ln > 0 and ( e[0] == function_names[3][0] or e[0] == define ):
+			starts.append( ln )
+		if e[0] == sei[0]:
+			depth += 1
+		elif e[0] == sei[1]:
+			depth -= 1
+	starts.append( len( tokens ) )
+	
+	chunks = []
+	for i in range( len( starts ) - 1 ):
+		start, end = starts[i], starts[i+1]
+		h = hashlib.sha1( ("%s %s\n" % (cache_format_version, bw)).encode() )
+		for e in tokens[start:end]:
+			h.update( (" ".join( e ) + "\n").encode() )
+		jumps = sorted( set( [e[0] for e in tokens[start:end] if e[0] in marks] ) )
+		h.update( ("\0" + " ".join( jumps ) + "\0").encode() )
+		if end < len( tokens ):
+			h.update( tokens[end][0].encode() )
+		chunks.append( (start, end, h.hexdigest()) )
+	return chunks
+
+def load_cache( file_path: str ):
+	"""load_cache(file_path: str) -> Chunks of the .schoncache file at file_path, an empty dict if it's missing or from another version
+	"""
+	try:
+		with open( file_path, "r" ) as fh:
+			data = json.load( fh )
+	except (OSError, ValueError):
+		return dict()
+	if not isinstance( data, dict ) or data.get( "version" ) != cache_format_version or data.get( "bit_width" ) != bw:
+		return dict()
+	return data.get( "chunks", dict() )
+
+def save_cache( file_path: str, cache: dict ):
+	"""save_cache(file_path: str, cache: dict) -> Writes the chunks of cache to the .schoncache file at file_path
+	"""
+	with open( file_path, "w" ) as fh:
+		json.dump( {"version": cache_format_version, "bit_width": bw, "chunks": cache}, fh )
+
 def _GetBinLine_(filename: str, ln: int):
 	fh = open(bf + pf + filename)
 	lines = fh.readlines()
 	fh.close()
 	
-	marks, if_marks = find_marks(lines)
+	symbols = find_marks(lines)
+	
+	return bin_line_index(tokenize(lines), symbols.marks)[ln]
+
+def write_if_changed( file_path: str, data ):
+	"""write_if_changed(file_path: str, data) -> Writes data, str or bytes, to file_path unless the file already holds exactly that, keeping its modification time
 	
-	return getBinLine(lines, ln, marks)
+	Returns: True if the file was written
+	"""
+	if isinstance( data, str ):
+		data = data.encode()
+	if os.path.isfile( file_path ) and os.path.getsize( file_path ) == len( data ):
+		fh = open( file_path, "rb" )
+		old = fh.read()
+		fh.close()
+		if old == data:
+			return False
+	fh = open( file_path, "wb" )
+	fh.write( data )
+	fh.close()
+	return True
 
-def Assemble( filename: str, dest_name: str ):
-	"""Assemble(filename: str, dest_name: str) -> Function to call for assembly of filename to dest_name, dest_name automatically apllies ".schonexe" postfix
+def Assemble( filename: str, dest_name: str, binary: bool = False, cache: bool = None ):
+	"""Assemble(filename: str, dest_name: str, binary: bool = False, cache: bool = None) -> Function to call for assembly of filename to dest_name, dest_name automatically apllies ".schonexe" postfix
 	Parameters:
 	
 	filename: name of file with path relative to the folder of the file unless specified so
 	dest_name: name of file for destination, ".schonexe" postfix is automatically applied
+	binary: if True also writes the packed (dest_name).schonbin file, see BinaryFormat
+	cache: if True reuses the unchanged chunks of (dest_name).schoncache and writes the chunks of this assembly there, ASSEMBLYCACHE if None
 	
 	Returns: file with name (dest_name).schonexe
 	"""
 	
+	return assemble_file( bf + pf + filename, bf + exeff + dest_name + ".schonexe1", binary, cache )
+
+def assemble_file( source_path: str, dest_path: str, binary: bool = False, cache: bool = None ):
+	"""assemble_file(source_path: str, dest_path: str, binary: bool = False, cache: bool = None) -> Assembly of the file at source_path to the .schonexe1 file at dest_path
+	Parameters:
+	
+	source_path: full path of the file to assemble
+	dest_path: full path of the .schonexe1 file, the .schonbin and .schoncache files are put next to it with the same name
+	binary: if True also writes the packed .schonbin file, see BinaryFormat
+	cache: if True reuses the unchanged chunks of the .schoncache file and writes the chunks of this assembly there, ASSEMBLYCACHE if None
+	
+	Returns: int return state, 1 if assembled and -1 if not, files already holding the assembled output aren't written again
+	"""
+	
 	lgn.getLogger().setLevel(LOGLEVEL)
 	
-	#Open and read file to assemble
-	fh = open( bf + pf + filename )
+	#Open and read file to assemble, the only time it's read
+	fh = open( source_path )
 	lines = fh.readlines()
 	fh.close()
-	fh = open( bf + exeff + dest_name + ".schonexe1", "w+" )
+	
+	lgn.info("%s%s.py: Schön Core Alpha v.0.1.0 Assembler." % (bf, __name__))
+	lgn.info("Assembling: %s" % (source_path))
+	
+	if cache == None:
+		cache = ASSEMBLYCACHE
+	dest_root = os.path.splitext( dest_path )[0]
+	cache_path = dest_root + cache_extension_name
+	chunks = load_cache( cache_path ) if cache else None
+	
+	bin_lines = assemble_lines( lines, chunks )
+	if bin_lines == -1:
+		return -1
+	if cache:
+		save_cache( cache_path, chunks )
+	
+	write_if_changed( dest_path, "".join( [e + "\n" for e in bin_lines] ) )
+	if binary:
+		write_if_changed( dest_root + BinaryFormat.file_extension_name, BinaryFormat.pack_words( [BinaryFormat.text_word( e ) for e in bin_lines] ) )
+	lgn.info("Assembler: Finished assembling.")
+	return 1
+
+def assemble_string( source: str ):
+	"""assemble_string(source: str) -> Assembles source code in memory, without reading or writing any files
+	Parameters:
+	
+	source: Schön Assembly source code, lines separated by newlines
+	
+	Returns: list of integer words, the same as the .schonbin file Assemble() writes
+	"""
+	
+	lgn.getLogger().setLevel(LOGLEVEL)
+	
+	bin_lines = assemble_lines( source.splitlines( True ) )
+	if bin_lines == -1:
+		lgn.critical("Assembler: Error: Source couldn't be assembled.")
+		raise CustomException("Error: Source couldn't be assembled.")
+	return [BinaryFormat.text_word( e ) for e in bin_lines]
+
+def assemble_lines( lines: list, cache: dict = None ):
+	"""assemble_lines(lines: list, cache: dict = None) -> Assembles source lines in memory, every pass working on one line table of them
+	Parameters:
+	
+	lines: list of source lines, rewritten in place where the passes rewrite them
+	cache: if given dict of chunk hash to the chunk's assembled lines and relocations, as loaded by load_cache(),
+		   unchanged chunks are taken from it, and once assembled it only holds the chunks of lines
+	
+	Returns: list of the .schonexe1 lines without newlines, or -1 if a line couldn't be assembled
+	"""
+	
+	bin_lines = []	#Assembled lines of the .schonexe1 file
 	
 	#Basic variable initiation
 	ln_n = 0		#Line number
 	bin_ln = 0		#Binary line number
-	il = 0			#If length
-	ignore_ln = []	#Lines to ignore
-	marks, if_marks, funcs, funcs_names = find_marks( lines )
-	eofln = 0		#End Of File Line
+	symbols = find_marks( lines )	#Marks and blocks, looked up by name and line
+	marks = symbols.marks
+	tokens = tokenize( lines )	#Line table of every pass from here on
+	bin_index = bin_line_index( tokens, marks )	#Binary line number of every source line
 	
-	lgn.info("%s%s.py: Schön Core Alpha v.0.1.0 Assembler." % (bf, __name__))
-	lgn.info("Assembling: %s" % (bf + pf + filename))
+	#Chunks starting at each line, each assembled chunk saved as [lines, relocations],
+	#a relocation being [index of the line in the chunk, "binary" or "index" relative to the chunk's start, or "mark", offset or mark name]
+	chunk_at = dict( [(e[0], e) for e in chunk_lines( tokens, marks )] ) if cache != None else dict()
+	new_cache = dict()
+	chunk = None	#[hash, index of its first line in bin_lines, bin_ln at its start, its first source line, relocations, relocatable]
+	reused = 0
 	
 	ReorderDict = {											#Dict for reordering variables
 	
@@ -447,21 +593,36 @@ def Assemble( filename: str, dest_name: str ):
 	_StaticBinVarIndex_ = [ 5, 9, 11, 13, 18, 20, 25, 27 ]
 	
 	#Main loop for assembling
-	for i in lines:
-		if eof in i:
-			break 
-		eofln += 1
-		lgn.debug( "EOL: " + str( eofln ) )
-		lgn.debug( "IF_MARKS: " )
-		lgn.debug( if_marks )
-	eofbln = getBinLine( lines, eofln, marks )
 	while ln_n < len( lines ):
 		lgn.debug("ln_n: %s" % (str(ln_n)))
-		line = lines[ln_n].split()
+		if ln_n in chunk_at:
+			if chunk != None and chunk[5]:
+				new_cache[chunk[0]] = [bin_lines[chunk[1]:], chunk[4]]
+			start, end, key = chunk_at[ln_n]
+			chunk = [key, len( bin_lines ), bin_ln, start, [], True]
+			if key in cache:
+				#Unchanged chunk, only its addresses are worked out again
+				cached_lines, relocations = cache[key]
+				cached_lines = list( cached_lines )
+				for i, kind, offset in relocations:
+					if kind == "binary":
+						cached_lines[i] = bm.blts( bm.dtb( bin_ln + offset ) )
+					elif kind == "index":
+						cached_lines[i] = bm.blts( bm.dtb( bin_index[start] + offset ) )
+					else:
+						cached_lines[i] = bm.blts( bm.dtb( bin_index[marks[offset]] ) )
+				bin_lines += cached_lines
+				bin_ln += len( cached_lines )
+				new_cache[key] = cache[key]
+				chunk = None
+				reused += 1
+				ln_n = end
+				continue
+		line_relocations = dict()	#Index in nextLines -> (kind, address) of the words holding addresses
+		line = list( tokens[ln_n] )
 		func_var = line.pop( 0 )
 		try:
-			sline = lines[ln_n+1].split()
-			sfunc_var = sline.pop( 0 )
+			sfunc_var = tokens[ln_n+1][0]
 		except IndexError:
 			sfunc_var = None
 		full_binary_function = [0 for i in range( bw )]
@@ -471,8 +632,10 @@ def Assemble( filename: str, dest_name: str ):
 		tt = gvt( t )
 		if tt == "bin":
 			lines[ln_n] = str( bm.btd([int(i) for i in t[2:]]) )
+			tokens[ln_n] = lines[ln_n].split()
 		elif tt == "hex":
 			lines[ln_n] = str( bm.htd( t[2:] ) )
+			tokens[ln_n] = lines[ln_n].split()
 		elif tt == "int":
 			pass
 		else:
@@ -518,64 +681,28 @@ def Assemble( filename: str, dest_name: str ):
 			if vars[0] == jump_name:	#JUMP
 				full_binary_function[5] = 1
 				try:
-					nextLines[0] = bm.dtb( getBinLine( lines, int( lines[ln_n+1] ), marks ) )
+					nextLines[0] = bm.dtb( bin_index[int( lines[ln_n+1] )] )
 				except:
 					lgn.critical("Jump: Error: ln %s: Invalid jump counter" % (ln_n + 1))
 					raise Exception
 				ln_n += 1
+				if chunk != None:
+					chunk[5] = False		#Jumps to a source line number aren't relocatable
 			else:									#IF
-				il += 1
-				rel_ln = 1
-				used_in_escape = 1
-				
-				try:
-					temp_unused_var = lines[ln_n + rel_ln]
-				except Exception:
+				clause = symbols.clause_at.get( ln_n )
+				if clause == None or clause[0].clauses[0][1] == None:
 					lgn.critical( "Error: ln %s: Expected if inscape, got none" % (str( ln_n + 1 )) )
 					return -1
-				rel_rel_ln = 1
+				block = clause[0]
 				
-				#If binary lines 
-				iblns = {
-					function_names[1][0]: 2,
-					function_names[1][1]: 2,
-					function_names[1][5]: 2,
-					function_names[3][0]: 0
-				}
-				while inline( True, ln_n + 1 + rel_rel_ln, filename, used_in_escape ):
-					try:
-						temp_unused_var = lines[ln_n + rel_ln + rel_rel_ln].split()
-						temp_func = temp_unused_var.pop( 0 )
-						try:
-							temp_temp_unused_var = lines[ln_n + rel_ln + rel_rel_ln + 2].split()
-							temp_temp_func = temp_temp_unused_var.pop( 0 )
-						except:
-							temp_temp_func = ""
-						if temp_func in iblns:
-							bin_rel_ln += iblns[temp_func]
-						elif temp_func == sei[0]:
-							used_in_escape += 1
-							bin_rel_ln += 1
-						elif temp_func == sei[1] and used_in_escape > 1:
-							used_in_escape -= 1
-						elif temp_func in marks:
-							bin_rel_ln += 2
-						else:
-							bin_rel_ln += 1
-						rel_rel_ln += 1
-						try:
-							temp_unused_var = lines[ln_n + 1 + rel_rel_ln]
-						except:
-							lgn.critical("If: Error: ln: %s: Expected if escape, got none, 0" % (ln_n + 1))
-							return -1
-					except:
-						lgn.critical("If: Error: ln: %s: Expected if escape, got none, 1" % (ln_n + 1))
-						return -1
-				if temp_temp_func == function_names[3][1] or temp_temp_func == function_names[3][2]:
+				#Body from the line after its { up to its }, and the jump of an else or elif after it
+				bin_rel_ln = bin_index[block.clauses[0][1]] - bin_index[ln_n + 2]
+				if len( block.clauses ) > 1:
 					bin_rel_ln += 2
 				
 				full_binary_function[0:4] = [0,0,1,0]
 				nextLines[0] = bm.dtb( bin_ln + 2 + bin_rel_ln )
+				line_relocations[0] = ("binary", bin_ln + 2 + bin_rel_ln)
 				
 				#Get reference binary variable lenght and indexes
 				bvl = _StaticBinVarLength_.copy()
@@ -603,7 +730,7 @@ def Assemble( filename: str, dest_name: str ):
 				for i in range(function_var_amount[MainType][function_names_index]):
 					try:
 						temp_type = function_params[MainType][function_names_index][i][0]
-						if temp_func == "pass":
+						if temp_type == "pass":
 							break
 					except Exception:
 						break
@@ -620,8 +747,9 @@ def Assemble( filename: str, dest_name: str ):
 			full_binary_function[0:4] = [0,0,1,0]
 			full_binary_function[5:9] = [1,1,1,0]
 			full_binary_function[9:11] = [1,0]
-			bin_rel_ln = getBinLine( lines, marks[func_var], marks )
+			bin_rel_ln = bin_index[marks[func_var]]
 			nextLines[0] = bm.dtb( bin_rel_ln )
+			line_relocations[0] = ("mark", func_var)
 		elif func_var == function_names[1][1]:
 			full_binary_function[0:4] = [1,0,0,0]
 			if vars[0] == "to":
@@ -641,50 +769,38 @@ def Assemble( filename: str, dest_name: str ):
 			full_binary_function[13:19] = bm.dtb(int(vars[3]), 5)
 			nextLines[0] = bm.dtb(int(vars[1]))
 		elif func_var == function_names[3][1]:
-			# print("ELSE:")
-			full_binary_function[5] = 1
-			nextLines[0] = None
-			t = if_marks[ str( il - 1 ) ]
-			# print("t: %s" % (t))
-			for i, _ in enumerate(t):
-				if t[str(i)]["0"] == 0:
-					# print("ln: %s" % (t[str(i)]["1"] ) )
-					nextLines[0] = bm.dtb( getBinLine( lines, t[str(i)]["1"], marks ) )
-					break
-			if nextLines[0] == None:
+			#Jump past the end of the chain, ending the clause before
+			block, clause = symbols.clause_at[ln_n]
+			if block.close == None:
 				raise CustomException("Error: ln %s: if statement was not encoded right, 0" % (ln_n + 1))
+			full_binary_function[0:4] = [0,0,1,0]
+			full_binary_function[5:9] = [1,1,1,0]
+			full_binary_function[9:11] = [1,0]
+			nextLines[0] = bm.dtb( bin_index[block.close] )
+			line_relocations[0] = ("index", bin_index[block.close])
 		elif func_var == function_names[3][2]:
-			full_binary_function = [0 for i in range( bw )]
-			t_bin_vars[0] = bm.dtb( getParIndex( [0,0,0],vars[0] ) + 1 )
-			nextLines[0] = None
+			#Jump past the end of the chain, ending the clause before, then skip the body unless the condition holds
+			block, clause = symbols.clause_at[ln_n]
+			if block.close == None or block.clauses[clause][1] == None:
+				raise CustomException("Error: ln %s: if statement was not encoded right, 1" % (ln_n + 1))
+			full_binary_function[0:4] = [0,0,1,0]
+			full_binary_function[5:9] = [1,1,1,0]
+			full_binary_function[9:11] = [1,0]
+			nextLines[0] = bm.dtb( bin_index[block.close] )
+			line_relocations[0] = ("index", bin_index[block.close])
 			nextLines[1] = [0 for i in range( bw )]
-			for i in range( 4 ):
-				nextLines[1][i+5] = t_bin_vars[0][i]
-			nextLines[2] = None
-			t = if_marks[ str( il - 1 ) ]
-			for i in range( len( t ) ):
-				if t[str(i)]["0"]  == 0:
-					nextLines[0] = bm.dtb( getBinLine( lines, t[str(i)]["1"], marks ) )
-					break
-			for i in range( len( t ) ):
-				if t[str(i)]["1"]  == ln_n:
-					tn = i
-					break
+			nextLines[1][0:4] = [0,0,1,0]
 			try:
-				tnn = t[str(tn+1)]["0"]
-			except:
-				tnn = None
-			if tnn == None:
-				nextLines[2] = nextLines[0]
+				nextLines[1][5:9] = bm.dtb( getParIndex( [0,0,0], vars[0] ), 4 )
+			except ValueError:
+				raise CustomException("Error: ln %s: Invalid elif condition %s" % (ln_n + 1, vars[0]))
+			#The next elif or else past its jump, or the end of the chain
+			if clause + 1 < len( block.clauses ):
+				nextLines[2] = bm.dtb( bin_index[block.clauses[clause][1]] + 2 )
+				line_relocations[2] = ("index", bin_index[block.clauses[clause][1]] + 2)
 			else:
-				if tnn == 0:
-					nextLines[2] = bm.dtb( getBinLine( lines, t[str(tn+1)]["1"], marks ) )
-				elif tnn == 1 or tnn == 2:
-					nextLines[2] = bm.dtb( getBinLine( lines, t[str(tn+1)]["1"] + 2, marks ) )
-			if nextLines[0] == None:
-				raise CustomException("Error: ln %s: if statement was not encoded right, 1" % (ln_n + 1))
-		elif func_var == sei[1] and sfunc_var != function_names[3][1] and sfunc_var != function_names[3][2] and sfunc_var in funcs_names:
-			il -= 1
+				nextLines[2] = bm.dtb( bin_index[block.close] )
+				line_relocations[2] = ("index", bin_index[block.close])
 		elif func_var in sei or func_var == function_names[3][0] or func_var == "":
 			pass
 		else:
@@ -780,13 +896,24 @@ def Assemble( filename: str, dest_name: str ):
 					for j, _ in enumerate( e ):
 						full_binary_function[bvi[i] + j] = e[j]
 		if func_var not in wtf_excp:
-			fh.write( bm.blts( full_binary_function ) + "\n" )
+			bin_lines.append( bm.blts( full_binary_function ) )
 			bin_ln += 1
 			for i, _ in enumerate( nextLines ):
 				if isinstance( nextLines[i], list ):
-					fh.write( bm.blts( nextLines[i] ) + "\n" )
+					if chunk != None and i in line_relocations:
+						kind, address = line_relocations[i]
+						if kind == "binary":
+							address -= chunk[2]
+						elif kind == "index":
+							address -= bin_index[chunk[3]]
+						chunk[4].append( [len( bin_lines ) - chunk[1], kind, address] )
+					bin_lines.append( bm.blts( nextLines[i] ) )
 					bin_ln += 1
 		ln_n += 1
-	fh.close()
-	lgn.info("Assembler: Finished assembling.")
-	return 1
\ No newline at end of file
+	if chunk != None and chunk[5]:
+		new_cache[chunk[0]] = [bin_lines[chunk[1]:], chunk[4]]
+	if cache != None:
+		cache.clear()
+		cache.update( new_cache )
+		lgn.info("Assembler: Reused %s of %s chunks." % (reused, len( chunk_at )))
+	return bin_lines
\ No newline at end of file
@@ -0,0 +1,307 @@
+"""BatchRunner.py -> Runs many .schonexe1 programs across a pool of worker processes
+
+Every program runs on its own Emulator.SchonCore in a worker process, with its GPIO output captured
+instead of printed, and the results are returned in the order the programs were given
+
+Major functions:
+
+run_program(path, inputs=(), gui=False) -> Runs one program and returns its ProgramResult
+run_many(paths, workers=None, inputs=None, gui=False) -> Runs every program in paths on a process pool, returns a list of ProgramResult
+run_forked(path, input_vectors, workers=None, gui=False, warm_up=False) -> Runs one program once per input vector, forking each run from the state before its first GPIO input
+run_lockstep(path, input_vectors, gui=False) -> Runs one program once per input vector on a Lockstep.LockstepCore, needs NumPy
+All of them take max_instructions and max_wall_time, stopping runaway programs with exit code 3
+
+Command line:
+
+python BatchRunner.py [-w WORKERS] [--gui MODE] [--json] [--max-instructions N] [--timeout SECONDS] [--inputs FILE [--lockstep]] program [program ...]
+program being a path to a .schonexe1 or .schonbin file or the name of one in the executable files folder,
+with --inputs a single program is run once per line of FILE, each line being the GPIO inputs separated by spaces,
+through the fork server or with --lockstep on one LockstepCore
+"""
+
+#Import libraries
+import Emulator
+import GPIO
+import os
+import sys
+import time
+import json
+import pickle
+import tempfile
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+#Result of running one program
+#path: program run, exit_code: 1 for exit signal, -1 for error, 3 for stopped by a limit, output: list of GPIO output lines,
+#instructions: amount of instructions run, wall_time: seconds spent running, error: exception message, what stopped it or None
+ProgramResult = namedtuple("ProgramResult", ["path", "exit_code", "output", "instructions", "wall_time", "error"])
+
+def program_path(name):
+	"""program_path(name) -> Full path of a program given either as a path or as a name in the executable files folder
+	"""
+	if os.path.isfile(name):
+		return name
+	return Emulator.executable_path(name)
+
+def run_program(path, inputs=(), gui=False, cpu=None, output=None, max_instructions=None, max_wall_time=None):
+	"""run_program(path, inputs=(), gui=False, cpu=None, output=None, max_instructions=None, max_wall_time=None) -> Runs one program on a new SchonCore
+	Parameters:
+
+	path: path of the .schonexe1 file or name of it in the executable files folder
+	inputs: numbers returned by GPIO input in order, reading past the end is an error
+	gui: output format, same as in Emulator.run()
+	cpu: SchonCore with the program already loaded to resume instead, its output captured in the list output
+	max_instructions/max_wall_time: limits of the run, see Emulator.run()
+
+	Returns: ProgramResult
+	"""
+	if output == None:
+		output = []
+	gpio = GPIO.Channels(GPIO.IterableInput(inputs), GPIO.CallbackGPIO(output_function=output.append))
+
+	error = None
+	start_time = time.perf_counter()
+	try:
+		if cpu == None:
+			cpu = Emulator.SchonCore(gpio=gpio)
+			exit_code = cpu.run_file(program_path(path), gui, max_instructions=max_instructions, max_wall_time=max_wall_time)
+		else:
+			cpu.gpio = gpio
+			exit_code = cpu.resume(gui, max_instructions=max_instructions, max_wall_time=max_wall_time)
+	except Exception as e:
+		exit_code = -1
+		error = "%s: %s" % (type(e).__name__, e)
+	if exit_code == 3:
+		error = "Stopped by %s at %s" % (cpu.run_stats.reason.name, cpu.run_stats.pc)
+	wall_time = time.perf_counter() - start_time
+
+	return ProgramResult(path, exit_code, output, cpu.instruction_count, wall_time, error)
+
+def _run_job(job):
+	return run_program(*job)
+
+def run_many(paths, workers=None, inputs=None, gui=False, max_instructions=None, max_wall_time=None):
+	"""run_many(paths, workers=None, inputs=None, gui=False, max_instructions=None, max_wall_time=None) -> Runs every program in paths on a process pool
+	Parameters:
+
+	paths: list of paths of .schonexe1 files or names of them in the executable files folder
+	workers: amount of worker processes, os.cpu_count() if None
+	inputs: list of GPIO inputs for each program, none if None
+	gui: output format, same as in Emulator.run()
+	max_instructions/max_wall_time: limits of each run, see Emulator.run()
+
+	Returns: list of ProgramResult in the same order as paths
+	"""
+	paths = list(paths)
+	if inputs == None:
+		inputs = [()] * len(paths)
+	jobs = [(path, tuple(inputs[i]), gui, None, None, max_instructions, max_wall_time) for i, path in enumerate(paths)]
+	if workers == None:
+		workers = os.cpu_count() or 1
+	workers = max(1, min(workers, len(jobs)))
+
+	if workers == 1:
+		return [_run_job(job) for job in jobs]
+
+	#Several programs per task keeps the pool's overhead low for short programs
+	chunksize = max(1, len(jobs) // (workers * 4))
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		return list(executor.map(_run_job, jobs, chunksize=chunksize))
+
+def run_forked(path, input_vectors, workers=None, gui=False, max_instructions=None, max_wall_time=None, warm_up=False):
+	"""run_forked(path, input_vectors, workers=None, gui=False, max_instructions=None, max_wall_time=None, warm_up=False) -> Runs one program once per input vector through a fork server
+	The ROM is loaded and decoded once and run up to its first GPIO input, then a child process is forked per input vector,
+	sharing the loaded state and translated blocks copy-on-write, and its result is sent back over a pipe
+	A child that dies without sending its result gives a result with exit code -1 for its vector
+	Parameters:
+
+	path: path of the .schonexe1 or .schonbin file or name of it in the executable files folder
+	input_vectors: list of GPIO inputs, one list per run
+	workers: most children running at once, os.cpu_count() if None
+	gui: output format, same as in Emulator.run()
+	max_instructions/max_wall_time: limits of each run after the shared start, see Emulator.run()
+	warm_up: if True the first vector is run in the server before forking, so the children inherit the blocks it translated,
+		paying off for many vectors running mostly the same code but running that vector on its own first
+
+	Returns: list of ProgramResult in the same order as input_vectors, wall_time and instructions including the shared start
+	"""
+	input_vectors = [tuple(e) for e in input_vectors]
+	if len(input_vectors) == 0:
+		return []
+	if not hasattr(os, "fork"):
+		return run_many([path] * len(input_vectors), workers, input_vectors, gui, max_instructions, max_wall_time)
+	if workers == None:
+		workers = os.cpu_count() or 1
+
+	#Load once and run up to the first input
+	output = []
+	cpu = Emulator.SchonCore(output_function=output.append)
+	start_time = time.perf_counter()
+	try:
+		cpu.load_rom_words(Emulator.read_program(program_path(path)))
+		cpu.cls(1, 1, 1)
+		q = cpu.run_until_input(gui, max_instructions)
+	except Exception as e:
+		error = "%s: %s" % (type(e).__name__, e)
+		return [ProgramResult(path, -1, list(output), cpu.instruction_count, time.perf_counter() - start_time, error) for _ in input_vectors]
+	if q != 0:
+		#Exited or stopped without reading input, every vector gives the same result
+		error = None
+		if q == 3:
+			error = "Stopped by MAXINSTRUCTIONS before the first input"
+		elif q == -1:
+			error = "Failed at %s before the first input" % (cpu.regs[Emulator.RegType.PROTECTED.value][Emulator.ProtReg.PROGRAMCOUNTER.value])
+		return [ProgramResult(path, q, list(output), cpu.instruction_count, time.perf_counter() - start_time, error) for _ in input_vectors]
+	shared_time = time.perf_counter() - start_time
+
+	results = [None] * len(input_vectors)
+	if warm_up:
+		#The first vector runs in the server from a snapshot, so the children inherit the blocks it translated
+		with tempfile.TemporaryDirectory() as folder:
+			state_path = os.path.join(folder, "fork.state")
+			cpu.save_state(state_path)
+			results[0] = run_program(path, input_vectors[0], gui, cpu, list(output), max_instructions, max_wall_time)
+			results[0] = results[0]._replace(wall_time=results[0].wall_time + shared_time)
+			cpu.translate_visited_blocks()
+			block_cache, block_hits = cpu.block_cache, cpu.block_hits
+			cpu.load_state(state_path)
+			cpu.block_cache, cpu.block_hits = block_cache, block_hits
+
+	running = []	#(index, pid, read end of pipe)
+	sys.stdout.flush()
+	sys.stderr.flush()
+	try:
+		for index, inputs in enumerate(input_vectors):
+			if results[index] != None:
+				continue
+			if len(running) >= workers:
+				child = running.pop(0)
+				results[child[0]] = _collect_child(path, *child)
+			read_fd, write_fd = os.pipe()
+			pid = os.fork()
+			if pid == 0:
+				os.close(read_fd)
+				_run_child(cpu, output, path, inputs, gui, shared_time, write_fd, max_instructions, max_wall_time)
+			os.close(write_fd)
+			running.append((index, pid, read_fd))
+		while len(running) > 0:
+			child = running.pop(0)
+			results[child[0]] = _collect_child(path, *child)
+	finally:
+		#Only left if collecting failed, the children are still reaped
+		for index, pid, read_fd in running:
+			os.close(read_fd)
+			os.waitpid(pid, 0)
+	return results
+
+def run_lockstep(path, input_vectors, gui=False, max_instructions=None, max_wall_time=None):
+	"""run_lockstep(path, input_vectors, gui=False, max_instructions=None, max_wall_time=None) -> Runs one program once per input vector, every run a lane of one Lockstep.LockstepCore
+	Parameters:
+
+	path: path of the .schonexe1 or .schonbin file or name of it in the executable files folder
+	input_vectors: list of GPIO inputs, one list per run
+	gui: output format, same as in Emulator.run()
+	max_instructions: if given each lane stops once it has run this many instructions, with exit code 3
+	max_wall_time: if given every lane still running stops once this many seconds have passed, with exit code 3
+
+	Returns: list of ProgramResult in the same order as input_vectors, wall_time being the time of all the runs together
+	"""
+	import Lockstep		#Needs NumPy
+	input_vectors = [tuple(e) for e in input_vectors]
+	if len(input_vectors) == 0:
+		return []
+	cpu = Lockstep.LockstepCore(len(input_vectors))
+	start_time = time.perf_counter()
+	try:
+		cpu.run_file(program_path(path), input_vectors, gui, max_instructions, max_wall_time)
+	except Exception as e:
+		error = "%s: %s" % (type(e).__name__, e)
+		return [ProgramResult(path, -1, [], 0, time.perf_counter() - start_time, error) for _ in input_vectors]
+	wall_time = time.perf_counter() - start_time
+	outputs = cpu.output_lines(gui)
+	pcs = cpu.regs[Emulator.RegType.PROTECTED.value][Emulator.ProtReg.PROGRAMCOUNTER.value]
+
+	results = []
+	for i in range(len(input_vectors)):
+		exit_code, error = int(cpu.exit_codes[i]), cpu.errors.get(i)
+		if exit_code == 0:
+			#Still running, stopped by a limit
+			reason = "MAXINSTRUCTIONS" if max_instructions != None and cpu.instruction_count[i] >= max_instructions else "MAXWALLTIME"
+			exit_code, error = 3, "Stopped by %s at %s" % (reason, int(pcs[i]))
+		results.append(ProgramResult(path, exit_code, outputs[i], int(cpu.instruction_count[i]), wall_time, error))
+	return results
+
+def _run_child(cpu, output, path, inputs, gui, shared_time, write_fd, max_instructions=None, max_wall_time=None):
+	#Runs in a forked child and never returns, exiting with 1 if its result couldn't be sent
+	exit_status = 1
+	try:
+		result = run_program(path, inputs, gui, cpu, output, max_instructions, max_wall_time)
+		result = result._replace(wall_time=result.wall_time + shared_time)
+		with os.fdopen(write_fd, "wb") as fh:
+			pickle.dump(tuple(result), fh)
+		exit_status = 0
+	finally:
+		os._exit(exit_status)
+
+def _collect_child(path, index, pid, read_fd):
+	#Reads the result of a forked child and reaps it, a child that died without sending its result gives an error result
+	try:
+		with os.fdopen(read_fd, "rb") as fh:
+			data = fh.read()
+	finally:
+		_, status = os.waitpid(pid, 0)
+	try:
+		return ProgramResult(*pickle.loads(data))
+	except Exception as e:
+		if os.WIFSIGNALED(status):
+			error = "Child killed by signal %s without a result" % (os.WTERMSIG(status))
+		elif len(data) == 0:
+			error = "Child exited with status %s without a result" % (os.WEXITSTATUS(status))
+		else:
+			error = "Unreadable result from child, %s: %s" % (type(e).__name__, e)
+		return ProgramResult(path, -1, [], 0, 0.0, error)
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Run many .schonexe1 programs in parallel.")
+	parser.add_argument("programs", nargs="+", help="paths of .schonexe1 files or names in the executable files folder")
+	parser.add_argument("-w", "--workers", type=int, default=None, help="amount of worker processes, default is the amount of cores")
+	parser.add_argument("--gui", default=False, help="output format, same as gui in Emulator.run()")
+	parser.add_argument("--json", action="store_true", help="print the results as JSON")
+	parser.add_argument("--inputs", default=None, help="file of GPIO input vectors, one per line, to run a single program with through the fork server")
+	parser.add_argument("--max-instructions", type=int, default=None, help="stop each program after this many instructions")
+	parser.add_argument("--timeout", type=float, default=None, help="stop each program after this many seconds")
+	parser.add_argument("--lockstep", action="store_true", help="run the input vectors in lockstep on one LockstepCore instead of forking, needs NumPy")
+	args = parser.parse_args(argv)
+
+	start_time = time.perf_counter()
+	if args.inputs != None:
+		if len(args.programs) != 1:
+			parser.error("--inputs takes a single program")
+		with open(args.inputs, "r") as fh:
+			input_vectors = [[int(e) for e in line.split()] for line in fh if line.strip() != ""]
+		if args.lockstep:
+			results = run_lockstep(args.programs[0], input_vectors, args.gui, args.max_instructions, args.timeout)
+		else:
+			results = run_forked(args.programs[0], input_vectors, args.workers, args.gui, args.max_instructions, args.timeout)
+	else:
+		if args.lockstep:
+			parser.error("--lockstep takes --inputs")
+		results = run_many(args.programs, args.workers, gui=args.gui, max_instructions=args.max_instructions, max_wall_time=args.timeout)
+	wall_time = time.perf_counter() - start_time
+
+	if args.json:
+		print(json.dumps([r._asdict() for r in results], indent=2))
+	else:
+		for r in results:
+			print("%s: exit code %s, %s instructions, %.4fs" % (r.path, r.exit_code, r.instructions, r.wall_time))
+			for line in r.output:
+				print("	" + line)
+			if r.error != None:
+				print("	" + r.error)
+		print("%s programs in %.4fs" % (len(results), wall_time))
+
+	return 0 if all(r.exit_code == 1 for r in results) else 1
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,573 @@
+"""Bench.py -> Throughput benchmarks of the emulator's execution engines
+
+Runs every workload under every engine, each run in a fresh worker process so its peak memory is its own,
+and reports instructions per second, micro-ops per second, peak RSS and wall time, keeping the best of the repeats
+The results are saved as JSON together with the git commit they were measured at, to be compared against a later run with --compare
+
+Engines:
+
+reference -> Emulator.SchonCore with COMPILEDMICROCODE False, every micro-op through the generic execute()
+microcode -> Emulator.SchonCore with compiled micro-ops, one instruction at a time
+blocks -> Emulator.SchonCore with compiled micro-ops and translated basic blocks, the default
+lockstep -> Lockstep.LockstepCore running lockstep_lanes copies of the workload, counting the instructions of every lane, needs NumPy
+
+Workloads:
+
+The shipped programs in the executable files folder, with shipped_inputs as their GPIO input and stopped after program_budget instructions
+times --scale, as p never exits
+Synthetic kernels built as machine words by Kernel, their iterations multiplied by --scale:
+alu_loop -> Add, multiply, exclusive or and compare in a tight loop
+ram_stream -> Pushes a run of words onto the stack and pops them back, over and over
+call_frames -> Calls with a frame pushed and popped around every call, the CALL microcode doesn't move the stack pointer
+	and RETURN jumps to it, so the kernel jumps back itself instead of returning
+branch_storm -> Two conditional branches per iteration, taken every other and every fourth iteration
+
+Major classes:
+
+Kernel() -> Machine words of a synthetic program, with labels for branch and call targets
+
+Major functions:
+
+kernels(scale=1.0) -> Dict of kernel name to (words, inputs, expected output) of the synthetic kernels
+benchmark_assembler(source_folder, repeat=1) -> Assembles every .s file of source_folder into a temporary folder, timing each
+run_benchmarks(engines=None, workloads=None, repeat=3, scale=1.0, program_folder=None, source_folder=None) -> Runs every workload under every engine,
+	returns the results as a dict ready for JSON
+compare(old, new) -> Lines comparing the instructions per second of two sets of results
+
+Command line:
+
+python Bench.py [--engines ENGINE ...] [--workloads WORKLOAD ...] [--repeat N] [--scale N] [--programs FOLDER] [--sources FOLDER]
+	[--json FILE] [--compare FILE]
+"""
+
+#Import libraries
+import Emulator
+import GPIO
+import BinaryFormat
+import os
+import io
+import sys
+import time
+import json
+import zlib
+import shutil
+import argparse
+import platform
+import tempfile
+import importlib.util
+import subprocess
+import contextlib
+import multiprocessing
+import logging as lgn			#Logging for custom exceptions
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+	import resource			#Not on Windows, where peak RSS isn't reported
+except ImportError:
+	resource = None
+
+bw = Emulator.bw
+wm = Emulator.wm
+
+result_format_version = 1
+engines = ["reference", "microcode", "blocks", "lockstep"]
+lockstep_lanes = 64			#Lanes of the lockstep engine, each running the same workload
+program_budget = 100000		#Most instructions a shipped program runs for at scale 1
+kernel_iterations = {		#Iterations of each kernel at scale 1
+	"alu_loop": 20000,
+	"ram_stream": 40,		#Rounds of stream_words words
+	"call_frames": 10000,
+	"branch_storm": 10000,
+}
+stream_words = 256			#Words pushed and popped per round of ram_stream
+stack_base = 0x1000			#Stack pointer the kernels start at
+
+#GPIO input of the shipped programs, by name, scaled ones being functions of the scale
+shipped_inputs = {
+	"t": lambda scale: [e for i in range(max(1, int(200 * scale))) for e in (i + 7, i % 4, i % 13 + 1)] + [1, 4, 1],
+	"test": lambda scale: [20, 22],
+}
+
+#Instruction fields, as in Emulator.decode()
+alu_function_codes = dict([(name, code) for code, name in Emulator.alu_function_names.items()])
+compare_flags = 0b1111		#var_a of compare, as the assembler writes it
+branch_conditions = {		#Condition -> (var_a, var_b) of the conditional branch, taken if var_b is 1 or none of the flags in var_a are set
+	"always": (0b0111, 1),
+	"==": (0b0101, 0),
+	"!=": (0b0010, 0),
+	"<": (0b0011, 0),
+	">": (0b0110, 0),
+}
+
+def instruction(func=0, alu=0, var_a=0, var_b=0, reg_a=0, reg_b=0, reg_c=0):
+	"""instruction(func=0, alu=0, var_a=0, var_b=0, reg_a=0, reg_b=0, reg_c=0) -> Instruction word of the fields Emulator.decode() reads,
+	reg_a, reg_b and reg_c being general purpose register indices
+	"""
+	fields = [func, alu, var_a, var_b, reg_a << 2 | Emulator.RegType.GENERALPURPOSE.value,
+			  reg_b << 2 | Emulator.RegType.GENERALPURPOSE.value, reg_c << 2 | Emulator.RegType.GENERALPURPOSE.value]
+	inp = 0
+	for i, e in enumerate(fields):
+		inp |= (e & (1 << Emulator.var_lengs[i]) - 1) << Emulator.var_ofs[i]
+	return inp
+
+class Kernel:
+	"""Kernel() -> Machine words of a synthetic program, emitted instruction by instruction, with labels for branch and call targets
+	"""
+
+	def __init__(self):
+		self.words = []
+		self.labels = dict()
+		self.targets = []		#(index of the immediate word, label) resolved by assemble()
+
+	def label(self, name):
+		"""label(name) -> Marks the address of the next instruction as name
+		"""
+		self.labels[name] = len(self.words)
+
+	def load(self, reg, value):
+		"""load(reg, value) -> reg = value, from the ROM word after the instruction
+		"""
+		self.words += [instruction(reg_a=reg), value & wm]
+
+	def compute(self, function, reg_a, reg_b, reg_c):
+		"""compute(function, reg_a, reg_b, reg_c) -> reg_c = reg_a function reg_b, function being a name of Emulator.alu_function_names,
+		"CMP" setting the flags of reg_a and reg_b
+		"""
+		var_a = compare_flags if function == "CMP" else 0
+		self.words.append(instruction(alu_function_codes[function], 1, var_a, 0, reg_a, reg_b, reg_c))
+
+	def branch(self, label, condition="always"):
+		"""branch(label, condition="always") -> Jumps to label if condition of branch_conditions holds for the last CMP
+		"""
+		var_a, var_b = branch_conditions[condition]
+		self.words.append(instruction(func=4, var_a=var_a, var_b=var_b))
+		self.targets.append((len(self.words), label))
+		self.words.append(0)
+
+	def call(self, label):
+		self.words.append(instruction(func=5))
+		self.targets.append((len(self.words), label))
+		self.words.append(0)
+
+	def push(self, reg):
+		self.words.append(instruction(func=3, var_a=0, reg_a=reg))
+
+	def pop(self, reg):
+		self.words.append(instruction(func=3, var_a=1, reg_a=reg))
+
+	def set_stack(self, reg):
+		"""set_stack(reg) -> Stack pointer = reg
+		"""
+		self.words.append(instruction(func=3, var_a=2, reg_a=reg))
+
+	def output(self, reg, port=0):
+		self.words += [instruction(func=6, var_a=2, reg_a=reg), port]
+
+	def exit(self):
+		self.words.append(wm)
+
+	def assemble(self):
+		"""assemble() -> Words of the program with the labels filled in
+		"""
+		words = list(self.words)
+		for index, label in self.targets:
+			if label not in self.labels:
+				lgn.critical("Bench: Error: Undefined kernel label %s." % (label))
+				raise KeyError(label)
+			words[index] = self.labels[label]
+		return words
+
+def alu_loop(n):
+	k = Kernel()
+	k.load(0, 0)		#Counter
+	k.load(1, 1)
+	k.load(2, n)
+	k.load(3, 3)
+	k.load(4, 1)		#Accumulator
+	k.label("loop")
+	k.compute("ADD", 0, 1, 0)
+	k.compute("MUL", 4, 3, 4)
+	k.compute("XOR", 4, 0, 4)
+	k.compute("CMP", 0, 2, 5)
+	k.branch("loop", "!=")
+	k.output(4)
+	k.exit()
+
+	accumulator = 1
+	for i in range(1, n + 1):
+		accumulator = (accumulator * 3 & wm) ^ i
+	return k.assemble(), [accumulator]
+
+def ram_stream(rounds):
+	k = Kernel()
+	k.load(0, 0)		#Round
+	k.load(1, 1)
+	k.load(2, rounds)
+	k.load(3, stream_words)
+	k.load(4, 0)		#Checksum
+	k.load(5, stack_base)
+	k.load(7, 0)
+	k.set_stack(5)
+	k.label("round")
+	k.load(6, 0)		#Word of the round
+	k.label("push")
+	k.compute("ADD", 6, 0, 8)
+	k.push(8)
+	k.compute("ADD", 6, 1, 6)
+	k.compute("CMP", 6, 3, 9)
+	k.branch("push", "!=")
+	k.label("pop")
+	k.pop(8)
+	k.compute("ADD", 4, 8, 4)
+	k.compute("SUB", 6, 1, 6)
+	k.compute("CMP", 6, 7, 9)
+	k.branch("pop", "!=")
+	k.compute("ADD", 0, 1, 0)
+	k.compute("CMP", 0, 2, 9)
+	k.branch("round", "!=")
+	k.output(4)
+	k.exit()
+
+	checksum = sum([r * stream_words + stream_words * (stream_words - 1) // 2 for r in range(rounds)]) & wm
+	return k.assemble(), [checksum]
+
+def call_frames(n):
+	k = Kernel()
+	k.load(0, 0)		#Calls made
+	k.load(1, 1)
+	k.load(2, n)
+	k.load(3, stack_base)
+	k.set_stack(3)
+	k.label("loop")
+	k.push(0)
+	k.call("function")
+	k.label("function")
+	k.compute("ADD", 0, 1, 0)
+	k.pop(4)
+	k.compute("CMP", 0, 2, 5)
+	k.branch("loop", "!=")
+	k.output(0)
+	k.output(4)
+	k.exit()
+	return k.assemble(), [n, n - 1]
+
+def branch_storm(n):
+	k = Kernel()
+	k.load(0, 0)		#Counter
+	k.load(1, 1)
+	k.load(2, n)
+	k.load(3, 0)		#Taken counter
+	k.load(4, 3)
+	k.load(7, 0)
+	k.label("loop")
+	k.compute("ADD", 0, 1, 0)
+	k.compute("AND", 0, 1, 5)
+	k.compute("CMP", 5, 7, 6)
+	k.branch("odd", "!=")
+	k.compute("ADD", 3, 1, 3)
+	k.label("odd")
+	k.compute("AND", 0, 4, 5)
+	k.compute("CMP", 5, 7, 6)
+	k.branch("next", "==")
+	k.compute("ADD", 3, 1, 3)
+	k.label("next")
+	k.compute("CMP", 0, 2, 6)
+	k.branch("loop", "<")
+	k.output(3)
+	k.exit()
+
+	taken = len([i for i in range(1, n + 1) if i & 1 == 0]) + len([i for i in range(1, n + 1) if i & 3 != 0])
+	return k.assemble(), [taken]
+
+kernel_functions = {
+	"alu_loop": alu_loop,
+	"ram_stream": ram_stream,
+	"call_frames": call_frames,
+	"branch_storm": branch_storm,
+}
+
+def kernels(scale=1.0):
+	"""kernels(scale=1.0) -> Dict of kernel name to (words, inputs, expected output) of the synthetic kernels,
+	their kernel_iterations multiplied by scale
+	"""
+	result = dict()
+	for name, function in kernel_functions.items():
+		words, expected = function(max(1, int(kernel_iterations[name] * scale)))
+		result[name] = (words, [], expected)
+	return result
+
+def git_commit():
+	"""git_commit() -> Commit hash of the working tree, with "+dirty" if it has changes, None outside of git
+	"""
+	folder = os.path.dirname(os.path.abspath(__file__))
+	try:
+		commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=folder, capture_output=True, text=True, check=True).stdout.strip()
+		status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=folder, capture_output=True, text=True, check=True).stdout
+	except (OSError, subprocess.CalledProcessError):
+		return None
+	return commit + ("+dirty" if status.strip() != "" else "")
+
+def peak_rss():
+	"""peak_rss() -> Peak resident set size of this process in KiB, None where it isn't known
+	"""
+	if resource == None:
+		return None
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss // 1024 if sys.platform == "darwin" else rss
+
+def output_digest(words):
+	"""output_digest(words) -> CRC-32 of the GPIO output words, the same under every engine for a correct run
+	"""
+	return zlib.crc32(Emulator.little_endian_bytes(words))
+
+def count_micro_ops(path, inputs, max_instructions=None):
+	"""count_micro_ops(path, inputs, max_instructions=None) -> (instructions, micro-op rows, output) of running the program at path,
+	micro-op rows counted the way Emulator.Profile does and being the same under every engine,
+	output being the GPIO output words if the program exited and None otherwise
+	"""
+	output = GPIO.BufferOutput()
+	cpu = Emulator.SchonCore(gpio=GPIO.Channels(GPIO.IterableInput(inputs), output))
+	exit_code = -1
+	with contextlib.redirect_stdout(io.StringIO()):
+		try:
+			exit_code = cpu.run_file(path, profile=True, max_instructions=max_instructions)
+		except Exception:
+			pass
+	return cpu.instruction_count, sum([e["micro_ops"] for e in cpu.profile.results()]), output.words() if exit_code == 1 else None
+
+def run_engine(engine, path, inputs, max_instructions=None):
+	"""run_engine(engine, path, inputs, max_instructions=None) -> Runs the program at path once under engine
+	Returns: dict of exit code, instructions, wall time, output digest and error
+	"""
+	if engine == "lockstep":
+		Lockstep = importlib.import_module("Lockstep")		#Needs NumPy
+		cpu = Lockstep.LockstepCore(lockstep_lanes)
+		start_time = time.perf_counter()
+		cpu.run_file(path, [inputs] * lockstep_lanes, max_instructions=max_instructions)
+		wall_time = time.perf_counter() - start_time
+		exit_code = int(cpu.exit_codes[0])
+		return {
+			"exit_code": 3 if exit_code == 0 else exit_code,
+			"instructions": int(cpu.instruction_count.sum()),
+			"wall_time": wall_time,
+			"output_digest": output_digest(cpu.outputs()[0]),
+			"error": cpu.errors.get(0),
+		}
+
+	Emulator.COMPILEDMICROCODE = engine != "reference"
+	Emulator.BLOCKTRANSLATION = engine == "blocks"
+	output = GPIO.BufferOutput()
+	cpu = Emulator.SchonCore(gpio=GPIO.Channels(GPIO.IterableInput(inputs), output))
+	error = None
+	start_time = time.perf_counter()
+	try:
+		exit_code = cpu.run_file(path, max_instructions=max_instructions)
+	except Exception as e:
+		exit_code = -1
+		error = "%s: %s" % (type(e).__name__, e)
+	wall_time = time.perf_counter() - start_time
+	return {
+		"exit_code": exit_code,
+		"instructions": cpu.instruction_count,
+		"wall_time": wall_time,
+		"output_digest": output_digest(output.words()),
+		"error": error,
+	}
+
+def _run_job(engine, path, inputs, max_instructions, repeat):
+	#Runs in a fresh worker process, keeping the fastest of repeat runs
+	lgn.getLogger().setLevel(lgn.CRITICAL)
+	best = None
+	for _ in range(repeat):
+		result = run_engine(engine, path, inputs, max_instructions)
+		if best == None or result["wall_time"] < best["wall_time"]:
+			best = result
+	best["peak_rss_kib"] = peak_rss()
+	return best
+
+def available_engines():
+	"""available_engines() -> Engines runnable here, lockstep only if NumPy is installed
+	"""
+	return [e for e in engines if e != "lockstep" or importlib.util.find_spec("numpy") != None]
+
+def shipped_programs(program_folder):
+	"""shipped_programs(program_folder) -> Dict of name to path of the .schonexe1 programs in program_folder
+	"""
+	return dict([(e[:-len(Emulator.file_extension_name)], os.path.join(program_folder, e)) for e in sorted(os.listdir(program_folder))
+				 if e.endswith(Emulator.file_extension_name)])
+
+def benchmark_assembler(source_folder, repeat=1):
+	"""benchmark_assembler(source_folder, repeat=1) -> Assembles every .s file of source_folder without the assembly cache, keeping the fastest of repeat runs of each
+	The sources are copied into a temporary base folder, so the executable files folder is left as it is
+	Returns: list of dicts of source, lines, wall time, words and error, the sources that don't assemble having an error
+	"""
+	import Assembler
+	results = []
+	with tempfile.TemporaryDirectory() as base:
+		base += "/"
+		os.makedirs(base + Assembler.pf)
+		os.makedirs(base + Assembler.exeff)
+		old_bf, old_level = Assembler.bf, Assembler.LOGLEVEL
+		Assembler.bf, Assembler.LOGLEVEL = base, lgn.CRITICAL
+		try:
+			for source in sorted(os.listdir(source_folder)):
+				if not source.endswith(".s"):
+					continue
+				shutil.copy(os.path.join(source_folder, source), base + Assembler.pf + source)
+				with open(base + Assembler.pf + source, "r") as fh:
+					lines = len(fh.readlines())
+				name = source[:-2]
+				best, error, words = None, None, None
+				for _ in range(repeat):
+					start_time = time.perf_counter()
+					try:
+						with contextlib.redirect_stdout(io.StringIO()):
+							Assembler.Assemble(source, name, cache=False)
+					except Exception as e:
+						error = "%s: %s" % (type(e).__name__, e)
+						break
+					wall_time = time.perf_counter() - start_time
+					best = wall_time if best == None else min(best, wall_time)
+				if error == None:
+					words = len(Emulator.read_program(base + Assembler.exeff + name + Emulator.file_extension_name))
+				results.append({"source": source, "lines": lines, "wall_time": best, "words": words, "error": error})
+		finally:
+			Assembler.bf, Assembler.LOGLEVEL = old_bf, old_level
+			lgn.getLogger().setLevel(Emulator.LOGLEVEL)
+	return results
+
+def run_benchmarks(engines=None, workloads=None, repeat=3, scale=1.0, program_folder=None, source_folder=None):
+	"""run_benchmarks(engines=None, workloads=None, repeat=3, scale=1.0, program_folder=None, source_folder=None) -> Runs every workload under every engine
+	Parameters:
+
+	engines: names of the engines to run, every available one if None
+	workloads: names of the shipped programs and kernels to run, all of them if None
+	repeat: runs of each workload and engine, the fastest being kept
+	scale: multiplies the kernel iterations, the input of t and the instructions the shipped programs run for
+	program_folder: folder of the shipped programs, the executable files folder if None
+	source_folder: folder of the .s files to time the assembler on, the programs folder if None
+
+	Returns: dict of the machine, commit, assembler results and results of each workload and engine, ready for JSON
+	"""
+	if engines == None:
+		engines = available_engines()
+	if program_folder == None:
+		program_folder = Emulator.bf + Emulator.exeff
+	if source_folder == None:
+		source_folder = Emulator.bf + Emulator.pf
+
+	with tempfile.TemporaryDirectory() as folder:
+		#(name, kind, path, inputs, max instructions, expected output, None for shipped programs)
+		jobs = []
+		if os.path.isdir(program_folder):
+			for name, path in shipped_programs(program_folder).items():
+				inputs = shipped_inputs[name](scale) if name in shipped_inputs else []
+				jobs.append((name, "program", path, inputs, max(1, int(program_budget * scale)), None))
+		else:
+			lgn.warning("Bench: No program folder %s, only running the kernels." % (program_folder))
+		for name, (words, inputs, expected) in kernels(scale).items():
+			path = os.path.join(folder, name + BinaryFormat.file_extension_name)
+			BinaryFormat.write_words(path, words)
+			jobs.append((name, "kernel", path, inputs, None, expected))
+		if workloads != None:
+			jobs = [e for e in jobs if e[0] in workloads]
+
+		results = []
+		context = multiprocessing.get_context("spawn")
+		for name, kind, path, inputs, max_instructions, expected in jobs:
+			instructions, micro_ops, output = count_micro_ops(path, inputs, max_instructions)
+			if expected == None:
+				expected = output		#Shipped programs are expected to give the output they give one instruction at a time
+			for engine in engines:
+				with ProcessPoolExecutor(1, mp_context=context) as pool:
+					try:
+						result = pool.submit(_run_job, engine, path, inputs, max_instructions, repeat).result()
+					except Exception as e:
+						result = {"exit_code": -1, "instructions": 0, "wall_time": 0.0, "output_digest": None,
+								  "error": "%s: %s" % (type(e).__name__, e), "peak_rss_kib": None}
+				lanes = lockstep_lanes if engine == "lockstep" else 1
+				wall_time = result["wall_time"] or float("nan")
+				#Engines stopped by the budget at the end of a block run a few more instructions than were counted
+				result_micro_ops = micro_ops * result["instructions"] / instructions if instructions > 0 else 0
+				result.update({
+					"workload": name,
+					"kind": kind,
+					"engine": engine,
+					"lanes": lanes,
+					"micro_ops": int(result_micro_ops),
+					"instructions_per_second": result["instructions"] / wall_time,
+					"micro_ops_per_second": result_micro_ops / wall_time,
+					"correct": None if expected == None else result["output_digest"] == output_digest(expected),
+				})
+				results.append(result)
+				lgn.info("Bench: %s on %s: %.0f instructions/s" % (name, engine, result["instructions_per_second"]))
+
+	assembler = benchmark_assembler(source_folder, repeat) if os.path.isdir(source_folder) else []
+	return {
+		"format_version": result_format_version,
+		"commit": git_commit(),
+		"date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"repeat": repeat,
+		"scale": scale,
+		"assembler": assembler,
+		"results": results,
+	}
+
+def compare(old, new):
+	"""compare(old, new) -> Lines comparing the instructions per second of each workload and engine in both old and new results
+	"""
+	old_results = dict([((e["workload"], e["engine"]), e) for e in old["results"]])
+	lines = ["Comparing %s to %s" % (new.get("commit"), old.get("commit")),
+			 "%-14s %-10s %14s %14s %8s" % ("Workload", "Engine", "Old instr/s", "New instr/s", "Ratio")]
+	for e in new["results"]:
+		o = old_results.get((e["workload"], e["engine"]))
+		if o == None or not o["instructions_per_second"] > 0:
+			continue
+		lines.append("%-14s %-10s %14.0f %14.0f %7.2fx" % (e["workload"], e["engine"], o["instructions_per_second"],
+														   e["instructions_per_second"], e["instructions_per_second"] / o["instructions_per_second"]))
+	return lines
+
+def report(results):
+	"""report(results) -> Lines of a table of run_benchmarks() results
+	"""
+	lines = ["%-14s %-10s %6s %12s %14s %14s %10s %10s" % ("Workload", "Engine", "Exit", "Instructions", "Instr/s", "Micro-ops/s", "Seconds", "RSS KiB")]
+	for e in results["results"]:
+		exit_code = str(e["exit_code"]) + ("" if e["correct"] != False else "!")
+		lines.append("%-14s %-10s %6s %12s %14.0f %14.0f %10.4f %10s" % (e["workload"], e["engine"], exit_code, e["instructions"],
+																	   e["instructions_per_second"], e["micro_ops_per_second"], e["wall_time"], e["peak_rss_kib"]))
+	for e in results["assembler"]:
+		if e["error"] != None:
+			lines.append("Assembler: %s: %s" % (e["source"], e["error"]))
+		else:
+			lines.append("Assembler: %s: %s lines in %.4fs" % (e["source"], e["lines"], e["wall_time"]))
+	return lines
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark the emulator's execution engines.")
+	parser.add_argument("--engines", nargs="+", default=None, choices=engines, help="engines to run, every available one by default")
+	parser.add_argument("--workloads", nargs="+", default=None, help="shipped programs and kernels to run, all of them by default")
+	parser.add_argument("--repeat", type=int, default=3, help="runs of each workload and engine, the fastest is kept")
+	parser.add_argument("--scale", type=float, default=1.0, help="multiplies the kernel iterations and the instructions the shipped programs run for")
+	parser.add_argument("--programs", default=None, help="folder of the shipped .schonexe1 programs, the executable files folder by default")
+	parser.add_argument("--sources", default=None, help="folder of the .s files to time the assembler on, the programs folder by default")
+	parser.add_argument("--json", default=None, help="save the results to this JSON file")
+	parser.add_argument("--compare", default=None, help="JSON file of earlier results to compare to")
+	args = parser.parse_args(argv)
+
+	results = run_benchmarks(args.engines, args.workloads, args.repeat, args.scale, args.programs, args.sources)
+	for line in report(results):
+		print(line)
+	if args.json != None:
+		with open(args.json, "w") as fh:
+			json.dump(results, fh, indent=2)
+	if args.compare != None:
+		with open(args.compare, "r") as fh:
+			for line in compare(json.load(fh), results):
+				print(line)
+
+	return 0 if all(e["correct"] != False for e in results["results"]) else 1
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,100 @@
+"""BinaryFormat.py -> Packed binary executable format, .schonbin
+
+A .schonbin file is a 16 byte header followed by the ROM words as little endian unsigned 32 bit integers
+Header, little endian:
+
+magic -> 4 bytes, b"SCHB"
+version -> unsigned 16 bit, format_version
+bit_width -> unsigned 16 bit, word width the program was assembled for
+word_count -> unsigned 32 bit, amount of words following the header
+reserved -> unsigned 32 bit, 0
+
+Major functions:
+
+text_word(line) -> Converts a line of a .schonexe1 file to an integer word
+pack_words(words) -> The bytes of a .schonbin file holding words
+write_words(file_path, words) -> Writes words to file_path as a .schonbin file
+load_words(file_path) -> Maps a .schonbin file into memory and returns its words without copying them
+text_to_binary(text_path, file_path) -> Converts a .schonexe1 file to a .schonbin file
+"""
+
+#Import libraries
+import BaseCPUInfo
+import sys
+import mmap
+import struct
+import logging as lgn			#Logging for custom exceptions
+from array import array			#Compact storage for integer words
+
+file_extension_name = ".schonbin"
+magic = b"SCHB"
+format_version = 1
+header = struct.Struct("<4sHHII")
+
+def text_word(line: str):
+	"""text_word(line: str) -> Converts a line of a .schonexe1 file, where character i is bit i, to an integer word, anything but "1" being a zero bit
+	"""
+	return int("0" + "".join(["1" if e == "1" else "0" for e in line.strip()[::-1]]), 2)
+
+def pack_words(words):
+	"""pack_words(words) -> The bytes of a .schonbin file holding words, an iterable of integer words
+	"""
+	data = array("I", words)
+	if sys.byteorder == "big":
+		data.byteswap()
+	return header.pack(magic, format_version, BaseCPUInfo.bit_width, len(data), 0) + data.tobytes()
+
+def write_words(file_path, words):
+	"""write_words(file_path, words) -> Writes words to file_path as a .schonbin file
+	Parameters:
+
+	file_path: full path of the file to write
+	words: iterable of integer words
+
+	Returns: amount of words written
+	"""
+	data = pack_words(words)
+	with open(file_path, "wb") as fh:
+		fh.write(data)
+	return (len(data) - header.size) // 4
+
+def load_words(file_path):
+	"""load_words(file_path) -> Maps a .schonbin file into memory and returns its words
+	The words are a memoryview of the mapping, read only and without copying, on big endian hosts they are copied into a byteswapped array instead
+
+	Returns: memoryview or array of the words
+	"""
+	with open(file_path, "rb") as fh:
+		size = fh.seek(0, 2)
+		if size < header.size:
+			lgn.critical("BinaryFormat: Error: %s is too short for a .schonbin header." % (file_path))
+			raise ValueError("%s: Not a .schonbin file." % (file_path))
+		mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+	file_magic, version, bit_width, word_count, _ = header.unpack_from(mapped)
+	if file_magic != magic:
+		lgn.critical("BinaryFormat: Error: %s isn't a .schonbin file." % (file_path))
+		raise ValueError("%s: Not a .schonbin file." % (file_path))
+	if version != format_version:
+		lgn.critical("BinaryFormat: Error: %s: Unsupported version %s." % (file_path, version))
+		raise ValueError("%s: Unsupported .schonbin version %s." % (file_path, version))
+	if bit_width != BaseCPUInfo.bit_width:
+		lgn.warning("BinaryFormat: %s was assembled for %s bit words." % (file_path, bit_width))
+	if header.size + word_count * 4 > size:
+		lgn.critical("BinaryFormat: Error: %s is truncated." % (file_path))
+		raise ValueError("%s: Truncated .schonbin file." % (file_path))
+
+	words = memoryview(mapped)[header.size:header.size + word_count * 4].cast("I")
+	if sys.byteorder == "big":
+		words = array("I", words)
+		words.byteswap()
+	return words
+
+def text_to_binary(text_path, file_path):
+	"""text_to_binary(text_path, file_path) -> Converts a .schonexe1 file, where character i of a line is bit i, to a .schonbin file
+
+	Returns: amount of words written
+	"""
+	with open(text_path, "r") as fh:
+		words = [text_word(line) for line in fh]
+	return write_words(file_path, words)
@@ -0,0 +1,244 @@
+"""Build.py -> Builds a folder of sources into executables across a pool of worker processes
+
+Sources and what they are built into:
+
+name.schon -> Compiled by Compiler to name.s1 next to it, which is then assembled
+name.s -> Assembled by Assembler to name.schonexe1 in the programs folder, with binary also to the packed name.schonbin
+name.s1 -> Assembled the same way when there is no name.s
+A hand written name.s shadows the name.schon and name.s1 of the same name, which are neither compiled nor assembled
+
+A job only starts once the job building its source has finished, and is skipped if that one failed,
+the rest running at the same time on a process pool
+Jobs whose outputs are at least as new as their source are up to date and aren't run again unless forced
+Files are only written when their contents change, the outputs a job left unchanged getting the modification time of its source instead,
+so they are up to date on the next build and an edit compiling to the same .s1 isn't assembled again
+Every job is given full paths, so BaseCPUInfo.base_folder doesn't have to point at the folders being built
+
+Major functions:
+
+plan(source_folder, programs_folder, binary=False) -> Discovers the sources of source_folder, returns the list of BuildJob building them
+run_job(job, binary=False, cache=None) -> Runs one BuildJob and returns its BuildResult
+settle(job) -> Gives the outputs of job its source's modification time if they are older, once they hold what it builds
+build(source_folder=None, programs_folder=None, workers=None, binary=False, force=False, cache=None) -> Builds every source of source_folder
+	on a process pool, returns a list of BuildResult in the order of plan()
+
+Command line:
+
+python Build.py [source_folder] [--programs FOLDER] [-w WORKERS] [--binary] [--force] [--no-cache] [--json]
+source_folder and the programs folder defaulting to the ones of BaseCPUInfo, or with a source_folder given to the executable files folder next to it
+"""
+
+#Import libraries
+import BaseCPUInfo
+import Assembler
+import Compiler
+import BinaryFormat
+import os
+import io
+import sys
+import time
+import json
+import argparse
+import contextlib
+import logging as lgn			#Logging for custom exceptions
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+LOGLEVEL = lgn.WARNING		#Log level of the Assembler while building, its progress being left out
+
+source_extensions = [".schon", ".s", ".s1"]
+
+#One file to build
+#kind: "compile" or "assemble", source: path of the file built, outputs: paths of the files built from it, the first being the one asked for,
+#depends: index in the job list of the job building source, None if it's written by hand
+BuildJob = namedtuple("BuildJob", ["kind", "source", "outputs", "depends"])
+
+#Result of one BuildJob
+#state: "written" if any output changed, "unchanged" if they already held what was built, "up to date" if the job wasn't run,
+#"failed" if it couldn't be built, "skipped" if the job it depends on failed, wall_time: seconds spent building, error: exception message or None
+BuildResult = namedtuple("BuildResult", ["kind", "source", "output", "state", "wall_time", "error"])
+
+def plan(source_folder, programs_folder, binary=False):
+	"""plan(source_folder, programs_folder, binary=False) -> Jobs building every source of source_folder, each after the job it depends on
+	Parameters:
+
+	source_folder: folder of the .schon, .s and .s1 sources
+	programs_folder: folder the .schonexe1 files are written to
+	binary: if True the assembly jobs also write .schonbin files
+
+	Returns: list of BuildJob
+	"""
+	stems = dict()
+	for name in sorted(os.listdir(source_folder)):
+		stem, extension = os.path.splitext(name)
+		if extension in source_extensions and os.path.isfile(os.path.join(source_folder, name)):
+			stems.setdefault(stem, set()).add(extension)
+
+	jobs = []
+	for stem in sorted(stems):
+		extensions = stems[stem]
+		outputs = [os.path.join(programs_folder, stem + ".schonexe1")]
+		if binary:
+			outputs.append(os.path.join(programs_folder, stem + BinaryFormat.file_extension_name))
+
+		if ".s" in extensions:
+			if ".schon" in extensions or ".s1" in extensions:
+				lgn.warning("Build: %s.s shadows %s, only %s.s is built." % (stem, " and ".join(stem + e for e in [".schon", ".s1"] if e in extensions), stem))
+			jobs.append(BuildJob("assemble", os.path.join(source_folder, stem + ".s"), outputs, None))
+			continue
+		compiled = None
+		if ".schon" in extensions:
+			compiled = len(jobs)
+			jobs.append(BuildJob("compile", os.path.join(source_folder, stem + ".schon"), [os.path.join(source_folder, stem + ".s1")], None))
+		jobs.append(BuildJob("assemble", os.path.join(source_folder, stem + ".s1"), outputs, compiled))
+	return jobs
+
+def up_to_date(job):
+	"""up_to_date(job) -> True if every output of job exists and is at least as new as its source
+	"""
+	if not os.path.isfile(job.source) or not all(os.path.isfile(e) for e in job.outputs):
+		return False
+	source_time = os.stat(job.source).st_mtime_ns
+	return all(os.stat(e).st_mtime_ns >= source_time for e in job.outputs)
+
+def settle(job):
+	"""settle(job) -> Gives the outputs of job older than its source the modification time of the source, for outputs it built the same again
+	"""
+	source_time = os.stat(job.source).st_mtime_ns
+	for e in job.outputs:
+		stat = os.stat(e)
+		if stat.st_mtime_ns < source_time:
+			os.utime(e, ns=(stat.st_atime_ns, source_time))
+
+def _stamp(file_path):
+	if not os.path.isfile(file_path):
+		return None
+	stat = os.stat(file_path)
+	return (stat.st_mtime_ns, stat.st_size)
+
+def run_job(job, binary=False, cache=None):
+	"""run_job(job, binary=False, cache=None) -> Compiles or assembles one BuildJob, with whatever the Compiler prints left out
+	Parameters:
+
+	job: BuildJob to run
+	binary: if True assembly also writes the .schonbin file
+	cache: used for assembly, see Assembler.assemble_file()
+
+	Returns: BuildResult
+	"""
+	Assembler.LOGLEVEL = LOGLEVEL
+	before = [_stamp(e) for e in job.outputs]
+
+	error = None
+	start_time = time.perf_counter()
+	try:
+		with contextlib.redirect_stdout(io.StringIO()):
+			if job.kind == "compile":
+				state = Compiler.compile_file(job.source, job.outputs[0])
+			else:
+				state = Assembler.assemble_file(job.source, job.outputs[0], binary, cache)
+		if state != 1:
+			error = "Returned %s" % (state)
+	except Exception as e:
+		error = "%s: %s" % (type(e).__name__, e)
+	wall_time = time.perf_counter() - start_time
+
+	if error != None:
+		state = "failed"
+	elif any(_stamp(e) != before[i] for i, e in enumerate(job.outputs)):
+		state = "written"
+	else:
+		state = "unchanged"
+	if error == None:
+		settle(job)
+	return BuildResult(job.kind, job.source, job.outputs[0], state, wall_time, error)
+
+def build(source_folder=None, programs_folder=None, workers=None, binary=False, force=False, cache=None):
+	"""build(source_folder=None, programs_folder=None, workers=None, binary=False, force=False, cache=None) -> Builds every source of source_folder on a process pool
+	Parameters:
+
+	source_folder: folder of the sources, the programs folder of BaseCPUInfo if None
+	programs_folder: folder the executables are written to, the executable files folder of BaseCPUInfo if None,
+		or next to source_folder if that is given
+	workers: amount of worker processes, os.cpu_count() if None
+	binary: if True also writes the .schonbin files
+	force: if True runs the jobs that are up to date as well
+	cache: used for assembly, see Assembler.assemble_file()
+
+	Returns: list of BuildResult in the same order as the jobs of plan()
+	"""
+	if source_folder == None:
+		source_folder = BaseCPUInfo.base_folder + BaseCPUInfo.programs_folder
+		if programs_folder == None:
+			programs_folder = BaseCPUInfo.base_folder + BaseCPUInfo.executable_files_folder
+	if programs_folder == None:
+		programs_folder = os.path.join(os.path.dirname(os.path.abspath(source_folder)), BaseCPUInfo.executable_files_folder)
+	os.makedirs(programs_folder, exist_ok=True)
+
+	jobs = plan(source_folder, programs_folder, binary)
+	results = [None] * len(jobs)
+	fresh = [not force and up_to_date(e) for e in jobs]		#Before any job runs, the sources jobs depend on being settled as they're built
+	if workers == None:
+		workers = os.cpu_count() or 1
+	workers = max(1, min(workers, len(jobs)))
+
+	executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+	waiting = list(range(len(jobs)))
+	running = dict()			#Future to index of its job
+	try:
+		while len(waiting) > 0 or len(running) > 0:
+			#Start every job whose source is there, jobs come after the job they depend on so one pass is enough
+			for i in list(waiting):
+				job = jobs[i]
+				if job.depends != None and results[job.depends] == None:
+					continue
+				waiting.remove(i)
+				if job.depends != None and results[job.depends].state in ("failed", "skipped"):
+					results[i] = BuildResult(job.kind, job.source, job.outputs[0], "skipped", 0.0, "%s wasn't built" % (job.source))
+				elif fresh[i] and (job.depends == None or results[job.depends].state in ("unchanged", "up to date")):
+					#Its source was built the same again, so its outputs would be too
+					if job.depends != None:
+						settle(job)
+					results[i] = BuildResult(job.kind, job.source, job.outputs[0], "up to date", 0.0, None)
+				elif executor == None:
+					results[i] = run_job(job, binary, cache)
+				else:
+					running[executor.submit(run_job, job, binary, cache)] = i
+			if len(running) > 0:
+				done, _ = wait(running, return_when=FIRST_COMPLETED)
+				for future in done:
+					results[running.pop(future)] = future.result()
+	finally:
+		if executor != None:
+			executor.shutdown()
+	return results
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Compile and assemble every source of a folder in parallel.")
+	parser.add_argument("source_folder", nargs="?", default=None, help="folder of the .schon, .s and .s1 sources, default is the programs folder of BaseCPUInfo")
+	parser.add_argument("--programs", default=None, help="folder to write the executables to, default is the executable files folder next to source_folder")
+	parser.add_argument("-w", "--workers", type=int, default=None, help="amount of worker processes, default is the amount of cores")
+	parser.add_argument("--binary", action="store_true", help="also write packed .schonbin files")
+	parser.add_argument("--force", action="store_true", help="build the sources that are up to date as well")
+	parser.add_argument("--no-cache", action="store_true", help="don't use or write the .schoncache files of the assembler")
+	parser.add_argument("--json", action="store_true", help="print the results as JSON")
+	args = parser.parse_args(argv)
+
+	start_time = time.perf_counter()
+	results = build(args.source_folder, args.programs, args.workers, args.binary, args.force, False if args.no_cache else None)
+	wall_time = time.perf_counter() - start_time
+
+	if args.json:
+		print(json.dumps([r._asdict() for r in results], indent=2))
+	else:
+		for r in results:
+			print("%s %s -> %s: %s, %.4fs" % (r.kind, r.source, r.output, r.state, r.wall_time))
+			if r.error != None:
+				print("	" + r.error)
+		states = [r.state for r in results]
+		print("%s jobs in %.4fs: %s" % (len(results), wall_time, ", ".join("%s %s" % (states.count(e), e) for e in sorted(set(states)))))
+
+	return 0 if all(r.state not in ("failed", "skipped") for r in results) else 1
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -26,6 +26,7 @@ Major user functions:
 
 
 Compile((filename: str, dest_name: str) -> Function to call for cimpilation of filename to dest_name
+compile_file(source_path: str, dest_path: str) -> Same as Compile() with full paths instead of names in the programs folder, only writing dest_path if its contents changed
 
 """
 
@@ -38,6 +39,8 @@ def pl( lst ):
 
 import BaseCPUInfo
 
+import io
+import os
 import math 
 import BasicMath as bm
 import warnings
@@ -1131,11 +1134,22 @@ def Compile(filename: str, dest_name: str):
 	
 	Returns: int return state
 	"""
-	fh = open( bf + pf + filename )
+	return compile_file( bf + pf + filename, bf + pf + dest_name + ".s1" )
+
+def compile_file(source_path: str, dest_path: str):
+	"""compile_file(source_path: str, dest_path: str) -> Compilation of the file at source_path to the intermediate assembly file at dest_path
+	Parameters:
+	
+	source_path: full path of the .schon file for compilation
+	dest_path: full path of the .s1 file, only written once the whole file compiled and if its contents changed
+	
+	Returns: int return state
+	"""
+	fh = open( source_path )
 	lines = fh.readlines()
 	fh.close()
 	
-	fh = open( bf + pf + dest_name + ".s1", "w+" )
+	fh = io.StringIO()
 	
 	ev = []		#End of file Variables
 	ieep = True	#False: skip all writing to file, True: write to file
@@ -1146,7 +1160,7 @@ def Compile(filename: str, dest_name: str):
 	lines, lib_funcs_used = bif( lines )
 	lines_length = len( str( len( lines ) ) )
 	vars = ["" for i in range(7)]
-	print("\n\n%s%s.py: %s" % (bf, __name__, bf + pf + filename) )
+	print("\n\n%s%s.py: %s" % (bf, __name__, source_path) )
 	
 	[lines, m_for_index, m_for_out_index, funcs, m_func_num, m_a_func_num, m_func_index, user_vars, marks, if_marks, table_index, switch_index, m_func_start_ln] = pon_han_specs( lines )
 	if show_adv_inf == "yes":
@@ -1733,5 +1747,16 @@ def Compile(filename: str, dest_name: str):
 	fh.write( "eof \n" )
 	for i in ev:	#Write variables to end of file
 		fh.write( str( i ) + "\n" )
-	fh.close()
+	
+	#Leave an unchanged file alone, keeping its modification time for whatever is built from it
+	data = fh.getvalue()
+	if os.path.isfile( dest_path ):
+		old = open( dest_path )
+		unchanged = old.read() == data
+		old.close()
+		if unchanged:
+			return 1
+	out = open( dest_path, "w+" )
+	out.write( data )
+	out.close()
 	return 1
@@ -1,42 +1,113 @@
 """Emulator.py -> Updated Control Unit or Schön Core Alpha Pro v.0.1.0 Python emulator
 
-Works with binary words defined as a list of ints, example:
-[1,0,1,0,1,0,1,0,1,0,1,0,1,0,1,0]
-Registers are defined as lists of words, and all types of registers are defined together in a list of registers,
+Works with binary words stored as native integers masked to the bit width, example:
+0b1010101010101010 (the list form [0,1,0,1,0,1,0,1,0,1,0,1,0,1,0,1] being bit i at index i)
+Registers are defined as arrays of words, and all types of registers are defined together in a list of registers,
 but referencing them they're defined as [index,type]
+The list of bits form is only produced at the edges (pr, dump_rom and debug logging)
+
+All CPU state (ROM, RAM, registers, buffer and I/O) lives in a SchonCore instance, so several CPUs can run in one process,
+the module level functions are thin wrappers over default_core
+
+Major classes:
+
+SchonCore(ram_size=ram_size, input_function=None, output_function=None, gpio=None) -> One CPU instance with step() and run(), GPIO through a backend of GPIO.py
+PagedRAM(size=ram_size, max_words=max_ram_words) -> Sparse RAM allocating pages of words on their first write
+WatchedRAM(ram, addresses) -> Passes RAM writes on, keeping the old words of the watched addresses written, used by resume() for RAM watchpoints
+
+Hot path diagnostics are only built for the Trace levels selected by TRACE, SCHONTRACE or set_trace(),
+with no tracing the compiled micro-ops and blocks contain no trace code at all
 
 Major functions:
 
+set_trace(levels) -> Selects the Trace levels: INSTRUCTION, MICROOP and MEMORY
 initialize_rom() -> initializes Read Only Memory by reading file and writes the data to rom_data
+load_rom_words(words) -> Uses an array or memoryview of words, e.g. a mapped .schonbin file, as rom_data
+decode_rom() -> decodes every ROM word once into decoded_rom, the pre-decoded instruction cache
 reg(rw, index, reg_type, value=None, preset=None) -> Handles register read/write
 
-alu() -> executes arithmetic and logic operations based on flags set and registers
+alu() -> executes arithmetic and logic operations based on flags set and registers, dispatching on alu_functions
+verify_alu(samples=1000, seed=0) -> Checks the integer ALU against the GateLevel reference
 
 cls(r=0, g=0, b=0) -> clears registers and flags
 execute(set_list, ena_list, gui=False, reg_a=[0,0], reg_b=[0,0], reg_c=[0,0]) -> Executes actions based on set/enable flags and registers
+compile_micro_op(set_list, ena_list, name="micro_op") -> Compiles a microcode row into a function doing only its active pins, execute() stays the reference
+translate_block(pc) -> Translates the straight-line run of ROM words starting at pc into a compiled Python function
+run_block(gui=False) -> Runs the translated basic block at the program counter, falling back to single_instruction()
 single_instruction(r=0, gui=False, print_line_nr=False, force_show_exceptions=False) -> Runs a single instruction
-run(filename, gui=False, print_line_nr=False, force_show_exceptions=False,time_runtime=False) -> Function to call for running a schonexe5 file
+run(filename, gui=False, print_line_nr=False, force_show_exceptions=False,time_runtime=False) -> Function to call for running a schonexe5 file, the .schonbin one if it's up to date,
+	max_instructions, max_wall_time and watchdog stopping it with exit code 3 and the RunStats in run_stats
+run_file(file_path, ...) -> Same as run() for a .schonexe1 or .schonbin file given by its full path
+save_state(file_path) / load_state(file_path) -> Snapshot and restore of the full CPU state
+record_instruction(writer, gui=False) -> Runs a single instruction recording it and its writes in an ExecutionTrace.TraceWriter, run(..., record=file_path) records every instruction
+resume(gui=False, ...) -> Continues running the loaded program, e.g. from a restored snapshot
+run_until_input(gui=False) -> Runs the loaded program up to its next GPIO input
+add_breakpoint(pc, condition=None) / watch_ram(address) / watch_register(index, reg_type) -> Debugger, resume() returns 2 when one is hit, see last_break
+run_async(filename, gui=False, yield_every=4096) -> Coroutine running a program, yielding to the event loop and awaiting GPIO input
+Profile() -> Per meta function and ALU function code executions, micro-op rows and host time, filled by run(..., profile=True)
 """
 
 #Import libraries
 import BaseCPUInfo				#Basic CPU information
 import math
 import BasicMath as bm				#Basic math library
+import BinaryFormat				#Packed .schonbin executables
+import GPIO						#GPIO backends
+import ExecutionTrace			#Binary execution traces
+import os
+import sys
+import struct
+import hashlib
 import GateLevel as g
 import importlib as il
 import time
+import json
+import asyncio
+import builtins					#builtins.set, set() being the module level pin function
 import logging as lgn			#Logging for custom exceptions
-from enum import Enum
+from array import array			#Compact storage for integer words
+from enum import Enum, IntFlag
+from collections import namedtuple
+
+class Trace(IntFlag):	#Hot path trace levels, selected independently
+	NONE = 0
+	INSTRUCTION = 1		#Program counter and function of every instruction
+	MICROOP = 2			#Every row of microcode run and the ALU
+	MEMORY = 4			#RAM reads and writes and GPIO addresses
 
 LOGLEVEL = lgn.WARNING
+TRACE = Trace.NONE				#Also selected by the SCHONTRACE environment variable, e.g. SCHONTRACE=instruction,memory
+COMPILEDMICROCODE = True		#If False micro-ops run through the generic execute() as reference
+BLOCKTRANSLATION = True			#If True run() executes translated basic blocks instead of single instructions
 
 lgn.basicConfig(format="%(levelname)s: %(message)s", level=lgn.DEBUG)
 lgn.getLogger().setLevel(LOGLEVEL)
 
 lgn.debug("Imported libraries.")
 
+def trace_levels(names: str):
+	"""trace_levels(names: str) -> Trace levels named in a comma separated string, e.g. "instruction,microop,memory"
+	"""
+	levels = Trace.NONE
+	for name in names.split(","):
+		if name.strip() != "":
+			levels |= Trace[name.strip().upper()]
+	return levels
+
+if os.environ.get("SCHONTRACE"):
+	TRACE = trace_levels(os.environ["SCHONTRACE"])
+
+#Trace messages go to their own logger so they show whatever LOGLEVEL is,
+#the hot paths only build them when their level is enabled, see set_trace()
+trace_log = lgn.getLogger("trace")
+trace_log.setLevel(lgn.DEBUG)
+trace_instruction = bool(TRACE & Trace.INSTRUCTION)
+trace_micro_op = bool(TRACE & Trace.MICROOP)
+trace_memory = bool(TRACE & Trace.MEMORY)
+
 #Basic CPU info variables
 bw = BaseCPUInfo.bit_width
+wm = (1 << bw) - 1	#Word mask, all ones word
 
 bf = BaseCPUInfo.base_folder
 pf = BaseCPUInfo.programs_folder
@@ -44,35 +115,39 @@ exeff = BaseCPUInfo.executable_files_folder
 
 file_extension_name = ".schonexe1"
 
-rom_data = []
+ram_size = 1 << bw		#Random Access Memory, every address of the 4.294.967.296 is emulated
+ram_page_bits = 12		#Words per RAM page as a power of two, pages are allocated on their first write
+max_ram_words = 1 << 24	#Most words of RAM allocated at once, 64 MiB, None for no limit
 
-bz = bm.dtb(0) #Binary zero
+bz = 0 #Binary zero
 
-def initialize_rom(Filename: str):
-	"""initialize_rom() -> initializes Read Only Memory by reading file given at "rom/fn.txt" and writes the data to rom_data
+def word(bit_string: str):
+	"""word(bit_string: str) -> Converts a line of a .schonexe1 file, where character i is bit i, to an integer word
 	"""
-	rom_fh = open(bf + exeff + Filename + file_extension_name, "r")
-	global rom_data 
-	rom_data = []
-	rom_data_temp = rom_fh.readlines()
-	rom_fh.close()
-	
-	for i, line in enumerate(rom_data_temp):
-		temp = []
-		for j, e in enumerate(line):
-			if e == "1":
-				temp.append(1)
-			elif e == "\n":
-				pass
-			else:
-				temp.append(0)
-		rom_data.append(temp)
-	return 1
-
-#RAM emulated through huge list
-ramv = [
-	bz for i in range(1024)	#Random Access Memory, emulated 1024, but is capable of 4.294.967.296
-]
+	bit_string = bit_string.strip()[::-1]
+	try:
+		return int(bit_string, 2) & wm
+	except ValueError:
+		#Anything but "1" counts as a zero bit
+		return int("0" + "".join(["1" if e == "1" else "0" for e in bit_string]), 2) & wm
+
+def read_program(file_path: str):
+	"""read_program(file_path: str) -> Words of the .schonexe1 or .schonbin file at file_path, .schonbin files being mapped into memory
+	"""
+	if file_path.endswith(BinaryFormat.file_extension_name):
+		return BinaryFormat.load_words(file_path)
+	with open(file_path, "r") as fh:
+		return array("I", [word(line) for line in fh])
+
+def executable_path(filename: str):
+	"""executable_path(filename: str) -> Full path of the executable filename in the executable files folder,
+	the .schonbin file unless the .schonexe1 file has been assembled since
+	"""
+	file_path = bf + exeff + filename + file_extension_name
+	binary_path = bf + exeff + filename + BinaryFormat.file_extension_name
+	if os.path.isfile(binary_path) and (not os.path.isfile(file_path) or os.path.getmtime(binary_path) >= os.path.getmtime(file_path)):
+		return binary_path
+	return file_path
 
 class ReadWrite(Enum):
 	READ = 0
@@ -116,200 +191,56 @@ class RuntimeVariables(Enum):
 	REGISTERB = 5
 	REGISTERC = 6
 
-class EmulatorRuntimeError(Enum):
-	ALUFAILED = "ALU: Unknown error."
-	ALUNOTINITIATED = "ALU: Couldn't initiate."
-	ILLEGALFUNCTION = "Offset: Illegal function called."
+class BreakReason(Enum):
+	BREAKPOINT = 0
+	RAMWATCH = 1
+	REGISTERWATCH = 2
 
-#Internal registers emulated as list of lists
-regs = [
-	[bz for i in range(32)],	#General Purpose Registers
-	[bz for i in range(32)],	#Arithmetic/Logic Unit Registers
-	[bz for i in range(32)],	#Stack Pointers
-	[bz for i in range(10)],	#Special Purpose Internal CU Register
-]
+#Why resume() stopped with exit code 2, address being the program counter of a breakpoint,
+#the RAM address or (index, register type) of a watchpoint, and old and new the watched word before and after the instruction
+BreakEvent = namedtuple("BreakEvent", ["reason", "pc", "address", "old", "new"])
 
-reg_offs = [bm.dtb(0) for i in range(2)]
+class StopReason(Enum):
+	EXIT = 0
+	ERROR = 1
+	BREAK = 2
+	MAXINSTRUCTIONS = 3
+	MAXWALLTIME = 4
+	WATCHDOG = 5
 
-buffer = bm.dtb(0)
+#Statistics of the last resume(), pc being the program counter it stopped at,
+#instructions and wall_time the instructions run and seconds spent by that resume()
+RunStats = namedtuple("RunStats", ["reason", "pc", "instructions", "wall_time"])
 
-#Functions to manage buffer, registers and other memory storage units
-def buf(rw, list=bz):
-	global buffer 
-	if rw == 0:
-		return buffer 
-	
-	buffer = list
-
-def rom(rw, index):
-	global rom_data
-	if rw == 1:
-		return 
-	
-	global rom_data
-	
-	return rom_data[index]
-
-def ram(rw, index, value=None, preset=None):
-	"""ram(rw, index, value=None, preset=None) -> Handles Random Access Memory read/write
-	Parameters:
-	
-	rw: if True write else read
-	index: index of register
-	value: value to write to register
-	preset: if True it overrides value to write to register
-	
-	Returns: binary word
-	"""
-	global ramv
-	
-	if isinstance(rw, ReadWrite):
-		rw = rw.value
-	
-	if rw == 0:
-		return ramv[index]
-	if isinstance(preset,type(None)) == False:
-		ramv[index] = preset
-		return 
-	ramv[index] = value
-	return
-
-def reg(rw, index, reg_type, value=None, preset=None):
-	"""reg(rw, index, reg_type, value=None, preset=None) -> Handles register read/write
-	Parameters:
-	
-	rw: if True write else read
-	index: index of register
-	reg_type: type of register
-	value: value to write to register
-	preset: if True it overrides value to write to register
-	
-	Returns: binary word
-	"""
-	global regs
-	if isinstance(rw, ReadWrite):		#Read write enum
-		rw = rw.value
-	if isinstance(reg_type, RegType):	#Register type enum
-		reg_type = reg_type.value
-	if isinstance(reg_type, ALUConfig):
-		reg_type = reg_type.value
-	if isinstance(index, ProtReg):		#Protected register enum
-		index = index.value
-	if isinstance(index, ALUConfig):
-		index = index.value
-	
-	if rw == 0:
-		# lgn.debug("Reg: READ: %s:%s, %s" % (reg_type, index, bm.blts(regs[reg_type][index])))
-		return regs[reg_type][index]
-	if not isinstance(value[0], int):
-		lgn.critical("Register: Invalid type of register assignement.")
-		raise Exception
-	# lgn.debug("Reg: WRITE: %s:%s, %s" % (reg_type, index, bm.blts(value)))
-	regs[reg_type][index] = value
-
-#Further basic CPU info variables
-ena_list = reg(0, ProtReg.ENABLELIST, RegType.PROTECTED, bz)
-set_list = reg(0, ProtReg.SETLIST, RegType.PROTECTED, bz)
+class EmulatorRuntimeError(Enum):
+	ALUFAILED = "ALU: Unknown error."
+	ALUNOTINITIATED = "ALU: Couldn't initiate."
+	ILLEGALFUNCTION = "Offset: Illegal function called."
 
 #----------------------------------------------------------
 #Update ALU test for improved testing
 #Test ALU
 # try:
-	
+
 	# lgn.debug("ALU tested.")
 # except Exception:
 	# lgn.critical(EmulatorRuntimeError.ALUNOTINITIATED.value)
 	# return -1
 
-#Setup ALU
-################################################
-#Need update!
-################################################
-def alu():		#//Update for new ALU
-	"""alu() -> executes arithmetic and logic operations based on flags set and registers
-	Returns: return code: 1 for function completed succesfully or passes any errors
+def shift(num, leng, ud=1):
+	"""shift(num, leng, ud=1) -> Logical shift of num by leng bits, up if ud else down
+	Returns: shifted word, carry out bit
 	"""
-	global reg
-	spec_func_var = reg(ReadWrite.READ, ALUConfig.SPECIALFUNCTION, RegType.PROTECTED)
-	ena_list = reg(ReadWrite.READ, ProtReg.ENABLELIST, RegType.PROTECTED)
-	set_list = reg(ReadWrite.READ, ProtReg.SETLIST, RegType.PROTECTED)
-	ln = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
-	num_a = buf(0)
-	
-	if ena_list[ALUConfig.PROGRAMCOUNTERINCREMENT.value] or ena_list[ALUConfig.INCREMENT.value] or ena_list[ALUConfig.DECREMENT.value]:
-		num_b = bm.dtb(1)
-	else:
-		num_b = reg(ReadWrite.READ, ALUConfig.BREGISTER, RegType.ALU)
-	
-	func = reg(ReadWrite.READ, ALUConfig.ALUFUNCTION, RegType.ALU)
-	tmp = [0 for i in range(4)]
-	for i in range(4):
-		if func[i] == 1:
-			tmp[i] = 1
-	func = bm.blts(tmp)
-	tmp_a = bm.btd(num_a)
-	tmp_b = bm.btd(num_b)
-	co = 0
-	if tmp_a > tmp_b:
-		comp = [1,0,0]
-	elif tmp_a == tmp_b:
-		comp = [0,1,0]
-	else:
-		comp = [0,0,1]
-	q = []
-	if func == "0000" and 
-		ena_list[ALUConfig.DECREMENT.value] == 0 or 
-		ena_list[ALUConfig.INCREMENT.value]:	#Addition
-		q, co = g.la(num_a, num_b)
-	elif func == "1000" or 
-		ena_list[ALUConfig.DECREMENT.value]:	#Subraction
-		q, co = g.ls(num_a, num_b)
-	elif func == "0100":	#Multiplication
-		q = g.mul(num_a, num_b)
-	elif func == "1100":	#Divivision
-		q = g.div(num_a, num_b)
-	elif func == "0010":	#Logical and
-		q = g.al(num_a, num_b)
-	elif func == "1010":	#Logical or
-		q = g.ol(num_a, num_b)
-	elif func == "0110":	#Logical exclusive or
-		q = g.xl(num_a, num_b)
-	elif func == "1110":	#Logical not
-		q = g.nl(num_a)
-	elif func == "0001":	#Logical shift
-		if bm.btd(spec_func_var) == 1:
-			q, co = shift(num_b, bm.btd(num_a), 0)
-		else:
-			q, co = shift(num_b, bm.btd(num_a))
-	elif func == "1111":	#Compare
-		lgn.info("ALU: CMP")
-		q = num_b
-		lgn.info("ALU: %s cmp %s" % (bm.btd(num_a), bm.btd(num_b)))
-		lgn.info("CMP: %s" % (bm.blts(comp)))
-	else:					#Error
-		lgn.critical("ALU: Invalid function call at line %s" % (bm.btd(ln)))
-		raise Exception
-	
-	comp.append(co)
-	lgn.info("ALU: %s" % (comp))
-	reg(ReadWrite.WRITE, ProtReg.AOR, RegType.PROTECTED, q)
-	if set_list[ALUConfig.SETFLAGS.value]:
-		reg(ReadWrite.WRITE, ProtReg.FLAGS, RegType.PROTECTED, comp)
-	return 1
+	if ud == 1:
+		co = num >> (bw-leng) % bw & 1
+		if leng >= bw:			#Shifted out entirely, without building an integer leng bits long
+			return 0, co
+		return num << leng & wm, co
 
-def pci():
-	ena_list = reg(ReadWrite.READ, ProtReg.ENABLELIST, RegType.PROTECTED)
-	set_list = reg(ReadWrite.READ, ProtReg.SETLIST, RegType.PROTECTED)
-	
-	incremented_pc = bm.dtb(0)
-	
-	if ena_list[0]:
-		pc = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
-		WordOne = bm.dtb(1)
-		incremented_pc = g.la(pc, WordOne)[0]
-	
-	if set_list[0]:
-		reg(ReadWrite.WRITE, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED, incremented_pc)
+	co = num >> (leng-1) % bw & 1
+	if leng >= bw:
+		return 0, co
+	return num >> leng, co
 
 #Setup Processor
 FunctionDefinitionMetaInfo = [
@@ -326,34 +257,6 @@ FunctionDefinitionMetaInfo = [
 
 ]
 
-#Clear Registers
-def cls(r=0, g=0, b=0):
-	if b == 1:
-		buf(1, bz)
-	if r == 1:
-		ramv = [
-			bz for i in range(1024)
-		]
-	if g == 1:
-		for i, _ in enumerate(regs):
-			for j, _ in enumerate(regs[i]):
-				regs[i][j] = bz
-		clear_reg_offs()
-
-def clear_reg_offs():
-	global reg_offs
-	reg_offs = [[0 for i in range(32)] for i in range(2)]
-
-def pr(lst, gui=False):#Print function
-	if gui == True:
-		print(str(bm.blts(lst, False, True)))
-	elif gui == "not":
-		print(str(bm.btd(lst)))
-	elif gui == "bin":
-		print(bm.btbs(lst))
-	else:
-		print("Output: " + str(bm.btd(lst)))
-
 #Defining the functions pin outputs
 FunctionDefinitions = [
 	
@@ -570,330 +473,1674 @@ FunctionDefinitions = [
 	],
 ]
 
-#Set Set Pins
-#pci, pc, abr, cb, aor, rama, ramd, roma, gpioa, gpiod, flg, pid, reg_a, reg_b, reg_c, cui, sp, ism, if
-def set(list):		
-	reg(ReadWrite.WRITE, ProtReg.SETLIST, RegType.PROTECTED, list)
+#Set and enable pins left by the FETCH microcode
+fetch_set_list = bm.btd(FunctionDefinitions[0][0][-1], len(FunctionDefinitions[0][0][-1]))
+fetch_ena_list = bm.btd(FunctionDefinitions[1][0][-1], len(FunctionDefinitions[1][0][-1]))
+
+def sr(lst, comp, var_a=0):	#Should Run?
+	if lst & comp:
+		return var_a & 1
+	return 1 ^ var_a & 1
 
-#Set Enable Pins
-#pci, pc, aor, inc, decrement, ramd, romd, pid, gpi, reg_a, reg_b, reg_c, sp, ism, if
-def enable(list):		
-	reg(ReadWrite.WRITE, ProtReg.ENABLELIST, RegType.PROTECTED, list)
+#Where the different variables start in input space
+var_ofs = [0,4,5,9,11,18,25]
 
-def sr(lst, comp, var_a=[0]):	#Should Run?
-	for i, e in enumerate(lst):
-		if g.a(comp[i], lst[i]) == 1:
-			return g.x(0,var_a[0])
-	return g.x(1,var_a[0])
+#Length of variables
+var_lengs = [4,1,4,2,7,7,7]
+
+#ftch, alu, rom, ram, reg, stck, conbrnch, intrpt, callretrn
+#-----------------------------------------------------------------
+ofs_array		= [2, 4,8,10,14,16,18]
+ofs_use_var_a	= [0,1,0,0,0,0,0,1]
+ofs_use_var_b	= [1,0,1,1,0,0,1,0]
 
 #----------------------------------------------
 #Update for new function definitions!
 def ofs(func, instruction_vars):	#Offset
-	
-	if instruction_vars[RuntimeVariables.LOGICALALU.value][0] == 1:
+
+	if instruction_vars[RuntimeVariables.LOGICALALU.value] == 1:
 		return 1, 1
-	
-	#ftch, alu, rom, ram, reg, stck, conbrnch, intrpt, callretrn
-	#-----------------------------------------------------------------
-	ofs_array		= [2, 4,8,10,14,16,18]
-	ofs_use_var_a	= [0,1,0,0,0,0,0,1]
-	ofs_use_var_b	= [1,0,1,1,0,0,1,0]
-	
-	tl = []
+
+	dtl = 0
+	tl_leng = 0	#Amount of bits already placed in dtl
 	try:
 		if ofs_use_var_b[func]:
-			tl = bm.bla(tl, instruction_vars[RuntimeVariables.VARIABLEA.value])
+			dtl = instruction_vars[RuntimeVariables.VARIABLEA.value]
+			tl_leng = 4
 	except IndexError:
-		ProgramCounter = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
-		lgn.critical("Offset: Error: Program Counter: %s: Invalid function number." % (bm.btd(ProgramCounter)))
+		lgn.critical("Offset: Error: Function number %s: Invalid function number." % (func))
 		return EmulatorRuntimeError.ILLEGALFUNCTION, -1
 	if ofs_use_var_a[func]:
-		tl = bm.bla(tl, instruction_vars[RuntimeVariables.VARIABLEB.value])
-	
-	dtl = bm.btd(tl)
+		dtl |= instruction_vars[RuntimeVariables.VARIABLEB.value] << tl_leng
+
 	return ofs_array[func] + dtl, func+2
 
-def sa(bool):				#Set Address
-	if not bool:
-		return 
-		
-	iint = 0
-	for i, _ in enumerate(set_address):
-		execute(set_address[0][i], set_address[1][i], bm.btd(reg_a))
+def decode(inp):
+	"""decode(inp) -> Decodes an instruction word for the pre-decoded instruction cache
+	Parameters:
 
-def dump_rom():
-	global rom_data
-	print("\nDUMP ROM:")
-	for i, line in enumerate(rom_data):
-		print("%s: %s" % (i, bm.blts(line)))
-	print("\n")
-
-#Define actions dictated by set/enable pins
-def execute(set_list, ena_list, gui=False, 
-			variables=None):
-	"""execute(set_list, ena_list, gui=False, reg_a=[0,0], reg_b=[0,0], reg_c=[0,0]) -> Executes actions based on set/enable flags and registers
+	inp: instruction word
+
+	Returns: tuple of the runtime variables in RuntimeVariables order followed by the FunctionDefinitions offset and the meta function,
+	the offset and meta function being None if the word isn't a legal function, as data words in ROM usually aren't
+	"""
+	instruction_vars = [inp >> var_ofs[i] & (1 << e) - 1 for i, e in enumerate(var_lengs)]
+	func = instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value]
+
+	if instruction_vars[RuntimeVariables.LOGICALALU.value] == 1 or func < len(ofs_array):
+		_ofs, meta_func = ofs(func, instruction_vars)
+	else:
+		_ofs, meta_func = None, None
+	return tuple(instruction_vars) + (_ofs, meta_func)
+
+#Microcode compiler
+#Source code templates, {cpu} being the SchonCore instance, {prot} its protected registers,
+#{reg_a}, {reg_b} and {reg_c} the registers given by the instruction and {var_a} and {var_b} its variables
+#Source code run for every active enable pin, reading a word into var
+enable_pin_code = {
+	1: ["var = {prot}[%s]" % (ProtReg.PROGRAMCOUNTER.value)],		#pc
+	2: ["var = {prot}[%s]" % (ProtReg.AOR.value)],					#aor
+	5: ["var = {cpu}.ram(0, {prot}[%s])" % (ProtReg.RAMADDRESS.value)],	#ramd
+	6: [															#romd
+		"try:",
+		"	var = {cpu}.rom(0, {prot}[%s])" % (ProtReg.ROMADDRESS.value),
+		"except IndexError:",
+		"	lgn.critical(\"ROM: Error: Invalid program counter: %%s\" %% ({prot}[%s]))" % (ProtReg.ROMADDRESS.value),
+		"	raise IndexError",
+	],
+	7: ["var = {prot}[%s]" % (ProtReg.REGINTERMEDIATE.value)],		#Register intermediate data
+	8: ["var = {cpu}.gpio_read()"],									#gpi
+	9: ["var = {reg_a}"],											#rega
+	10: ["var = {reg_b}"],											#regb
+	11: ["var = {reg_c}"],											#regc
+	12: ["var = {prot}[%s]" % (ProtReg.STACKPOINTER.value)],		#stack pointer
+}
+#Source code run for every active set pin, writing var, in the order execute() handles them
+set_pin_code = [
+	(1, ["{prot}[%s] = var" % (ProtReg.PROGRAMCOUNTER.value)]),		#pc
+	(2, ["{cpu}.regs[%s][%s] = var" % (RegType.ALU.value, ALUConfig.BREGISTER.value)]),	#abr
+	(3, [															#conditional branch
+		"if {var_b} & 1 == 1 or {prot}[%s] & 0xF & {var_a} == 0:" % (ProtReg.FLAGS.value),
+		"	{prot}[%s] = var" % (ProtReg.PROGRAMCOUNTER.value),
+	]),
+	(4, ["{cpu}.alu()"]),											#aor
+	(5, ["{prot}[%s] = var" % (ProtReg.RAMADDRESS.value)]),			#rama
+	(6, ["{cpu}.ram(1, {prot}[%s], var)" % (ProtReg.RAMADDRESS.value)]),	#ramd
+	(7, ["{prot}[%s] = var" % (ProtReg.ROMADDRESS.value)]),			#roma
+	(8, ["{cpu}.gpio_address = var"]),								#gpoa
+	(9, ["{cpu}.pr(var, gui)"]),									#gpod
+	(11, ["{prot}[%s] = var" % (ProtReg.REGINTERMEDIATE.value)]),	#pid
+	(12, ["{reg_a} = var"]),										#rega
+	(13, ["{reg_b} = var"]),										#regb
+	(14, ["{reg_c} = var"]),										#regc
+	(15, ["{prot}[%s] = var" % (ProtReg.CONTROLUNITINPUT.value)]),	#cui
+	(16, ["{prot}[%s] = var" % (ProtReg.STACKPOINTER.value)]),		#sp
+]
+
+#Template fields for micro-ops taking the instruction variables at runtime
+runtime_fields = {
+	"cpu": "cpu",
+	"prot": "cpu.regs[%s]" % (RegType.PROTECTED.value),
+	"reg_a": "cpu.regs[variables[%s] & 0b11][variables[%s] >> 2]" % ((RuntimeVariables.REGISTERA.value,)*2),
+	"reg_b": "cpu.regs[variables[%s] & 0b11][variables[%s] >> 2]" % ((RuntimeVariables.REGISTERB.value,)*2),
+	"reg_c": "cpu.regs[variables[%s] & 0b11][variables[%s] >> 2]" % ((RuntimeVariables.REGISTERC.value,)*2),
+	"var_a": "variables[%s]" % (RuntimeVariables.VARIABLEA.value),
+	"var_b": "variables[%s]" % (RuntimeVariables.VARIABLEB.value),
+}
+
+def micro_op_source(set_list, ena_list, fields, enable_code=enable_pin_code, set_code=set_pin_code):
+	"""micro_op_source(set_list, ena_list, fields, enable_code=enable_pin_code, set_code=set_pin_code) -> Generates source code for only the active pins of a row of FunctionDefinitions
 	Parameters:
-	
+
+	set_list: List of flags to set
+	ena_list: List of flags to enable
+	fields: dict of source code filled into the templates
+	enable_code/set_code: source code templates of the pins, in the form of enable_pin_code and set_pin_code
+
+	Returns: list of lines reading var, list of lines writing var
+	"""
+	ram_address = "{prot}[%s]" % (ProtReg.RAMADDRESS.value)
+	read_lines = []
+	for i, e in enumerate(ena_list):
+		if e and i in enable_code:
+			read_lines += [line.format(**fields) for line in enable_code[i]]
+			if i == 5 and trace_memory:		#ramd
+				read_lines.append(("trace_log.debug(\"RAMD: %%s READS %%s\" %% (%s, var))" % (ram_address)).format(**fields))
+	write_lines = []
+	for i, code in set_code:
+		if set_list[i]:
+			if i == 6 and trace_memory:		#ramd
+				write_lines.append(("trace_log.debug(\"RAMD: %%s -> %%s\" %% (%s, var))" % (ram_address)).format(**fields))
+			write_lines += [line.format(**fields) for line in code]
+	if set_list[8] and trace_memory:	#gpoa
+		write_lines.append("trace_log.debug(\"Set GPIO Address: %s\" % (var))")
+	if set_list[0]:		#pci
+		if ena_list[0]:
+			write_lines.append("{prot}[{pc}] = {prot}[{pc}] + 1 & wm".format(pc=ProtReg.PROGRAMCOUNTER.value, **fields))
+		else:
+			write_lines.append("{prot}[{pc}] = 0".format(pc=ProtReg.PROGRAMCOUNTER.value, **fields))
+	return read_lines, write_lines
+
+def compile_source(lines, name):
+	"""compile_source(lines, name) -> Compiles generated lines defining the function name in the emulator's namespace
+	"""
+	namespace = dict()
+	exec(compile("\n".join(lines) + "\n", "<%s>" % (name), "exec"), globals(), namespace)
+	return namespace[name]
+
+def compile_micro_op(set_list, ena_list, name="micro_op"):
+	"""compile_micro_op(set_list, ena_list, name="micro_op") -> Compiles a row of FunctionDefinitions into a function doing only its active pins
+	Parameters:
+
 	set_list: List of flags to set
 	ena_list: List of flags to enable
-	gui: True: output as little endian binary digits, 
-		 "not": Converts to int then prints output
-		 "bin": outputs as big endian binary digits 
-		 else: converts to int then prints("Output: " + int)
-	reg_a/reg_b/reg_c: registers indentified by [index, type]
+	name: name of the generated function
+
+	Returns: function(cpu, gui, variables) with the same effect as cpu.execute(set_list, ena_list, gui, variables)
 	"""
-	global reg_offs
-	global buf
-	set(set_list)
-	enable(ena_list)
-	var = bz
-	
-	try:
-		reg_a = variables[RuntimeVariables.REGISTERA.value]
-		reg_b = variables[RuntimeVariables.REGISTERB.value]
-		reg_c = variables[RuntimeVariables.REGISTERC.value]
-		
-		reg_a = [bm.btd(reg_a[2:]),bm.btd(reg_a[:2])]
-		reg_b = [bm.btd(reg_b[2:]),bm.btd(reg_b[:2])]
-		reg_c = [bm.btd(reg_c[2:]),bm.btd(reg_c[:2])]
-	except Exception:
-		pass
-	
-	#Enable actions:
-	# if ena_list[0]:		#pci
-		# pci()
-	if ena_list[1]:		#pc
-		var = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
-	if ena_list[2]:		#aor 
-		var = reg(ReadWrite.READ, ProtReg.AOR, RegType.PROTECTED)
-	if ena_list[5]:		#ramd 
-		tmp = reg(ReadWrite.READ, ProtReg.RAMADDRESS, RegType.PROTECTED)
-		var = ram(ReadWrite.READ, bm.btd(tmp), "RAMD ENABLE EXECUTE()")
-		lgn.debug("RAMD: %s READS %s" % (bm.btd(tmp), bm.blts(var)))
-	if ena_list[6]:		#romd 
-		tmp = reg(ReadWrite.READ, ProtReg.ROMADDRESS, RegType.PROTECTED)
-		try:
-			var = rom(0, bm.btd(tmp))
-		except IndexError:
-			temp = reg(ReadWrite.READ, ProtReg.ROMADDRESS, RegType.PROTECTED)
-			lgn.critical("ROM: Error: Invalid program counter: %s" % (bm.btd(temp)))
-			raise IndexError
-	if ena_list[7]:		#Register intermediate data
-		var = reg(ReadWrite.READ, ProtReg.REGINTERMEDIATE, RegType.PROTECTED)
-	if ena_list[8]:		#gpi 
-		var = bm.dtb(int(input("Number: ")))
-	if ena_list[9]:		#rega 
-		lgn.debug("Execute: REGB: %s:%s" % (reg_a[0], reg_a[1]))
-		var = reg(ReadWrite.READ, reg_a[0], reg_a[1])
-	if ena_list[10]:	#regb 
-		lgn.debug("Execute: REGB: %s:%s" % (reg_b[0], reg_b[1]))
-		var = reg(ReadWrite.READ, reg_b[0], reg_b[1])
-	if ena_list[11]:	#regc
-		var = reg(ReadWrite.READ, reg_c[0], reg_c[1])
-	if ena_list[12]:	#stack pointer
-		var = reg(ReadWrite.READ, ProtReg.STACKPOINTER, RegType.PROTECTED)
-	
-	buf(1,var)
-	# lgn.debug("BUFFER:%s" % (bm.blts(var)))
-	
-	#Set actions:
-	if set_list[1]:	#pc
-		reg(ReadWrite.WRITE, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED, var)
-	if set_list[2]:	#abr
-		temp = buf(0)
-		lgn.debug("Execute: ALU B Register: %s" % (bm.btd(temp)))
-		reg(ReadWrite.WRITE, ALUConfig.BREGISTER, RegType.ALU, var)
-	if set_list[3]:	#conditional branch
-		comparison = reg(ReadWrite.READ, ProtReg.FLAGS, RegType.PROTECTED)
-		if isinstance(variables[2], type(None)):
-			lgn.critical("Execute: Comparison variable not given.")
-			raise TypeError
-		lgn.info("CB: %s, %s" % (bm.blts(comparison[0:4]), bm.blts(variables[2])))
-		if variables[3][0] == 1 or bm.btd(g.al(comparison[0:4], variables[2])) == 0:
-			lgn.info("Conditional Branch: BRANCHED.")
-			reg(ReadWrite.WRITE, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED, var)
-	if set_list[4]:	#aor
-		alu_r = alu()
-		if alu_r != 1:
-			lgn.warning(EmulatorRuntimeError.ALUFAILED.value)
-			raise Exception
-	if set_list[5]:	#rama
-		reg(ReadWrite.WRITE, ProtReg.RAMADDRESS, RegType.PROTECTED, var)
-	if set_list[6]:	#ramd
-		tmp = reg(ReadWrite.READ, ProtReg.RAMADDRESS, RegType.PROTECTED)
-		lgn.debug("RAMD: %s -> %s" % (bm.btd(tmp), bm.blts(var)))
-		ram(ReadWrite.WRITE, bm.btd(tmp), var)
-	if set_list[7]:	#roma
-		reg(ReadWrite.WRITE, ProtReg.ROMADDRESS, RegType.PROTECTED, var)
-	if set_list[8]:	#gpoa
-		lgn.info("Set GPIO Address: %s" % (bm.btd(var)))
-	if set_list[9]:	#gpod
-		pr(var, gui)
-	if set_list[11]:	#pid
-		temp = reg(ReadWrite.READ, reg_a[0], reg_a[1])
-		lgn.debug("RID: %s:%s -> %s" % (reg_b[0], reg_b[1], bm.btd(temp)))
-		reg(ReadWrite.WRITE, ProtReg.REGINTERMEDIATE, RegType.PROTECTED, var)
-	if set_list[12]:	#rega
-		temp_pc = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
-		lgn.debug("SET: %s:%s = %s @ PC: %s" % (reg_a[0], reg_a[1], bm.btd(var), bm.btd(temp_pc)))
-		lgn.debug("ENABLELIST: %s\nSETLIST: %s" % (bm.blts(ena_list), bm.blts(set_list)))
-		reg(ReadWrite.WRITE, reg_a[0], reg_a[1], var)
-	if set_list[13]:	#regb
-		reg(ReadWrite.WRITE, reg_b[0], reg_b[1], var)
-	if set_list[14]:	#regc
-		reg(ReadWrite.WRITE, reg_c[0], reg_c[1], var)
-	if set_list[15]:	#cui
-		reg(ReadWrite.WRITE, ProtReg.CONTROLUNITINPUT, RegType.PROTECTED, var)
-	if set_list[16]:	#sp
-		reg(ReadWrite.WRITE, ProtReg.STACKPOINTER, RegType.PROTECTED, var)
-	if set_list[0]:
-		pci()
-
-#Run Single Instruction
-def single_instruction(reset=0, gui=False, 
-					   print_line_nr=False, 
-					   force_show_exceptions=False):
-	"""single_instruction(r=0,gui=False, print_line_nr=False, force_show_exceptions=False) -> Runs a single instruction
+	read_lines, write_lines = micro_op_source(set_list, ena_list, runtime_fields)
+	lines = [
+		"def %s(cpu, gui, variables):" % (name),
+		"	cpu.regs[%s][%s] = %s" % (RegType.PROTECTED.value, ProtReg.SETLIST.value, bm.btd(set_list, len(set_list))),
+		"	cpu.regs[%s][%s] = %s" % (RegType.PROTECTED.value, ProtReg.ENABLELIST.value, bm.btd(ena_list, len(ena_list))),
+		"	var = bz",
+	]
+	lines += ["	" + line for line in read_lines]
+	lines.append("	cpu.buffer = var")
+	if trace_micro_op:
+		lines.append("	trace_log.debug(\"%s: BUFFER: %%s\" %% (var))" % (name))
+	lines += ["	" + line for line in write_lines]
+	return compile_source(lines, name)
+
+def compile_function_definitions():
+	"""compile_function_definitions() -> Compiles FunctionDefinitions into micro-op functions, indexed the same way as FunctionDefinitions[0]
+	"""
+	return [
+		[compile_micro_op(row, FunctionDefinitions[1][i][j], "micro_op_%s_%s" % (i, j)) for j, row in enumerate(function)]
+		for i, function in enumerate(FunctionDefinitions[0])
+	]
+
+CompiledFunctionDefinitions = compile_function_definitions()
+
+#Basic block translation
+block_hot_threshold = 2		#Times a program counter is reached before its block is translated
+max_block_length = 64		#Most instructions translated into one block
+
+def ends_block(_ofs):
+	"""ends_block(_ofs) -> True if the function at offset _ofs of FunctionDefinitions may set the program counter to anything but the next word
+	"""
+	for i, set_list in enumerate(FunctionDefinitions[0][_ofs]):
+		if set_list[1] or set_list[3] or (set_list[0] and not FunctionDefinitions[1][_ofs][i][0]):
+			return True
+	return False
+
+def words_used(_ofs):
+	"""words_used(_ofs) -> Amount of ROM words the function at offset _ofs of FunctionDefinitions steps the program counter past
+	"""
+	q = 1	#Fetch
+	for i, set_list in enumerate(FunctionDefinitions[0][_ofs]):
+		if set_list[0] and FunctionDefinitions[1][_ofs][i][0]:
+			q += 1
+	return q
+
+def reads_gpio(_ofs):
+	"""reads_gpio(_ofs) -> True if the function at offset _ofs of FunctionDefinitions reads GPIO input
+	"""
+	for ena_list in FunctionDefinitions[1][_ofs]:
+		if ena_list[8]:		#gpi
+			return True
+	return False
+
+#Offsets of FunctionDefinitions reading GPIO input
+gpio_read_offsets = set([_ofs for _ofs, _ in enumerate(FunctionDefinitions[0]) if reads_gpio(_ofs)])
+
+def writes_ram(_ofs):
+	"""writes_ram(_ofs) -> True if the function at offset _ofs of FunctionDefinitions writes a RAM word
+	"""
+	for set_list in FunctionDefinitions[0][_ofs]:
+		if set_list[6]:		#ramd
+			return True
+	return False
+
+def written_registers(instruction_vars):
+	"""written_registers(instruction_vars) -> Set of the registers, as (index, register type), a decoded instruction may write,
+	not counting the protected registers, which any instruction may write
+	"""
+	q = builtins.set()
+	if instruction_vars[RuntimeVariables.LOGICALALU.value] == 1:
+		q.add((ALUConfig.ALUFUNCTION.value, RegType.ALU.value))
+	_ofs = instruction_vars[len(var_lengs)]
+	if _ofs == None:
+		return q
+	for set_list in FunctionDefinitions[0][_ofs]:
+		if set_list[2]:		#abr
+			q.add((ALUConfig.BREGISTER.value, RegType.ALU.value))
+		for pin, variable in ((12, RuntimeVariables.REGISTERA), (13, RuntimeVariables.REGISTERB), (14, RuntimeVariables.REGISTERC)):
+			if set_list[pin]:	#rega, regb, regc
+				e = instruction_vars[variable.value]
+				q.add((e >> 2, e & 0b11))
+	return q
+
+#ALU functions on integer words, function(num_a, num_b, special function) -> (result, carry out), the result masked by alu()
+#Subtraction adds the complement of num_b and one, so carry out is 1 when num_a >= num_b and 0 on a borrow
+alu_functions = [
+	lambda a, b, sf: (a + b, a + b >> bw),								#Addition
+	lambda a, b, sf: (a + (~b & wm) + 1, a + (~b & wm) + 1 >> bw),		#Subraction
+	lambda a, b, sf: (a * b, 0),										#Multiplication
+	lambda a, b, sf: (a // b, 0),										#Divivision
+	lambda a, b, sf: (a & b, 0),										#Logical and
+	lambda a, b, sf: (a | b, 0),										#Logical or
+	lambda a, b, sf: (a ^ b, 0),										#Logical exclusive or
+	lambda a, b, sf: (~a, 0),											#Logical not
+	lambda a, b, sf: shift(b, a, 0 if sf == 1 else 1),					#Logical shift, down if the special function is 1
+	None, None, None, None, None, None,
+	lambda a, b, sf: (b, 0),											#Compare
+]
+
+#Enable pins making the ALU use 1 for num_b
+alu_increment_mask = 1 << ALUConfig.PROGRAMCOUNTERINCREMENT.value | 1 << ALUConfig.INCREMENT.value | 1 << ALUConfig.DECREMENT.value
+
+def alu_flags(num_a, num_b, co):
+	"""alu_flags(num_a, num_b, co) -> Flags word: greater than, equal, less than and carry from bit 0 up
+	"""
+	if num_a > num_b:
+		return 0b001 | co << 3
+	if num_a == num_b:
+		return 0b010 | co << 3
+	return 0b100 | co << 3
+
+def alu_gate_level(func, num_a, num_b, spec_func_var=0):
+	"""alu_gate_level(func, num_a, num_b, spec_func_var=0) -> Reference result of an ALU function through GateLevel
 	Parameters:
-	
-	r: Reset registers and flags
-	gui: True: output as little endian binary digits, 
-		 "not": Converts to int then prints output
-		 "bin": outputs as big endian binary digits 
-		 else: converts to int then prints("Output: " + int)
-	print_line_nr: if True prints binary line numbers to terminal
-	force_show_exceptions: Quirks in how it handles variables might create exceptions which can be shown for debugging reasons
-	
-	Returns: error code: -1 for error, 0 for instruction completed but continue and 1 for completed and exit
+
+	func: ALU function code
+	num_a: buffer word
+	num_b: ALU B register word
+	spec_func_var: special function, 1 shifts down
+
+	Returns: result word, carry out
 	"""
-	global reg
-	
-	#Handle reset
-	if reset == 1:	#Reset
-		cls(1,1,1)
-		if force_show_exceptions:
-			lgn.debug("Cleared registers")
+	la = bm.dtb(num_a)
+	lb = bm.dtb(num_b)
+	if func == 0b0000:
+		q, co = g.la(la, lb)
+	elif func == 0b0001:
+		q, co = g.ls(la, lb)
+	elif func == 0b0010:
+		q, co = g.mul(la, lb), 0
+	elif func == 0b0011:
+		q, co = g.div(la, lb), 0
+	elif func == 0b0100:
+		q, co = g.al(la, lb), 0
+	elif func == 0b0101:
+		q, co = g.ol(la, lb), 0
+	elif func == 0b0110:
+		q, co = g.xl(la, lb), 0
+	elif func == 0b0111:
+		q, co = g.nl(la), 0
+	elif func == 0b1000:
+		if num_a >= bw:
+			return shift(num_b, num_a, 0 if spec_func_var == 1 else 1)	#GateLevel.shift only covers shifts within the word
+		q, co = g.shift(lb, num_a, 0 if spec_func_var == 1 else 1)
+	elif func == 0b1111:
+		q, co = lb, 0
+	else:
+		return None
+	return bm.btd(q), co
+
+def verify_alu(samples=1000, seed=0):
+	"""verify_alu(samples=1000, seed=0) -> Checks alu_functions against alu_gate_level() on random and edge case words
+	Returns: list of (function code, num_a, num_b, special function, result, reference result) that differ
+	"""
+	import random
+	rand = random.Random(seed)
+	edges = [0, 1, 2, bw - 1, bw, wm >> 1, (wm >> 1) + 1, wm - 1, wm]
+	pairs = [(a, b) for a in edges for b in edges] + [(rand.randrange(wm + 1), rand.randrange(wm + 1)) for _ in range(samples)]
+	mismatches = []
+	for func, alu_function in enumerate(alu_functions):
+		if alu_function == None:
+			continue
+		for num_a, num_b in pairs:
+			if func == 0b0011 and num_b == 0:
+				continue
+			if func == 0b1000:
+				num_a %= bw + 1
+			for spec_func_var in (0, 1):
+				q, co = alu_function(num_a, num_b, spec_func_var)
+				reference = alu_gate_level(func, num_a, num_b, spec_func_var)
+				if (q & wm, co) != reference:
+					mismatches.append((func, num_a, num_b, spec_func_var, (q & wm, co), reference))
+	return mismatches
+
+#Names of the ALU function codes, by FUNCTIONVARIABLE
+alu_function_names = {
+	0b0000: "ADD",
+	0b0001: "SUB",
+	0b0010: "MUL",
+	0b0011: "DIV",
+	0b0100: "AND",
+	0b0101: "OR",
+	0b0110: "XOR",
+	0b0111: "NOT",
+	0b1000: "SHIFT",
+	0b1111: "CMP",
+}
+
+class Profile:
+	"""Profile() -> Executions, micro-op rows run and host time per meta function of FunctionDefinitionMetaInfo,
+	ALU instructions counted per ALU function code as "ALU.ADD", "ALU.SUB" and so on
+	"""
+
+	def __init__(self):
+		self.entries = dict()	#Name -> [executions, micro-op rows, seconds]
+
+	def name(self, instruction_vars):
+		"""name(instruction_vars) -> Name an instruction decoded by decode() is counted under
+		"""
+		meta_func = instruction_vars[-1]
+		if meta_func == 1:	#ALU
+			func = instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value]
+			return "ALU." + alu_function_names.get(func, str(func))
+		return FunctionDefinitionMetaInfo[meta_func]
+
+	def record(self, instruction_vars, seconds):
+		"""record(instruction_vars, seconds) -> Counts one execution of an instruction decoded by decode() taking seconds
+		"""
+		entry = self.entries.get(self.name(instruction_vars))
+		if entry == None:
+			entry = [0, 0, 0.0]
+			self.entries[self.name(instruction_vars)] = entry
+		entry[0] += 1
+		entry[1] += len(FunctionDefinitions[0][instruction_vars[-2]])
+		entry[2] += seconds
+
+	def results(self):
+		"""results() -> List of dicts of name, executions, micro-op rows, seconds and share of the total seconds, most seconds first
+		"""
+		total = sum([e[2] for e in self.entries.values()]) or 1.0
+		return [
+			{"name": name, "executions": e[0], "micro_ops": e[1], "seconds": e[2], "share": e[2] / total}
+			for name, e in sorted(self.entries.items(), key=lambda item: item[1][2], reverse=True)
+		]
+
+	def report(self):
+		"""report() -> Table of results() as a string
+		"""
+		lines = ["%-24s %12s %12s %12s %7s" % ("Function", "Executions", "Micro-ops", "Seconds", "Share")]
+		for e in self.results():
+			lines.append("%-24s %12s %12s %12.6f %6.2f%%" % (e["name"], e["executions"], e["micro_ops"], e["seconds"], e["share"] * 100))
+		return "\n".join(lines)
+
+	def to_json(self):
+		return json.dumps(self.results(), indent=2)
+
+	def save_json(self, file_path):
+		with open(file_path, "w") as fh:
+			fh.write(self.to_json())
+
+class PagedRAM:
+	"""PagedRAM(size=ram_size, max_words=max_ram_words, page_bits=ram_page_bits) -> Sparse Random Access Memory of fixed size word array pages
+	Pages are kept in a page table dict keyed by address >> page_bits and only allocated when written to,
+	reading a word of a page never written returns bz without allocating it
+	Parameters:
+
+	size: amount of addressable words
+	max_words: most words allocated at once, writing to a new page past it raises MemoryError, None for no limit
+	page_bits: words per page as a power of two
+	"""
+
+	def __init__(self, size=ram_size, max_words=max_ram_words, page_bits=ram_page_bits):
+		self.size = size
+		self.page_bits = page_bits
+		self.page_mask = (1 << page_bits) - 1
+		if max_words == None:
+			self.max_pages = None
+		else:
+			self.max_pages = max_words >> page_bits
+		self.pages = dict()		#Page table
+		self.empty_page = array("I", [bz]) * (1 << page_bits)	#Never written to, read in place of missing pages
+		self.peak_pages = 0
+
+	def page(self, index):
+		"""page(index) -> The page holding address index, allocating it if it's missing
+		"""
+		page = self.pages.get(index >> self.page_bits)
+		if page != None:
+			return page
+		if not 0 <= index < self.size:
+			raise IndexError("RAM: Address %s outside of %s words of RAM." % (index, self.size))
+		if self.max_pages != None and len(self.pages) >= self.max_pages:
+			lgn.critical("RAM: Error: Memory cap of %s pages reached writing address %s." % (self.max_pages, index))
+			raise MemoryError("RAM: Memory cap of %s pages reached." % (self.max_pages))
+		page = self.empty_page[:]
+		self.pages[index >> self.page_bits] = page
+		self.peak_pages = max(self.peak_pages, len(self.pages))
+		return page
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(self.size))]
+		page = self.pages.get(index >> self.page_bits)
+		if page == None:
+			if not 0 <= index < self.size:
+				raise IndexError("RAM: Address %s outside of %s words of RAM." % (index, self.size))
+			return bz
+		return page[index & self.page_mask]
+
+	def __setitem__(self, index, value):
+		self.page(index)[index & self.page_mask] = value
+
+	def __len__(self):
+		return self.size
+
+	def stats(self):
+		"""stats() -> Page allocation statistics
+		Returns: dict of page size in words, pages allocated now and at most, page cap and words and bytes allocated now
+		"""
+		return {
+			"page_words": 1 << self.page_bits,
+			"pages": len(self.pages),
+			"peak_pages": self.peak_pages,
+			"max_pages": self.max_pages,
+			"words": len(self.pages) << self.page_bits,
+			"bytes": (len(self.pages) << self.page_bits) * self.empty_page.itemsize,
+		}
+
+class WatchedRAM:
+	"""WatchedRAM(ram, addresses) -> Passes writes on to ram, e.g. a PagedRAM, keeping the word a watched address held before its first write in written,
+	addresses being the set of watched addresses, so only writes to them cost more than a set lookup
+	"""
+
+	def __init__(self, ram, addresses):
+		self.ram = ram
+		self.addresses = addresses
+		self.written = dict()		#Old word by watched address written since the last check
+
+	def __getitem__(self, index):
+		return self.ram[index]
+
+	def __setitem__(self, index, value):
+		if index in self.addresses and index not in self.written:
+			self.written[index] = self.ram[index]
+		self.ram[index] = value
+
+	def __len__(self):
+		return len(self.ram)
+
+	def __getattr__(self, name):
+		return getattr(self.ram, name)
+
+#Snapshots of a SchonCore, see SchonCore.save_state()
+#Header: magic, version, bit width, instruction count, buffer, RAM size, RAM page bits, RAM pages, ROM words, ROM SHA-256 and GPIO address,
+#followed by the ROM path, the register banks and the RAM pages, all little endian
+snapshot_magic = b"SCHS"
+snapshot_version = 2
+snapshot_header = struct.Struct("<4sHHQQQIII32sQ")
+
+def little_endian_bytes(words):
+	"""little_endian_bytes(words) -> Words as little endian unsigned 32 bit integers
+	"""
+	words = array("I", words)
+	if sys.byteorder == "big":
+		words.byteswap()
+	return words.tobytes()
+
+def array_from_little_endian(data):
+	"""array_from_little_endian(data) -> Array of the little endian unsigned 32 bit integers in data
+	"""
+	words = array("I")
+	words.frombytes(data)
+	if sys.byteorder == "big":
+		words.byteswap()
+	return words
+
+watchdog_interval = 4096	#Instructions between checks of the run limits of resume()
+
+#Protected registers every fetch writes, left out of execution traces
+unrecorded_registers = set([e.value for e in (ProtReg.PROGRAMCOUNTER, ProtReg.ENABLELIST, ProtReg.SETLIST, ProtReg.CONTROLUNITINPUT, ProtReg.ROMADDRESS)])
+
+class SchonCore:
+	"""SchonCore(ram_size=ram_size, input_function=None, output_function=None, max_ram_words=max_ram_words, gpio=None) -> One Schön Core Alpha Pro CPU instance
+	Parameters:
+
+	ram_size: amount of words of Random Access Memory emulated
+	max_ram_words: most words of RAM allocated at once, see PagedRAM
+	input_function: function(prompt) returning GPIO input, input() if None
+	output_function: function(string) handling GPIO output, print() if None
+	gpio: GPIO backend, see GPIO.py, replacing input_function and output_function if given
+	"""
+
+	def __init__(self, ram_size=ram_size, input_function=None, output_function=None, max_ram_words=max_ram_words, gpio=None):
+		self.ram_size = ram_size
+		self.max_ram_words = max_ram_words
+		if gpio == None:
+			gpio = GPIO.CallbackGPIO(input_function, output_function)
+		self.gpio = gpio
+		self.gpio_address = bz		#GPIO port set by gpoa
+
+		self.rom_data = array("I")
+		self.decoded_rom = []		#Pre-decoded instruction cache, indexed by program counter
+		self.block_cache = dict()	#Translated basic blocks as (function, amount of instructions, program counter of the last one), keyed by start program counter
+		self.block_hits = dict()	#Times the interpreter reached each program counter
+
+		#RAM emulated through lazily allocated pages of words
+		self.ramv = PagedRAM(ram_size, max_ram_words)
+
+		#Internal registers emulated as list of word arrays
+		self.regs = [
+			array("I", [bz]) * 32,	#General Purpose Registers
+			array("I", [bz]) * 32,	#Arithmetic/Logic Unit Registers
+			array("I", [bz]) * 32,	#Stack Pointers
+			array("I", [bz]) * 10,	#Special Purpose Internal CU Register
+		]
+		self.reg_offs = array("I", [bz]) * 2
+		self.buffer = bz
+		self.instruction_count = 0	#Instructions run since the program was loaded
+		self.profile = None			#Profile of the last run() with profile
+		self.rom_path = None		#File the ROM was read from, kept in snapshots
+
+		#Debugger, resume() only checks these while any are set
+		self.breakpoints = dict()		#Break condition, function(cpu) or None for always, by program counter
+		self.ram_watchpoints = builtins.set()		#Watched RAM addresses
+		self.register_watchpoints = builtins.set()	#Watched registers as (index, register type)
+		self.watch_writes = dict()			#Watched registers and RAM the instruction may write, by program counter, see watched_writes()
+		self.last_break = None			#BreakEvent resume() last stopped at
+		self.run_stats = None			#RunStats of the last resume()
+
+	def initialize_rom(self, Filename: str):
+		"""initialize_rom() -> initializes Read Only Memory by reading file given at "rom/fn.txt" and writes the data to rom_data
+		"""
+		rom_fh = open(bf + exeff + Filename + file_extension_name, "r")
+		rom_data_temp = rom_fh.readlines()
+		rom_fh.close()
+
+		return self.load_rom(rom_data_temp)
+
+	def load_rom(self, lines: list):
+		"""load_rom(lines: list) -> Writes the lines of a .schonexe1 file to rom_data and decodes them
+		"""
+		return self.load_rom_words(array("I", [word(line) for line in lines]))
+
+	def load_rom_words(self, words):
+		"""load_rom_words(words) -> Uses words, an array or memoryview of integer words such as BinaryFormat.load_words() returns, as rom_data and decodes them
+		"""
+		self.rom_data = words
+		self.decode_rom()
+		self.clear_block_cache()
+		self.instruction_count = 0
+		return 1
+
+	def decode_rom(self):
+		"""decode_rom() -> Decodes every word of rom_data once into decoded_rom, indexed by program counter
+		"""
+		self.decoded_rom = [decode(inp) for inp in self.rom_data]
+
+	def clear_block_cache(self):
+		self.block_cache = dict()
+		self.block_hits = dict()
+		self.watch_writes = dict()
+
+	#Functions to manage buffer, registers and other memory storage units
+	def buf(self, rw, list=bz):
+		if rw == 0:
+			return self.buffer
+
+		self.buffer = list
+
+	def rom(self, rw, index):
+		if rw == 1:
+			return
+
+		return self.rom_data[index]
+
+	def ram(self, rw, index, value=None, preset=None):
+		"""ram(rw, index, value=None, preset=None) -> Handles Random Access Memory read/write
+		Parameters:
+
+		rw: if True write else read
+		index: index of register
+		value: value to write to register
+		preset: if True it overrides value to write to register
+
+		Returns: integer word
+		"""
+		if isinstance(rw, ReadWrite):
+			rw = rw.value
+
+		if rw == 0:
+			return self.ramv[index]
+		if isinstance(preset,type(None)) == False:
+			self.ramv[index] = preset
+			return
+		self.ramv[index] = value
+		return
+
+	def reg(self, rw, index, reg_type, value=None, preset=None):
+		"""reg(rw, index, reg_type, value=None, preset=None) -> Handles register read/write
+		Parameters:
+
+		rw: if True write else read
+		index: index of register
+		reg_type: type of register
+		value: value to write to register
+		preset: if True it overrides value to write to register
+
+		Returns: integer word
+		"""
+		if isinstance(rw, Enum):			#Read write enum
+			rw = rw.value
+		if isinstance(reg_type, Enum):		#Register type or ALU config enum
+			reg_type = reg_type.value
+		if isinstance(index, Enum):			#Protected register or ALU config enum
+			index = index.value
+
+		if rw == 0:
+			# lgn.debug("Reg: READ: %s:%s, %s" % (reg_type, index, bm.blts(bm.dtb(self.regs[reg_type][index]))))
+			return self.regs[reg_type][index]
+		if not isinstance(value, int):
+			lgn.critical("Register: Invalid type of register assignement.")
+			raise Exception
+		# lgn.debug("Reg: WRITE: %s:%s, %s" % (reg_type, index, bm.blts(bm.dtb(value))))
+		self.regs[reg_type][index] = value & wm
+
+	#Setup ALU
+	################################################
+	#Need update!
+	################################################
+	def alu(self):		#//Update for new ALU
+		"""alu() -> executes arithmetic and logic operations based on flags set and registers, through alu_functions
+		Returns: return code: 1 for function completed succesfully or passes any errors
+		"""
+		prot = self.regs[RegType.PROTECTED.value]
+		ena_list = prot[ProtReg.ENABLELIST.value]
+		num_a = self.buffer
+
+		if ena_list & alu_increment_mask:
+			num_b = 1
+		else:
+			num_b = self.regs[RegType.ALU.value][ALUConfig.BREGISTER.value]
+
+		if ena_list >> ALUConfig.INCREMENT.value & 1:
+			func = 0b0000
+		elif ena_list >> ALUConfig.DECREMENT.value & 1:
+			func = 0b0001
+		else:
+			func = self.regs[RegType.ALU.value][ALUConfig.ALUFUNCTION.value] & 0xF
+		alu_function = alu_functions[func]
+		if alu_function == None:
+			lgn.critical("ALU: Invalid function call at line %s" % (prot[ProtReg.PROGRAMCOUNTER.value]))
+			raise Exception
+		q, co = alu_function(num_a, num_b, prot[ALUConfig.SPECIALFUNCTION.value])
+
+		prot[ProtReg.AOR.value] = q & wm
+		#Flags are only worked out when they're set
+		if prot[ProtReg.SETLIST.value] >> ALUConfig.SETFLAGS.value & 1:
+			prot[ProtReg.FLAGS.value] = alu_flags(num_a, num_b, co)
+		if trace_micro_op:
+			trace_log.debug("ALU: function %s: %s, %s -> %s, flags %s" % (func, num_a, num_b, q & wm, bm.blts(bm.dtb(alu_flags(num_a, num_b, co), 4))))
+		return 1
+
+	def pci(self):
+		ena_list = self.reg(ReadWrite.READ, ProtReg.ENABLELIST, RegType.PROTECTED)
+		set_list = self.reg(ReadWrite.READ, ProtReg.SETLIST, RegType.PROTECTED)
+
+		incremented_pc = 0
+
+		if ena_list & 1:
+			pc = self.reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
+			incremented_pc = pc + 1 & wm
+
+		if set_list & 1:
+			self.reg(ReadWrite.WRITE, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED, incremented_pc)
+
+	#Clear Registers
+	def cls(self, r=0, g=0, b=0):
+		if b == 1:
+			self.buf(1, bz)
+		if r == 1:
+			self.ramv = PagedRAM(self.ram_size, self.max_ram_words)
+		if g == 1:
+			for i, _ in enumerate(self.regs):
+				self.regs[i] = array("I", [bz]) * len(self.regs[i])
+			self.clear_reg_offs()
+			self.gpio_address = bz
+
+	def clear_reg_offs(self):
+		self.reg_offs = array("I", [bz]) * 2
+
+	def pr(self, lst, gui=False):#Print function
+		self.gpio.write(self.gpio_address, lst, gui)
+
+	def gpio_read(self):
+		"""gpio_read() -> Reads a word from the GPIO backend on the port at gpio_address
+		"""
+		return self.gpio.read(self.gpio_address) & wm
+
+	#Set Set Pins
+	#pci, pc, abr, cb, aor, rama, ramd, roma, gpioa, gpiod, flg, pid, reg_a, reg_b, reg_c, cui, sp, ism, if
+	def set(self, list):
+		self.reg(ReadWrite.WRITE, ProtReg.SETLIST, RegType.PROTECTED, bm.btd(list, len(list)))
+
+	#Set Enable Pins
+	#pci, pc, aor, inc, decrement, ramd, romd, pid, gpi, reg_a, reg_b, reg_c, sp, ism, if
+	def enable(self, list):
+		self.reg(ReadWrite.WRITE, ProtReg.ENABLELIST, RegType.PROTECTED, bm.btd(list, len(list)))
+
+	def fetch(self, ln):
+		"""fetch(ln) -> Fetches the instruction at ROM address ln with the same effects as the FETCH microcode
+		"""
+		inp = self.rom_data[ln]
+		self.reg(ReadWrite.WRITE, ProtReg.ROMADDRESS, RegType.PROTECTED, ln)
+		self.reg(ReadWrite.WRITE, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED, ln + 1)
+		self.reg(ReadWrite.WRITE, ProtReg.CONTROLUNITINPUT, RegType.PROTECTED, inp)
+		self.reg(ReadWrite.WRITE, ProtReg.SETLIST, RegType.PROTECTED, fetch_set_list)
+		self.reg(ReadWrite.WRITE, ProtReg.ENABLELIST, RegType.PROTECTED, fetch_ena_list)
+		self.buf(1, inp)
+		return inp
+
+	def dump_rom(self):
+		print("\nDUMP ROM:")
+		for i, line in enumerate(self.rom_data):
+			print("%s: %s" % (i, bm.blts(bm.dtb(line))))
+		print("\n")
+
+	#Define actions dictated by set/enable pins
+	def execute(self, set_list, ena_list, gui=False,
+				variables=None):
+		"""execute(set_list, ena_list, gui=False, reg_a=[0,0], reg_b=[0,0], reg_c=[0,0]) -> Executes actions based on set/enable flags and registers
+		Parameters:
+
+		set_list: List of flags to set
+		ena_list: List of flags to enable
+		gui: True: output as little endian binary digits,
+			 "not": Converts to int then prints output
+			 "bin": outputs as big endian binary digits
+			 else: converts to int then prints("Output: " + int)
+		reg_a/reg_b/reg_c: registers indentified by [index, type]
+		"""
+		reg = self.reg
+		self.set(set_list)
+		self.enable(ena_list)
+		var = bz
+
+		try:
+			reg_a = variables[RuntimeVariables.REGISTERA.value]
+			reg_b = variables[RuntimeVariables.REGISTERB.value]
+			reg_c = variables[RuntimeVariables.REGISTERC.value]
+
+			reg_a = [reg_a >> 2, reg_a & 0b11]
+			reg_b = [reg_b >> 2, reg_b & 0b11]
+			reg_c = [reg_c >> 2, reg_c & 0b11]
+		except Exception:
+			pass
+
+		#Enable actions:
+		# if ena_list[0]:		#pci
+			# pci()
+		if ena_list[1]:		#pc
+			var = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
+		if ena_list[2]:		#aor
+			var = reg(ReadWrite.READ, ProtReg.AOR, RegType.PROTECTED)
+		if ena_list[5]:		#ramd
+			tmp = reg(ReadWrite.READ, ProtReg.RAMADDRESS, RegType.PROTECTED)
+			var = self.ram(ReadWrite.READ, tmp, "RAMD ENABLE EXECUTE()")
+			if trace_memory:
+				trace_log.debug("RAMD: %s READS %s" % (tmp, var))
+		if ena_list[6]:		#romd
+			tmp = reg(ReadWrite.READ, ProtReg.ROMADDRESS, RegType.PROTECTED)
+			try:
+				var = self.rom(0, tmp)
+			except IndexError:
+				temp = reg(ReadWrite.READ, ProtReg.ROMADDRESS, RegType.PROTECTED)
+				lgn.critical("ROM: Error: Invalid program counter: %s" % (temp))
+				raise IndexError
+		if ena_list[7]:		#Register intermediate data
+			var = reg(ReadWrite.READ, ProtReg.REGINTERMEDIATE, RegType.PROTECTED)
+		if ena_list[8]:		#gpi
+			var = self.gpio_read()
+		if ena_list[9]:		#rega
+			var = reg(ReadWrite.READ, reg_a[0], reg_a[1])
+		if ena_list[10]:	#regb
+			var = reg(ReadWrite.READ, reg_b[0], reg_b[1])
+		if ena_list[11]:	#regc
+			var = reg(ReadWrite.READ, reg_c[0], reg_c[1])
+		if ena_list[12]:	#stack pointer
+			var = reg(ReadWrite.READ, ProtReg.STACKPOINTER, RegType.PROTECTED)
+
+		self.buf(1,var)
+		if trace_micro_op:
+			trace_log.debug("Execute: SET: %s ENABLE: %s BUFFER: %s" % (bm.blts(set_list), bm.blts(ena_list), var))
+
+		#Set actions:
+		if set_list[1]:	#pc
+			reg(ReadWrite.WRITE, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED, var)
+		if set_list[2]:	#abr
+			reg(ReadWrite.WRITE, ALUConfig.BREGISTER, RegType.ALU, var)
+		if set_list[3]:	#conditional branch
+			comparison = reg(ReadWrite.READ, ProtReg.FLAGS, RegType.PROTECTED)
+			if isinstance(variables[2], type(None)):
+				lgn.critical("Execute: Comparison variable not given.")
+				raise TypeError
+			if variables[3] & 1 == 1 or comparison & 0xF & variables[2] == 0:
+				reg(ReadWrite.WRITE, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED, var)
+		if set_list[4]:	#aor
+			alu_r = self.alu()
+			if alu_r != 1:
+				lgn.warning(EmulatorRuntimeError.ALUFAILED.value)
+				raise Exception
+		if set_list[5]:	#rama
+			reg(ReadWrite.WRITE, ProtReg.RAMADDRESS, RegType.PROTECTED, var)
+		if set_list[6]:	#ramd
+			tmp = reg(ReadWrite.READ, ProtReg.RAMADDRESS, RegType.PROTECTED)
+			if trace_memory:
+				trace_log.debug("RAMD: %s -> %s" % (tmp, var))
+			self.ram(ReadWrite.WRITE, tmp, var)
+		if set_list[7]:	#roma
+			reg(ReadWrite.WRITE, ProtReg.ROMADDRESS, RegType.PROTECTED, var)
+		if set_list[8]:	#gpoa
+			self.gpio_address = var
+			if trace_memory:
+				trace_log.debug("Set GPIO Address: %s" % (var))
+		if set_list[9]:	#gpod
+			self.pr(var, gui)
+		if set_list[11]:	#pid
+			reg(ReadWrite.WRITE, ProtReg.REGINTERMEDIATE, RegType.PROTECTED, var)
+		if set_list[12]:	#rega
+			reg(ReadWrite.WRITE, reg_a[0], reg_a[1], var)
+		if set_list[13]:	#regb
+			reg(ReadWrite.WRITE, reg_b[0], reg_b[1], var)
+		if set_list[14]:	#regc
+			reg(ReadWrite.WRITE, reg_c[0], reg_c[1], var)
+		if set_list[15]:	#cui
+			reg(ReadWrite.WRITE, ProtReg.CONTROLUNITINPUT, RegType.PROTECTED, var)
+		if set_list[16]:	#sp
+			reg(ReadWrite.WRITE, ProtReg.STACKPOINTER, RegType.PROTECTED, var)
+		if set_list[0]:
+			self.pci()
+
+	def rom_hash(self):
+		"""rom_hash() -> SHA-256 digest of the ROM words, identifying the program in snapshots
+		"""
+		return hashlib.sha256(little_endian_bytes(self.rom_data)).digest()
+
+	def save_state(self, file_path):
+		"""save_state(file_path) -> Saves a snapshot of the CPU to file_path
+		The snapshot holds the ROM's identity, every register bank including the protected registers and flags, the buffer, the GPIO address,
+		the instruction count and the RAM pages that have been written to, resume() continues from it after load_state()
+		"""
+		ramv = self.ramv
+		rom_path = (self.rom_path or "").encode("utf-8")
+		with open(file_path, "wb") as fh:
+			fh.write(snapshot_header.pack(snapshot_magic, snapshot_version, bw, self.instruction_count, self.buffer,
+										  ramv.size, ramv.page_bits, len(ramv.pages), len(self.rom_data), self.rom_hash(), self.gpio_address))
+			fh.write(struct.pack("<H", len(rom_path)) + rom_path)
+			for bank in self.regs:
+				fh.write(struct.pack("<H", len(bank)) + little_endian_bytes(bank))
+			for page_number in sorted(ramv.pages):
+				fh.write(struct.pack("<I", page_number) + little_endian_bytes(ramv.pages[page_number]))
+
+	def load_state(self, file_path):
+		"""load_state(file_path) -> Restores a snapshot saved by save_state()
+		The ROM is kept if it's the one the snapshot was taken of, else it's read from the file the snapshot names
+
+		Returns: 1 once restored, raises ValueError if the snapshot or its ROM don't match
+		"""
+		with open(file_path, "rb") as fh:
+			data = fh.read()
+		if len(data) < snapshot_header.size or data[:4] != snapshot_magic:
+			lgn.critical("Snapshot: Error: %s isn't a snapshot." % (file_path))
+			raise ValueError("%s: Not a snapshot." % (file_path))
+		magic, version, bit_width, instruction_count, buffer, size, page_bits, page_count, rom_length, rom_digest, gpio_address = snapshot_header.unpack_from(data)
+		if version != snapshot_version or bit_width != bw:
+			lgn.critical("Snapshot: Error: %s: Unsupported version %s or bit width %s." % (file_path, version, bit_width))
+			raise ValueError("%s: Unsupported snapshot." % (file_path))
+		offset = snapshot_header.size
+		path_length, = struct.unpack_from("<H", data, offset)
+		rom_path = data[offset + 2:offset + 2 + path_length].decode("utf-8")
+		offset += 2 + path_length
+
+		if len(self.rom_data) != rom_length or self.rom_hash() != rom_digest:
+			if rom_path == "" or not os.path.isfile(rom_path):
+				lgn.critical("Snapshot: Error: ROM of %s isn't loaded or found." % (file_path))
+				raise ValueError("%s: ROM not loaded or found." % (file_path))
+			self.load_rom_words(read_program(rom_path))
+			if self.rom_hash() != rom_digest:
+				lgn.critical("Snapshot: Error: %s has changed since the snapshot." % (rom_path))
+				raise ValueError("%s: ROM changed since the snapshot." % (rom_path))
+		self.rom_path = rom_path or self.rom_path
+		self.clear_block_cache()
+
+		regs = []
+		for _ in self.regs:
+			leng, = struct.unpack_from("<H", data, offset)
+			regs.append(array_from_little_endian(data[offset + 2:offset + 2 + leng * 4]))
+			offset += 2 + leng * 4
+		ramv = PagedRAM(size, self.max_ram_words, page_bits)
+		page_bytes = 4 << page_bits
+		for _ in range(page_count):
+			page_number, = struct.unpack_from("<I", data, offset)
+			ramv.pages[page_number] = array_from_little_endian(data[offset + 4:offset + 4 + page_bytes])
+			offset += 4 + page_bytes
+		ramv.peak_pages = len(ramv.pages)
+
+		self.regs = regs
+		self.ramv = ramv
+		self.ram_size = size
+		self.buffer = buffer
+		self.instruction_count = instruction_count
+		self.gpio_address = gpio_address
+		self.clear_reg_offs()
+		return 1
+
+	def translate_block(self, pc):
+		"""translate_block(pc) -> Translates the straight-line run of ROM words starting at pc into a compiled Python function
+		The run ends after a word that branches, calls or returns, and before anything the translator leaves to the interpreter:
+		the exit signal, illegal functions, GPIO input, register variables addressing protected registers and breakpoints
+
+		It also ends after a word that may write a watched register or, with RAM watchpoints set, RAM, see watched_writes()
+
+		Returns: function(cpu, gui) running the block, amount of instructions in it and the program counter of the last one,
+		or None, 0, pc if the word at pc isn't supported
+		"""
+		name = "block_%s" % (pc)
+		lines = [
+			"def %s(cpu, gui):" % (name),
+			"	regs = cpu.regs",
+			"	prot = regs[%s]" % (RegType.PROTECTED.value),
+		]
+		leng = 0
+		set_list = None
+		while leng < max_block_length and pc < len(self.decoded_rom):
+			inp = self.rom_data[pc]
+			instruction_vars = self.decoded_rom[pc]
+			_ofs, meta_func = instruction_vars[len(var_lengs):]
+			if inp == wm or _ofs == None or _ofs in gpio_read_offsets or (leng > 0 and pc in self.breakpoints):
+				break
+			registers = [instruction_vars[e.value] for e in (RuntimeVariables.REGISTERA, RuntimeVariables.REGISTERB, RuntimeVariables.REGISTERC)]
+			if RegType.PROTECTED.value in [e & 0b11 for e in registers]:
+				break
+			fields = {
+				"cpu": "cpu",
+				"prot": "prot",
+				"reg_a": "regs[%s][%s]" % (registers[0] & 0b11, registers[0] >> 2),
+				"reg_b": "regs[%s][%s]" % (registers[1] & 0b11, registers[1] >> 2),
+				"reg_c": "regs[%s][%s]" % (registers[2] & 0b11, registers[2] >> 2),
+				"var_a": str(instruction_vars[RuntimeVariables.VARIABLEA.value]),
+				"var_b": str(instruction_vars[RuntimeVariables.VARIABLEB.value]),
+			}
+
+			#Fetch
+			if trace_instruction:
+				lines.append("	trace_log.debug(%r)" % ("PC: %s: %s, ofs: %s, variables: %s" % (pc, FunctionDefinitionMetaInfo[meta_func], _ofs, instruction_vars[:len(var_lengs)])))
+			lines += [
+				"	#%s: %s" % (pc, FunctionDefinitionMetaInfo[meta_func]),
+				"	prot[%s] = %s" % (ProtReg.ROMADDRESS.value, pc),
+				"	prot[%s] = %s" % (ProtReg.PROGRAMCOUNTER.value, pc + 1 & wm),
+				"	prot[%s] = %s" % (ProtReg.CONTROLUNITINPUT.value, inp),
+			]
+			if instruction_vars[RuntimeVariables.LOGICALALU.value] == 1:
+				lines.append("	regs[%s][%s] = %s" % (RegType.ALU.value, ALUConfig.ALUFUNCTION.value, instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value]))
+
+			#Micro-ops, the buffer and pins are only stored where alu() reads them and at the end of the block
+			for i, set_list in enumerate(FunctionDefinitions[0][_ofs]):
+				ena_list = FunctionDefinitions[1][_ofs][i]
+				read_lines, write_lines = micro_op_source(set_list, ena_list, fields)
+				lines.append("	var = bz")
+				lines += ["	" + line for line in read_lines]
+				if trace_micro_op:
+					lines.append("	trace_log.debug(\"micro_op_%s_%s: BUFFER: %%s\" %% (var))" % (_ofs, i))
+				if set_list[4]:	#aor
+					lines += [
+						"	cpu.buffer = var",
+						"	prot[%s] = %s" % (ProtReg.SETLIST.value, bm.btd(set_list, len(set_list))),
+						"	prot[%s] = %s" % (ProtReg.ENABLELIST.value, bm.btd(ena_list, len(ena_list))),
+					]
+				lines += ["	" + line for line in write_lines]
+			leng += 1
+			last_pc = pc
+			registers, ram = self.watched_writes(pc)
+			if ends_block(_ofs) or len(registers) > 0 or ram:
+				break
+			pc += words_used(_ofs)
+
+		if leng == 0:
+			return None, 0, pc
+		lines += [
+			"	cpu.buffer = var",
+			"	prot[%s] = %s" % (ProtReg.SETLIST.value, bm.btd(set_list, len(set_list))),
+			"	prot[%s] = %s" % (ProtReg.ENABLELIST.value, bm.btd(ena_list, len(ena_list))),
+			"	cpu.clear_reg_offs()",
+		]
+		return compile_source(lines, name), leng, last_pc
+
+	def run_block(self, gui=False):
+		"""run_block(gui=False) -> Runs the translated basic block at the program counter,
+		program counters that aren't hot yet or aren't supported by the translator are run by single_instruction()
+		Parameters:
+
+		gui: same as in single_instruction()
+
+		Returns: error code: -1 for error, 0 for instructions completed but continue and 1 for completed and exit
+		"""
+		pc = self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value]
+		block = self.block_cache.get(pc)
+		if block == None:
+			self.block_hits[pc] = self.block_hits.get(pc, 0) + 1
+			if self.block_hits[pc] < block_hot_threshold:
+				return self.single_instruction(0, gui)
+			block = self.translate_block(pc)
+			self.block_cache[pc] = block
+		if block[0] == None:
+			return self.single_instruction(0, gui)
+		block[0](self, gui)
+		self.instruction_count += block[1]
 		return 0
-	
-	#Get program counter, mainly for debugging
-	ln = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
-	lgn.info("SingleRun: Program Counter: %s" % (bm.btd(ln)))
-	
-	#fetch next instruction 
-	for i, _ in enumerate(FunctionDefinitions[0][0]):
-		lgn.debug("FETCH: %s" % (i))
-		execute(FunctionDefinitions[0][0][i], FunctionDefinitions[1][0][i])
-	# clear_reg_offs()
-	inp = reg(ReadWrite.READ, ProtReg.CONTROLUNITINPUT, RegType.PROTECTED)
-	
-	#if input is all 1s, exit with return code 1
-	exit_signal = True
-	for i, e in enumerate(inp):
-		if not isinstance(inp[i], int):
+
+	def translate_visited_blocks(self, threshold=1):
+		"""translate_visited_blocks(threshold=1) -> Translates the blocks at every program counter the interpreter reached at least threshold times,
+		e.g. before forking so the children share them
+		"""
+		for pc, hits in self.block_hits.items():
+			if hits >= threshold and pc not in self.block_cache:
+				self.block_cache[pc] = self.translate_block(pc)
+
+	#Run Single Instruction
+	def single_instruction(self, reset=0, gui=False,
+						   print_line_nr=False,
+						   force_show_exceptions=False):
+		"""single_instruction(r=0,gui=False, print_line_nr=False, force_show_exceptions=False) -> Runs a single instruction
+		Parameters:
+
+		r: Reset registers and flags
+		gui: True: output as little endian binary digits,
+			 "not": Converts to int then prints output
+			 "bin": outputs as big endian binary digits
+			 else: converts to int then prints("Output: " + int)
+		print_line_nr: if True prints binary line numbers to terminal
+		force_show_exceptions: Quirks in how it handles variables might create exceptions which can be shown for debugging reasons
+
+		Returns: error code: -1 for error, 0 for instruction completed but continue and 1 for completed and exit
+		"""
+		reg = self.reg
+
+		#Handle reset
+		if reset == 1:	#Reset
+			self.cls(1,1,1)
+			if force_show_exceptions:
+				lgn.debug("Cleared registers")
+			return 0
+
+		#Get program counter, mainly for debugging
+		ln = reg(ReadWrite.READ, ProtReg.PROGRAMCOUNTER, RegType.PROTECTED)
+
+		#fetch next instruction
+		if ln < len(self.decoded_rom):
+			inp = self.fetch(ln)
+			instruction_vars = self.decoded_rom[ln]
+		else:
+			#Outside of ROM, the FETCH microcode reports the invalid program counter
+			for i, _ in enumerate(FunctionDefinitions[0][0]):
+				if trace_micro_op:
+					trace_log.debug("FETCH: %s" % (i))
+				self.execute(FunctionDefinitions[0][0][i], FunctionDefinitions[1][0][i])
+			# clear_reg_offs()
+			inp = reg(ReadWrite.READ, ProtReg.CONTROLUNITINPUT, RegType.PROTECTED)
+			instruction_vars = decode(inp)
+
+		self.instruction_count += 1
+
+		#if input is all 1s, exit with return code 1
+		if not isinstance(inp, int):
 			lgn.critical("SingleInstruction: Error: Invalid instruction.")
 			raise Exception
-		if inp[i] != 1:
-			exit_signal = False
-			break
-	if exit_signal:
+		if inp == wm:
+			if force_show_exceptions:
+				lgn.debug("EXIT_SIGNAL.")
+			return 1
+
+		comp = reg(ReadWrite.READ, ProtReg.AOR, RegType.PROTECTED)
+
 		if force_show_exceptions:
-			lgn.debug("EXIT_SIGNAL.")
-		return 1
-		
-	comp = reg(ReadWrite.READ, ProtReg.AOR, RegType.PROTECTED)
-	
-	#get input variables
-	#Where the different variables start in input space
-	var_ofs = [0,4,5,9,11,18,25]
-	
-	#Length of variables 
-	var_lengs = [4,1,4,2,7,7,7]
-	
-	#Unpack instruction to variables
-	instruction_vars = []
-	for i, e in enumerate(var_lengs):
-		t = []
-		for j in range(e):
-			if inp[var_ofs[i] + j]:
-				t.append(1)
-			else:
-				t.append(0)
-		instruction_vars.append(t)
-	
-	if force_show_exceptions:
-		for i, var in enumerate(instruction_vars):
-			lgn.info("%s: %s" % (RuntimeVariables(i).name, bm.blts(var)))
-	
-	_ofs, meta_func = ofs(bm.btd(instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value]), instruction_vars)
-	if _ofs == EmulatorRuntimeError.ILLEGALFUNCTION:
-		return -1
-	
-	lgn.debug("SingleInstruction: MetaFunction: %s, ofs: %s" % (FunctionDefinitionMetaInfo[meta_func], _ofs))
-	# lgn.debug("SingleInstruction: Runtime variables: \n%s" % (instruction_vars))
-	if instruction_vars[RuntimeVariables.LOGICALALU.value][0] == 1:
-		lgn.info("SingleInstruction: ALU Function: %s" % (instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value]))
-		reg(ReadWrite.WRITE, ALUConfig.ALUFUNCTION, RegType.ALU, instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value])
-	for i, _ in enumerate(FunctionDefinitions[0][_ofs]):
-		lgn.debug("RUN: %s" % (i))
-		execute(FunctionDefinitions[0][_ofs][i], 
-				FunctionDefinitions[1][_ofs][i], 
-				gui, instruction_vars)
-	clear_reg_offs()
-	return 0
-
-def run(filename, gui=False, print_line_nr=False, 
-		force_show_exceptions=False,time_runtime=False):
-	"""run(filename, gui=False, print_line_nr=False, force_show_exceptions=False,time_runtime=False) -> Runs executable program from filename
+			for i, e in enumerate(var_lengs):
+				lgn.info("%s: %s" % (RuntimeVariables(i).name, bm.blts(bm.dtb(instruction_vars[i], e))))
+
+		#Offset and meta function are resolved when decoding
+		_ofs, meta_func = instruction_vars[len(var_lengs):]
+		if _ofs == None:
+			lgn.critical("Offset: Error: Program Counter: %s: Invalid function number." % (ln))
+			return -1
+
+		if trace_instruction:
+			trace_log.debug("PC: %s: %s, ofs: %s, variables: %s" % (ln, FunctionDefinitionMetaInfo[meta_func], _ofs, instruction_vars[:len(var_lengs)]))
+		if instruction_vars[RuntimeVariables.LOGICALALU.value] == 1:
+			reg(ReadWrite.WRITE, ALUConfig.ALUFUNCTION, RegType.ALU, instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value])
+		if COMPILEDMICROCODE:
+			for micro_op in CompiledFunctionDefinitions[_ofs]:
+				micro_op(self, gui, instruction_vars)
+		else:
+			for i, _ in enumerate(FunctionDefinitions[0][_ofs]):
+				if trace_micro_op:
+					trace_log.debug("RUN: %s" % (i))
+				self.execute(FunctionDefinitions[0][_ofs][i],
+							 FunctionDefinitions[1][_ofs][i],
+							 gui, instruction_vars)
+		self.clear_reg_offs()
+		return 0
+
+	def add_breakpoint(self, pc, condition=None):
+		"""add_breakpoint(pc, condition=None) -> Makes resume() stop with exit code 2 before running the instruction at pc,
+		only when condition(cpu) returns True if a condition is given
+		"""
+		self.breakpoints[pc] = condition
+		self.clear_block_cache()
+
+	def remove_breakpoint(self, pc):
+		self.breakpoints.pop(pc, None)
+		self.clear_block_cache()
+
+	def watch_ram(self, address):
+		"""watch_ram(address) -> Makes resume() stop with exit code 2 after an instruction changing the RAM word at address
+		"""
+		self.ram_watchpoints.add(address)
+		self.clear_block_cache()
+
+	def watch_register(self, index, reg_type=RegType.GENERALPURPOSE):
+		"""watch_register(index, reg_type=RegType.GENERALPURPOSE) -> Makes resume() stop with exit code 2 after an instruction changing the register
+		"""
+		if isinstance(index, Enum):
+			index = index.value
+		if isinstance(reg_type, Enum):
+			reg_type = reg_type.value
+		self.register_watchpoints.add((index, reg_type))
+		self.clear_block_cache()
+
+	def unwatch_ram(self, address):
+		self.ram_watchpoints.discard(address)
+		self.clear_block_cache()
+
+	def unwatch_register(self, index, reg_type=RegType.GENERALPURPOSE):
+		if isinstance(index, Enum):
+			index = index.value
+		if isinstance(reg_type, Enum):
+			reg_type = reg_type.value
+		self.register_watchpoints.discard((index, reg_type))
+		self.clear_block_cache()
+
+	def clear_breakpoints(self):
+		"""clear_breakpoints() -> Removes every breakpoint and watchpoint
+		"""
+		self.breakpoints = dict()
+		self.ram_watchpoints = builtins.set()
+		self.register_watchpoints = builtins.set()
+		self.clear_block_cache()
+
+	def watched_writes(self, pc):
+		"""watched_writes(pc) -> Tuple of the watched registers the instruction at pc may write, every watched protected register being one,
+		and True if it may write RAM while RAM is watched, worked out once per program counter
+		"""
+		q = self.watch_writes.get(pc)
+		if q != None:
+			return q
+		written, ram = builtins.set(), False
+		if pc < len(self.decoded_rom):
+			instruction_vars = self.decoded_rom[pc]
+			_ofs = instruction_vars[len(var_lengs)]
+			written = written_registers(instruction_vars)
+			ram = len(self.ram_watchpoints) > 0 and _ofs != None and writes_ram(_ofs)
+		q = (tuple([e for e in self.register_watchpoints if e in written or e[1] == RegType.PROTECTED.value]), ram)
+		self.watch_writes[pc] = q
+		return q
+
+	def check_breakpoint(self, pc):
+		"""check_breakpoint(pc) -> True and sets last_break if there's a breakpoint at pc with its condition met
+		"""
+		condition = self.breakpoints[pc]
+		if condition == None or condition(self):
+			self.last_break = BreakEvent(BreakReason.BREAKPOINT, pc, pc, None, None)
+			return True
+		return False
+
+	def check_watchpoints(self, pc, register_values, watched_ram=None):
+		"""check_watchpoints(pc, register_values, watched_ram=None) -> True and sets last_break if the instruction at pc, the last one run, changed a watched word
+		Parameters:
+
+		pc: program counter of the instruction, only the watched registers it may write are compared
+		register_values: dict of the words of the watched registers before it, updated to the words after it
+		watched_ram: WatchedRAM the RAM writes went through, its written words are compared and forgotten
+		"""
+		hit = None
+		if watched_ram != None and len(watched_ram.written) > 0:
+			for address, old in watched_ram.written.items():
+				new = watched_ram.ram[address]
+				if new != old and hit == None:
+					hit = BreakEvent(BreakReason.RAMWATCH, pc, address, old, new)
+			watched_ram.written.clear()
+		for key in self.watched_writes(pc)[0]:
+			new = self.regs[key[1]][key[0]]
+			if new != register_values[key]:
+				if hit == None:
+					hit = BreakEvent(BreakReason.REGISTERWATCH, pc, key, register_values[key], new)
+				register_values[key] = new
+		if hit == None:
+			return False
+		self.last_break = hit
+		return True
+
+	def record_instruction(self, writer, gui=False, print_line_nr=False, force_show_exceptions=False):
+		"""record_instruction(writer, gui=False, print_line_nr=False, force_show_exceptions=False) -> Runs a single instruction like single_instruction(),
+		recording it in writer, an ExecutionTrace.TraceWriter, followed by the registers it changed
+		RAM and GPIO writes are only recorded, as they happen, while ramv and gpio are wrapped in ExecutionTrace.TracedRAM and TracedGPIO
+
+		Returns: same as single_instruction()
+		"""
+		pc = self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value]
+		if pc < len(self.decoded_rom):
+			_ofs, meta_func = self.decoded_rom[pc][len(var_lengs):]
+			writer.instruction(pc, self.rom_data[pc], _ofs, meta_func)
+		else:
+			writer.instruction(pc, 0)
+		before = [bank.tobytes() for bank in self.regs]
+
+		q = self.single_instruction(0, gui, print_line_nr, force_show_exceptions)
+
+		for reg_type, bank in enumerate(self.regs):
+			if bank.tobytes() == before[reg_type]:
+				continue
+			old = array("I")
+			old.frombytes(before[reg_type])
+			for i, e in enumerate(bank):
+				if e != old[i] and not (reg_type == RegType.PROTECTED.value and i in unrecorded_registers):
+					writer.append(reg_type + 1, i, e)
+		return q
+
+	def step(self, gui=False):
+		"""step(gui=False) -> Runs the next instruction, same as single_instruction(0, gui)
+		"""
+		return self.single_instruction(0, gui)
+
+	def input_pending(self):
+		"""input_pending() -> True if the instruction at the program counter reads GPIO input
+		"""
+		pc = self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value]
+		if pc >= len(self.decoded_rom) or self.rom_data[pc] == wm:
+			return False
+		return self.decoded_rom[pc][-2] in gpio_read_offsets
+
+	async def run_async(self, filename, gui=False, yield_every=4096):
+		"""run_async(filename, gui=False, yield_every=4096) -> Coroutine running executable program from filename, see resume_async()
+		"""
+		return await self.run_file_async(executable_path(filename), gui, yield_every)
+
+	async def run_file_async(self, file_path, gui=False, yield_every=4096):
+		"""run_file_async(file_path, gui=False, yield_every=4096) -> Coroutine running the executable program at file_path, see resume_async()
+		"""
+		lgn.getLogger().setLevel(LOGLEVEL)
+		try:
+			words = read_program(file_path)
+		except FileNotFoundError:
+			lgn.critical("%s.run(): Couldn't open file %s." % (__file__, file_path))
+			return -1
+		self.single_instruction(reset=1)
+		self.load_rom_words(words)
+		self.rom_path = os.path.abspath(file_path)
+		return await self.resume_async(gui, yield_every)
+
+	async def resume_async(self, gui=False, yield_every=4096):
+		"""resume_async(gui=False, yield_every=4096) -> Coroutine running the loaded program from the current state until it exits
+		It yields to the event loop every yield_every instructions, and before every instruction reading GPIO input
+		awaits the backend's wait_input(), e.g. a GPIO.AsyncInput reading from an asyncio.Queue or stream
+		Parameters:
+
+		gui: same as in run()
+		yield_every: instructions run between yielding to the event loop
+
+		Returns: 1 for completed and exit, raises on errors like run()
+		"""
+		use_blocks = BLOCKTRANSLATION
+		next_yield = self.instruction_count + yield_every
+		try:
+			while True:
+				if self.input_pending():
+					await self.gpio.wait_input(self.gpio_address)
+					q = self.single_instruction(0, gui)
+				elif use_blocks:
+					q = self.run_block(gui)
+				else:
+					q = self.single_instruction(0, gui)
+				if q == 1:
+					lgn.debug("Run: Program returned with exit code 1.")
+					return 1
+				elif q == -1:
+					lgn.critical("Error: %s.run(): return code -1, runtime stopped" % (__file__))
+					raise Exception
+				if self.instruction_count >= next_yield:
+					next_yield = self.instruction_count + yield_every
+					await asyncio.sleep(0)
+		finally:
+			self.gpio.flush()
+
+	def run_until_input(self, gui=False, max_instructions=None):
+		"""run_until_input(gui=False, max_instructions=None) -> Runs the loaded program up to, but not including, the next instruction reading GPIO input
+		Returns: 0 if stopped before an instruction reading input, 1 if the program exited, -1 for error, 3 if max_instructions were run first
+		"""
+		instruction_limit = None if max_instructions == None else self.instruction_count + max_instructions
+		while True:
+			if self.input_pending():
+				return 0
+			if instruction_limit != None and self.instruction_count >= instruction_limit:
+				return 3
+			q = self.single_instruction(0, gui)
+			if q != 0:
+				return q
+
+	def run(self, filename, gui=False, print_line_nr=False,
+			force_show_exceptions=False,time_runtime=False, profile=False, record=None,
+			max_instructions=None, max_wall_time=None, watchdog=None):
+		"""run(filename, gui=False, print_line_nr=False, force_show_exceptions=False,time_runtime=False, profile=False, record=None,
+		max_instructions=None, max_wall_time=None, watchdog=None) -> Runs executable program from filename
+		Parameters:
+
+		filename: name of the file to be run
+		gui: True: output as little endian binary digits,
+			 "not": Converts to int then prints output
+			 "bin": outputs as big endian binary digits
+			 else: converts to int then prints("Output: " + int)
+
+		print_line_nr: if True prints binary line numbers to terminal
+		force_show_exceptions: Quirks in how it handles variables might create exceptions which can be shown for debugging reasons
+		time_runtime: if True prints runtime length based on time.time()
+		profile: if True runs instruction by instruction, keeps a Profile in self.profile and prints its report on exit,
+				 if a file path the Profile is also saved there as JSON
+		record: if a file path runs instruction by instruction, recording each one and the registers, RAM and GPIO it wrote there
+				as an ExecutionTrace file, gzip compressed if the path ends in .gz, with profile the times include the recording
+		max_instructions: if given stops once this many instructions have run, at the end of the block reaching it
+		max_wall_time: if given stops once this many seconds have passed
+		watchdog: if given function(cpu) stopping the run when it returns True
+		The limits are checked every watchdog_interval instructions, and at max_instructions
+
+		Returns: error code: -1 for error, 1 for completed and exit, 2 for stopped at a breakpoint or watchpoint, see resume(),
+				 and 3 for stopped by a limit, with the statistics and program counter it stopped at in run_stats
+		"""
+		return self.run_file(executable_path(filename), gui, print_line_nr, force_show_exceptions, time_runtime, profile, record,
+							 max_instructions, max_wall_time, watchdog)
+
+	def run_file(self, file_path, gui=False, print_line_nr=False,
+				 force_show_exceptions=False,time_runtime=False, profile=False, record=None,
+				 max_instructions=None, max_wall_time=None, watchdog=None):
+		"""run_file(file_path, gui=False, print_line_nr=False, force_show_exceptions=False,time_runtime=False, profile=False, record=None,
+		max_instructions=None, max_wall_time=None, watchdog=None) -> Runs executable program at file_path
+		Parameters are the same as in run() with file_path being the full path of the .schonexe1 or .schonbin file
+		"""
+
+		lgn.getLogger().setLevel(LOGLEVEL)
+
+		#Open and read file for execution
+		try:
+			words = read_program(file_path)
+		except FileNotFoundError:
+			lgn.critical("%s.run(): Couldn't open file %s." % (__file__, file_path))
+			return -1
+
+		#Setup cpu sattelite files for executions
+		self.reg(ReadWrite.WRITE, ProtReg.CONTROLUNITINPUT, RegType.PROTECTED, bz)
+		self.single_instruction(reset=1)
+		t = self.load_rom_words(words)
+		self.rom_path = os.path.abspath(file_path)
+		if t != 1:
+			lgn.critical("Run: ROM couldn't be initialised properly.")
+		return self.resume(gui, print_line_nr, force_show_exceptions, time_runtime, profile, record,
+						   max_instructions, max_wall_time, watchdog)
+
+	def resume(self, gui=False, print_line_nr=False,
+			   force_show_exceptions=False,time_runtime=False, profile=False, record=None,
+			   max_instructions=None, max_wall_time=None, watchdog=None):
+		"""resume(gui=False, print_line_nr=False, force_show_exceptions=False,time_runtime=False, profile=False, record=None,
+		max_instructions=None, max_wall_time=None, watchdog=None) -> Runs the loaded program from the current state,
+		e.g. after load_state(), until it exits
+		Parameters are the same as in run(), max_instructions counting from the start of resume()
+		With breakpoints or watchpoints set it returns 2 when one is hit, with the BreakEvent in last_break, a breakpoint at the program counter resume() starts at isn't hit
+		Whatever it returns, run_stats holds the RunStats of the run
+		"""
+		lgn.getLogger().setLevel(LOGLEVEL)
+		if time_runtime:
+			start_time = time.time()
+
+		#Run limits, only checked once the instruction count reaches next_check
+		run_start = time.perf_counter()
+		start_count = self.instruction_count
+		stop_reason = StopReason.ERROR
+		limited = max_instructions != None or max_wall_time != None or watchdog != None
+		next_check = start_count + watchdog_interval
+		if max_instructions != None:
+			instruction_limit = start_count + max_instructions
+			next_check = min(next_check, instruction_limit)
+
+		#Breakpoints are checked before every block, which end before breakpoints, and watchpoints after every block,
+		#which end after any instruction that may write a watched word, only comparing the words that instruction may write
+		watching = len(self.ram_watchpoints) > 0 or len(self.register_watchpoints) > 0
+		debug = len(self.breakpoints) > 0 or watching
+		start_pc = self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value]
+		if watching:
+			register_values = dict([(e, self.regs[e[1]][e[0]]) for e in self.register_watchpoints])
+
+		#Execute program, translated blocks don't show per instruction diagnostics or timing
+		use_blocks = BLOCKTRANSLATION and not force_show_exceptions and not profile and record == None
+		if profile:
+			self.profile = Profile()
+		writer = None
+		if record != None:
+			writer = ExecutionTrace.TraceWriter(record)
+			self.ramv = ExecutionTrace.TracedRAM(self.ramv, writer)
+			self.gpio = ExecutionTrace.TracedGPIO(self.gpio, writer)
+		watched_ram = None
+		if len(self.ram_watchpoints) > 0:
+			watched_ram = WatchedRAM(self.ramv, self.ram_watchpoints)
+			self.ramv = watched_ram
+		try:
+			while True:
+				if debug:
+					pc = self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value]
+					if pc in self.breakpoints and pc != start_pc and self.check_breakpoint(pc):
+						lgn.debug("Run: Breakpoint at %s." % (pc))
+						stop_reason = StopReason.BREAK
+						return 2
+					start_pc = None
+				if use_blocks:
+					q = self.run_block(gui)
+				else:
+					if profile:
+						pc = self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value]
+						instruction_start = time.perf_counter()
+					if writer != None:
+						q = self.record_instruction(writer, gui, print_line_nr, force_show_exceptions)
+					else:
+						q = self.single_instruction(0, gui, print_line_nr, force_show_exceptions)
+					if profile and q == 0 and pc < len(self.decoded_rom):		#Recorded instructions are timed with their trace writes
+						self.profile.record(self.decoded_rom[pc], time.perf_counter() - instruction_start)
+				if watching and q == 0:
+					#A translated block that ran ends with the only instruction in it that may write a watched word
+					block = self.block_cache.get(pc) if use_blocks else None
+					if self.check_watchpoints(pc if block == None else block[2], register_values, watched_ram):
+						lgn.debug("Run: Watchpoint %s changed at %s." % (self.last_break.address, self.last_break.pc))
+						stop_reason = StopReason.BREAK
+						return 2
+				if isinstance(q, int):
+					if q == 1:
+						stop_reason = StopReason.EXIT
+						if profile:
+							print(self.profile.report())
+							if isinstance(profile, str):
+								self.profile.save_json(profile)
+						if time_runtime:
+							end_time = time.time()
+							lgn.debug("elapsed time: %s" % (end_time-start_time))
+							return [1, end_time-start_time]
+						lgn.debug("Run: Program returned with exit code 1.")
+						return 1
+					elif q == -1:
+						lgn.critical("Error: %s.run(): return code -1, runtime stopped" % (__file__))
+						raise Exception
+					elif q != 0:
+						lgn.warning(q)
+						print(q)
+				if limited and self.instruction_count >= next_check:
+					if max_instructions != None and self.instruction_count >= instruction_limit:
+						stop_reason = StopReason.MAXINSTRUCTIONS
+					elif max_wall_time != None and time.perf_counter() - run_start >= max_wall_time:
+						stop_reason = StopReason.MAXWALLTIME
+					elif watchdog != None and watchdog(self):
+						stop_reason = StopReason.WATCHDOG
+					else:
+						next_check = self.instruction_count + watchdog_interval
+						if max_instructions != None:
+							next_check = min(next_check, instruction_limit)
+						continue
+					lgn.info("Run: Stopped by %s at %s after %s instructions." % (stop_reason.name, self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value], self.instruction_count - start_count))
+					return 3
+		finally:
+			self.run_stats = RunStats(stop_reason, self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value],
+									  self.instruction_count - start_count, time.perf_counter() - run_start)
+			self.gpio.flush()
+			if watched_ram != None:
+				self.ramv = watched_ram.ram
+			if writer != None:
+				self.ramv = self.ramv.ram
+				self.gpio = self.gpio.backend
+				writer.close()
+
+#CPU instance the module level functions run on
+default_core = SchonCore()
+
+def set_trace(levels):
+	"""set_trace(levels) -> Selects the Trace levels and recompiles the micro-ops with only their tracing,
+	blocks translated before keep theirs until their ROM is loaded again, default_core's are cleared
 	Parameters:
-	
-	filename: name of the file to be run
-	gui: True: output as little endian binary digits, 
-		 "not": Converts to int then prints output
-		 "bin": outputs as big endian binary digits 
-		 else: converts to int then prints("Output: " + int)
-	
-	print_line_nr: if True prints binary line numbers to terminal
-	force_show_exceptions: Quirks in how it handles variables might create exceptions which can be shown for debugging reasons
-	time_runtime: if True prints runtime length based on time.time()
-	
-	Returns: error code: -1 for error, 0 for instruction completed but continue and 1 for completed and exit
+
+	levels: Trace levels, e.g. Trace.INSTRUCTION | Trace.MEMORY, or their names as in trace_levels()
 	"""
-	
-	lgn.getLogger().setLevel(LOGLEVEL)
-	
-	#Open and read file for execution 
-	file_path = bf + exeff + filename + file_extension_name
-	try:
-		with open(file_path, "r") as temp_fh:	
-			lines = temp_fh.readlines()
-			temp_fh.close()
-	except FileNotFoundError:
-		lgn.critical("%s.run(): Couldn't open file %s." % (__file__, file_path))
-		return -1
-	
-	#Setup cpu sattelite files for executions 
-	reg(ReadWrite.WRITE, ProtReg.CONTROLUNITINPUT, RegType.PROTECTED, bz)
-	single_instruction(reset=1)
-	t = initialize_rom(filename)
-	if t != 1:
-		lgn.critical("Run: ROM couldn't be initialised properly.")
-	if time_runtime:
-		start_time = time.time()
-	
-	#Execute program 
-	while True:
-		q = single_instruction(0, gui, print_line_nr, force_show_exceptions)
-		if isinstance(q, int):
-			if q == 1:
-				if time_runtime:
-					end_time = time.time()
-					lgb.debug("elapsed time: %s" % (end_time-start_time))
-					return [1, end_time-start_time]
-				lgn.debug("Run: Program returned with exit code 1.")
-				return 1
-			elif q == -1:
-				lgn.critical("Error: %s.run(): return code -1, runtime stopped" % (__file__))
-				raise Exception
-			elif q != 0:
-				lgn.warning(q)
-				print(q)
\ No newline at end of file
+	global TRACE, trace_instruction, trace_micro_op, trace_memory, CompiledFunctionDefinitions
+	if isinstance(levels, str):
+		levels = trace_levels(levels)
+	TRACE = Trace(levels)
+	trace_instruction = bool(TRACE & Trace.INSTRUCTION)
+	trace_micro_op = bool(TRACE & Trace.MICROOP)
+	trace_memory = bool(TRACE & Trace.MEMORY)
+	CompiledFunctionDefinitions = compile_function_definitions()
+	default_core.clear_block_cache()
+
+def __getattr__(name):
+	#CPU state of default_core, e.g. Emulator.regs
+	if name in ("rom_data", "decoded_rom", "block_cache", "block_hits", "ramv", "regs", "reg_offs", "buffer", "instruction_count"):
+		return getattr(default_core, name)
+	raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def initialize_rom(Filename: str):
+	return default_core.initialize_rom(Filename)
+
+def decode_rom():
+	return default_core.decode_rom()
+
+def clear_block_cache():
+	return default_core.clear_block_cache()
+
+def buf(rw, list=bz):
+	return default_core.buf(rw, list)
+
+def rom(rw, index):
+	return default_core.rom(rw, index)
+
+def ram(rw, index, value=None, preset=None):
+	return default_core.ram(rw, index, value, preset)
+
+def reg(rw, index, reg_type, value=None, preset=None):
+	return default_core.reg(rw, index, reg_type, value, preset)
+
+def alu():
+	return default_core.alu()
+
+def pci():
+	return default_core.pci()
+
+def cls(r=0, g=0, b=0):
+	return default_core.cls(r, g, b)
+
+def clear_reg_offs():
+	return default_core.clear_reg_offs()
+
+def pr(lst, gui=False):
+	return default_core.pr(lst, gui)
+
+def set(list):
+	return default_core.set(list)
+
+def enable(list):
+	return default_core.enable(list)
+
+def fetch(ln):
+	return default_core.fetch(ln)
+
+def dump_rom():
+	return default_core.dump_rom()
+
+def execute(set_list, ena_list, gui=False, variables=None):
+	return default_core.execute(set_list, ena_list, gui, variables)
+
+def translate_block(pc):
+	return default_core.translate_block(pc)
+
+def run_block(gui=False):
+	return default_core.run_block(gui)
+
+def single_instruction(reset=0, gui=False, print_line_nr=False, force_show_exceptions=False):
+	return default_core.single_instruction(reset, gui, print_line_nr, force_show_exceptions)
+
+def run(filename, gui=False, print_line_nr=False, force_show_exceptions=False, time_runtime=False, profile=False, record=None,
+		max_instructions=None, max_wall_time=None, watchdog=None):
+	return default_core.run(filename, gui, print_line_nr, force_show_exceptions, time_runtime, profile, record,
+		max_instructions, max_wall_time, watchdog)
+
+def run_file(file_path, gui=False, print_line_nr=False, force_show_exceptions=False, time_runtime=False, profile=False, record=None,
+		max_instructions=None, max_wall_time=None, watchdog=None):
+	return default_core.run_file(file_path, gui, print_line_nr, force_show_exceptions, time_runtime, profile, record,
+		max_instructions, max_wall_time, watchdog)
+
+async def run_async(filename, gui=False, yield_every=4096):
+	return await default_core.run_async(filename, gui, yield_every)
+
+def resume(gui=False, print_line_nr=False, force_show_exceptions=False, time_runtime=False, profile=False, record=None,
+		   max_instructions=None, max_wall_time=None, watchdog=None):
+	return default_core.resume(gui, print_line_nr, force_show_exceptions, time_runtime, profile, record,
+		max_instructions, max_wall_time, watchdog)
+
+def add_breakpoint(pc, condition=None):
+	return default_core.add_breakpoint(pc, condition)
+
+def remove_breakpoint(pc):
+	return default_core.remove_breakpoint(pc)
+
+def watch_ram(address):
+	return default_core.watch_ram(address)
+
+def watch_register(index, reg_type=RegType.GENERALPURPOSE):
+	return default_core.watch_register(index, reg_type)
+
+def clear_breakpoints():
+	return default_core.clear_breakpoints()
+
+def save_state(file_path):
+	return default_core.save_state(file_path)
+
+def load_state(file_path):
+	return default_core.load_state(file_path)
+
+def sa(bool):				#Set Address
+	if not bool:
+		return
+
+	iint = 0
+	for i, _ in enumerate(set_address):
+		execute(set_address[0][i], set_address[1][i], bm.btd(reg_a))
+
+#Further basic CPU info variables
+ena_list = reg(0, ProtReg.ENABLELIST, RegType.PROTECTED, bz)
+set_list = reg(0, ProtReg.SETLIST, RegType.PROTECTED, bz)
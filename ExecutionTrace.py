@@ -0,0 +1,247 @@
+"""ExecutionTrace.py -> Compact binary execution traces, .schontrace
+
+Emulator.run(..., record=file_path) writes a record for every instruction run followed by a record for every write it made,
+and TraceReader reads them back lazily, mapping the file into memory instead of reading it
+A file path ending in .gz is compressed with gzip, which is read as a stream instead of mapped
+
+A .schontrace file is a 16 byte header followed by 16 byte records, little endian
+Header:
+
+magic -> 4 bytes, b"SCHT"
+version -> unsigned 16 bit, format_version
+bit_width -> unsigned 16 bit, word width of the traced CPU
+record_size -> unsigned 32 bit, bytes per record
+reserved -> unsigned 32 bit, 0
+
+Record:
+
+target -> unsigned 8 bit, TraceTarget of the record
+function_offset -> unsigned 8 bit, FunctionDefinitions offset of the instruction, no_function if it isn't a legal function
+meta_function -> unsigned 8 bit, FunctionDefinitionMetaInfo index of the instruction, no_function if it isn't a legal function
+reserved -> unsigned 8 bit, 0
+pc -> unsigned 32 bit, program counter of the instruction
+address -> unsigned 32 bit, register index, RAM address or GPIO port written, 0 for instructions
+value -> unsigned 32 bit, word written, the instruction word for instructions
+
+Major classes:
+
+TraceTarget -> What a record is: an instruction or a write to a register bank, RAM or GPIO
+TraceWriter(file_path, compress=None, buffer_records=65536) -> Writes records through a preallocated buffer
+TraceReader(file_path) -> Iterates the records of a trace file lazily
+TracedRAM(ram, writer) / TracedGPIO(backend, writer) -> Pass RAM and GPIO writes on to a TraceWriter
+"""
+
+#Import libraries
+import BaseCPUInfo
+import GPIO
+import gzip
+import mmap
+import struct
+import logging as lgn			#Logging for custom exceptions
+from enum import Enum
+from collections import namedtuple
+
+file_extension_name = ".schontrace"
+magic = b"SCHT"
+format_version = 1
+header = struct.Struct("<4sHHII")
+record = struct.Struct("<BBBBIII")
+no_function = 0xFF		#function_offset and meta_function of words that aren't legal functions
+
+class TraceTarget(Enum):
+	INSTRUCTION = 0
+	GENERALPURPOSE = 1		#Register banks are their Emulator.RegType value + 1
+	ALU = 2
+	STACK = 3
+	PROTECTED = 4
+	RAM = 5
+	GPIO = 6
+
+#Record as read back, target being a TraceTarget value
+TraceRecord = namedtuple("TraceRecord", ["target", "function_offset", "meta_function", "pc", "address", "value"])
+
+class TraceWriter:
+	"""TraceWriter(file_path, compress=None, buffer_records=65536) -> Writes trace records to file_path, buffer_records records at a time
+	Parameters:
+
+	file_path: path of the trace file
+	compress: if True compresses with gzip, if None only if file_path ends in .gz
+	buffer_records: records kept in memory between writes to the file
+	"""
+
+	def __init__(self, file_path, compress=None, buffer_records=65536):
+		if compress == None:
+			compress = file_path.endswith(".gz")
+		self.file_path = file_path
+		self.fh = gzip.open(file_path, "wb", compresslevel=6) if compress else open(file_path, "wb")
+		self.fh.write(header.pack(magic, format_version, BaseCPUInfo.bit_width, record.size, 0))
+		self.buffer = bytearray(record.size * buffer_records)
+		self.used = 0			#Bytes of buffer holding records
+		self.records = 0		#Records written, including the buffered ones
+		self.pc = 0
+		self.function_offset = no_function
+		self.meta_function = no_function
+
+	def instruction(self, pc, word, function_offset=None, meta_function=None):
+		"""instruction(pc, word, function_offset=None, meta_function=None) -> Records the instruction word at pc, the writes recorded after it being its own
+		"""
+		self.pc = pc
+		self.function_offset = no_function if function_offset == None else function_offset
+		self.meta_function = no_function if meta_function == None else meta_function
+		self.append(TraceTarget.INSTRUCTION.value, 0, word)
+
+	def write(self, target, address, value):
+		"""write(target, address, value) -> Records a write of value to address of target, a TraceTarget, by the last instruction recorded
+		"""
+		if isinstance(target, Enum):
+			target = target.value
+		self.append(target, address, value)
+
+	def append(self, target, address, value):
+		if self.used == len(self.buffer):
+			self.flush()
+		record.pack_into(self.buffer, self.used, target, self.function_offset, self.meta_function, 0, self.pc, address, value)
+		self.used += record.size
+		self.records += 1
+
+	def flush(self):
+		if self.used > 0:
+			self.fh.write(memoryview(self.buffer)[:self.used])
+			self.used = 0
+		self.fh.flush()
+
+	def close(self):
+		if self.fh != None:
+			self.flush()
+			self.fh.close()
+			self.fh = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class TraceReader:
+	"""TraceReader(file_path) -> Reads the records of the trace file at file_path lazily as TraceRecord,
+	mapping uncompressed files into memory and streaming gzip compressed ones
+	"""
+
+	def __init__(self, file_path):
+		self.file_path = file_path
+		with open(file_path, "rb") as fh:
+			self.compressed = fh.read(2) == b"\x1f\x8b"
+		if self.compressed:
+			with gzip.open(file_path, "rb") as fh:
+				data = fh.read(header.size)
+			self.mapped = None
+		else:
+			with open(file_path, "rb") as fh:
+				if fh.seek(0, 2) < header.size:
+					lgn.critical("ExecutionTrace: Error: %s is too short for a .schontrace header." % (file_path))
+					raise ValueError("%s: Not a .schontrace file." % (file_path))
+				self.mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+			data = self.mapped[:header.size]
+
+		if len(data) < header.size or data[:4] != magic:
+			lgn.critical("ExecutionTrace: Error: %s isn't a .schontrace file." % (file_path))
+			raise ValueError("%s: Not a .schontrace file." % (file_path))
+		_, version, self.bit_width, record_size, _ = header.unpack(data)
+		if version != format_version or record_size != record.size:
+			lgn.critical("ExecutionTrace: Error: %s: Unsupported version %s." % (file_path, version))
+			raise ValueError("%s: Unsupported .schontrace version %s." % (file_path, version))
+
+	def __len__(self):
+		"""len(reader) -> Amount of records, only known without reading them for uncompressed files
+		"""
+		if self.compressed:
+			raise TypeError("%s: Compressed traces have no length." % (self.file_path))
+		return (len(self.mapped) - header.size) // record.size
+
+	def __iter__(self):
+		if not self.compressed:
+			end = header.size + len(self) * record.size
+			for e in record.iter_unpack(memoryview(self.mapped)[header.size:end]):
+				yield TraceRecord(e[0], e[1], e[2], e[4], e[5], e[6])
+			return
+		with gzip.open(self.file_path, "rb") as fh:
+			fh.read(header.size)
+			while True:
+				data = fh.read(record.size * 4096)
+				data = data[:len(data) - len(data) % record.size]
+				if len(data) == 0:
+					return
+				for e in record.iter_unpack(data):
+					yield TraceRecord(e[0], e[1], e[2], e[4], e[5], e[6])
+
+	def __getitem__(self, index):
+		"""reader[index] -> Record at index, without reading the others, for uncompressed files
+		"""
+		if index < 0:
+			index += len(self)
+		if index < 0 or index >= len(self):
+			raise IndexError("ExecutionTrace: Record index out of range.")
+		e = record.unpack_from(self.mapped, header.size + index * record.size)
+		return TraceRecord(e[0], e[1], e[2], e[4], e[5], e[6])
+
+	def instructions(self):
+		"""instructions() -> Iterates the instructions as (instruction record, list of its write records)
+		"""
+		current = None
+		writes = []
+		for e in self:
+			if e.target == TraceTarget.INSTRUCTION.value:
+				if current != None:
+					yield current, writes
+				current, writes = e, []
+			else:
+				writes.append(e)
+		if current != None:
+			yield current, writes
+
+	def close(self):
+		if self.mapped != None:
+			self.mapped.close()
+			self.mapped = None
+
+class TracedRAM:
+	"""TracedRAM(ram, writer) -> Passes the writes to ram, e.g. an Emulator.PagedRAM, on to writer as they happen
+	"""
+
+	def __init__(self, ram, writer):
+		self.ram = ram
+		self.writer = writer
+
+	def __getitem__(self, index):
+		return self.ram[index]
+
+	def __setitem__(self, index, value):
+		self.ram[index] = value			#First, so a write that raises isn't recorded
+		self.writer.append(TraceTarget.RAM.value, index, value)
+
+	def __len__(self):
+		return len(self.ram)
+
+	def __getattr__(self, name):
+		return getattr(self.ram, name)
+
+class TracedGPIO(GPIO.GPIOBackend):
+	"""TracedGPIO(backend, writer) -> Passes the writes to backend on to writer as they happen
+	"""
+
+	def __init__(self, backend, writer):
+		self.backend = backend
+		self.writer = writer
+
+	def read(self, port):
+		return self.backend.read(port)
+
+	def write(self, port, word, gui=False):
+		self.backend.write(port, word, gui)
+		self.writer.append(TraceTarget.GPIO.value, port, word)
+
+	def flush(self):
+		self.backend.flush()
+
+	async def wait_input(self, port):
+		await self.backend.wait_input(port)
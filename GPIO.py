@@ -0,0 +1,264 @@
+"""GPIO.py -> Pluggable GPIO backends for the emulator
+
+A backend reads and writes words on a GPIO port, the port being the GPIO address last set by the program through set pin 8 (gpoa)
+Backends are given to Emulator.SchonCore(gpio=...), without one the core reads input() and prints like it always has
+
+Major classes:
+
+GPIOBackend() -> Base backend: read(port), write(port, word, gui=False), flush() and close()
+ConsoleGPIO() -> Reads from input() and prints every word
+CallbackGPIO(input_function=None, output_function=None) -> Reads and writes through functions of a prompt and a line of text
+IterableInput(iterable) -> Reads the words of an iterable
+StreamInput(stream) -> Reads whitespace separated numbers from a text file or pipe as they're needed
+AsyncInput(source) -> Input awaited from an asyncio.Queue or asyncio.StreamReader, for Emulator.SchonCore.run_async()
+BufferOutput(capacity=4096) -> Keeps written words and their ports in preallocated arrays
+StreamOutput(stream, gui=None, block_lines=4096) -> Writes lines of text to a file or pipe in blocks
+Channels(input=None, output=None) -> Reads through one backend and writes through another
+Ports(ports, default=None) -> Routes each port to its own backend
+
+Major functions:
+
+format_output(word, gui=False) -> Line of text a word is printed as
+"""
+
+#Import libraries
+import BaseCPUInfo
+import asyncio
+import BasicMath as bm
+from array import array			#Compact storage for integer words
+
+bw = BaseCPUInfo.bit_width
+wm = (1 << bw) - 1	#Word mask, all ones word
+
+def format_output(word, gui=False):
+	"""format_output(word, gui=False) -> Line of text a word is printed as
+	Parameters:
+
+	word: integer word
+	gui: True: output as little endian binary digits,
+		 "not": Converts to int then prints output
+		 "bin": outputs as big endian binary digits
+		 else: converts to int then prints("Output: " + int)
+	"""
+	if gui == True:
+		return str(bm.blts(bm.dtb(word), False, True))
+	elif gui == "not":
+		return str(word)
+	elif gui == "bin":
+		return bm.btbs(bm.dtb(word))
+	return "Output: " + str(word)
+
+class GPIOBackend:
+	"""GPIOBackend() -> Base GPIO backend, without input and ignoring output
+	"""
+
+	def read(self, port):
+		"""read(port) -> Word read from port
+		"""
+		raise EOFError("GPIO: No input on port %s." % (port))
+
+	def write(self, port, word, gui=False):
+		"""write(port, word, gui=False) -> Writes word to port, gui being the output format of format_output()
+		"""
+		pass
+
+	def flush(self):
+		"""flush() -> Writes out anything buffered, called when a program exits
+		"""
+		pass
+
+	async def wait_input(self, port):
+		"""wait_input(port) -> Coroutine returning once read(port) won't block, awaited by Emulator.SchonCore.resume_async()
+		port being the GPIO address set before the instruction reading input
+		"""
+		pass
+
+	def close(self):
+		self.flush()
+
+class ConsoleGPIO(GPIOBackend):
+	"""ConsoleGPIO() -> Reads from input() and prints every word as it's written
+	"""
+
+	def read(self, port):
+		return int(input("Number: ")) & wm
+
+	def write(self, port, word, gui=False):
+		print(format_output(word, gui))
+
+class CallbackGPIO(GPIOBackend):
+	"""CallbackGPIO(input_function=None, output_function=None) -> Reads through input_function(prompt) and writes lines of text through output_function(text),
+	input() and print() being used for the ones not given
+	"""
+
+	def __init__(self, input_function=None, output_function=None):
+		self.input_function = input_function
+		self.output_function = output_function
+
+	def read(self, port):
+		if self.input_function == None:
+			return int(input("Number: ")) & wm
+		return int(self.input_function("Number: ")) & wm
+
+	def write(self, port, word, gui=False):
+		if self.output_function == None:
+			print(format_output(word, gui))
+		else:
+			self.output_function(format_output(word, gui))
+
+class IterableInput(GPIOBackend):
+	"""IterableInput(iterable) -> Reads the words of iterable in order, reading past its end raises EOFError
+	"""
+
+	def __init__(self, iterable):
+		self.words = iter(iterable)
+
+	def read(self, port):
+		try:
+			return int(next(self.words)) & wm
+		except StopIteration:
+			raise EOFError("GPIO: Input exhausted.")
+
+class StreamInput(IterableInput):
+	"""StreamInput(stream) -> Reads whitespace separated numbers from a text file or pipe, a line at a time as they're needed
+	"""
+
+	def __init__(self, stream):
+		IterableInput.__init__(self, (int(e) for line in stream for e in line.split()))
+
+class AsyncInput(GPIOBackend):
+	"""AsyncInput(source) -> Input awaited from an asyncio.Queue of words or an asyncio.StreamReader of whitespace separated numbers,
+	for Emulator.SchonCore.run_async(), reading without awaiting wait_input() first raises EOFError
+	"""
+
+	def __init__(self, source):
+		self.source = source
+		self.ready = []		#Words awaited but not read yet
+		self.tokens = []	#Numbers of the last line read from a stream
+
+	async def wait_input(self, port):
+		if len(self.ready) > 0:
+			return
+		if isinstance(self.source, asyncio.Queue):
+			self.ready.append(int(await self.source.get()))
+			return
+		while len(self.tokens) == 0:
+			line = await self.source.readline()
+			if not line:
+				raise EOFError("GPIO: Input exhausted.")
+			self.tokens = line.split()
+		self.ready.append(int(self.tokens.pop(0)))
+
+	def read(self, port):
+		if len(self.ready) == 0:
+			raise EOFError("GPIO: No input awaited.")
+		return self.ready.pop(0) & wm
+
+class BufferOutput(GPIOBackend):
+	"""BufferOutput(capacity=4096) -> Keeps written words and their ports in arrays preallocated for capacity words, doubling when full
+	"""
+
+	def __init__(self, capacity=4096):
+		self.buffer = array("I", [0]) * capacity
+		self.buffer_ports = array("I", [0]) * capacity
+		self.count = 0
+
+	def write(self, port, word, gui=False):
+		if self.count == len(self.buffer):
+			grow = array("I", [0]) * max(1, len(self.buffer))		#Doubling, growing an empty buffer as well
+			self.buffer.extend(grow)
+			self.buffer_ports.extend(grow)
+		self.buffer[self.count] = word
+		self.buffer_ports[self.count] = port
+		self.count += 1
+
+	def words(self, port=None):
+		"""words(port=None) -> List of the words written, only the ones written to port if given
+		"""
+		if port == None:
+			return self.buffer[:self.count].tolist()
+		return [e for i, e in enumerate(self.buffer[:self.count]) if self.buffer_ports[i] == port]
+
+	def ports(self):
+		"""ports() -> List of the ports each word was written to
+		"""
+		return self.buffer_ports[:self.count].tolist()
+
+	def lines(self, gui=False):
+		"""lines(gui=False) -> The words written as format_output() lines
+		"""
+		return [format_output(e, gui) for e in self.buffer[:self.count]]
+
+	def clear(self):
+		self.count = 0
+
+class StreamOutput(GPIOBackend):
+	"""StreamOutput(stream, gui=None, block_lines=4096) -> Writes the words as lines of text to a file or pipe, block_lines lines at a time
+	gui is the format of format_output(), None for the one the program is run with
+	"""
+
+	def __init__(self, stream, gui=None, block_lines=4096):
+		self.stream = stream
+		self.gui = gui
+		self.block_lines = block_lines
+		self.pending = []
+
+	def write(self, port, word, gui=False):
+		if self.gui != None:
+			gui = self.gui
+		self.pending.append(format_output(word, gui))
+		if len(self.pending) >= self.block_lines:
+			self.flush()
+
+	def flush(self):
+		if len(self.pending) > 0:
+			self.stream.write("\n".join(self.pending) + "\n")
+			self.pending = []
+		self.stream.flush()
+
+class Channels(GPIOBackend):
+	"""Channels(input=None, output=None) -> Reads through the backend input and writes through the backend output, ConsoleGPIO for the ones not given
+	"""
+
+	def __init__(self, input=None, output=None):
+		self.input = input or ConsoleGPIO()
+		self.output = output or ConsoleGPIO()
+
+	def read(self, port):
+		return self.input.read(port)
+
+	def write(self, port, word, gui=False):
+		self.output.write(port, word, gui)
+
+	def flush(self):
+		self.input.flush()
+		self.output.flush()
+
+	async def wait_input(self, port):
+		await self.input.wait_input(port)
+
+class Ports(GPIOBackend):
+	"""Ports(ports, default=None) -> Routes each port to its own backend
+	Parameters:
+
+	ports: dict of port number to backend
+	default: backend of ports not in ports, ConsoleGPIO if None
+	"""
+
+	def __init__(self, ports, default=None):
+		self.ports = dict(ports)
+		self.default = default or ConsoleGPIO()
+
+	def read(self, port):
+		return self.ports.get(port, self.default).read(port)
+
+	def write(self, port, word, gui=False):
+		self.ports.get(port, self.default).write(port, word, gui)
+
+	def flush(self):
+		for backend in self.ports.values():
+			backend.flush()
+		self.default.flush()
+
+	async def wait_input(self, port):
+		await self.ports.get(port, self.default).wait_input(port)
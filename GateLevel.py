@@ -59,28 +59,31 @@ def nl(la):
 #Logical shift up/down
 def shift(list, leng, ud=1):
 	if ud == 1:
-		tq = bm.dtb(math.floor( bm.btd(list) * 2**leng))
+		tq = bm.dtb(m.floor( bm.btd(list) * 2**leng))
 		return tq, list[mod(bw-leng,bw)]
 	
-	tq = bm.dtb(math.floor(bm.btd(list) / 2**leng))
+	tq = bm.dtb(m.floor(bm.btd(list) / 2**leng))
 	return tq, list[mod(leng-1,bw)]
 
 def la(la, lb, ci=0):
 	a = bm.btd(la)
 	b = bm.btd(lb)
 	tq = a + b + ci
-	if m.sqrt(tq**2) >= 2**bw:
-		ci = 1
-	return bm.dtb(tq), ci
+	co = 0
+	if tq >= 2**bw:
+		co = 1
+	return bm.dtb(tq), co
 
+#Subtraction as a plus not b plus one, carry out being 1 unless it borrows
 def ls(la, lb, ci=0):
 	a = bm.btd(la)
 	b = bm.btd(nl(lb))
 	ci = 1-ci
 	tq = a + b + ci
-	if m.sqrt(tq**2) >= 2**bw:
-		ci = 1
-	return bm.dtb(tq), ci
+	co = 0
+	if tq >= 2**bw:
+		co = 1
+	return bm.dtb(tq), co
 
 def mul(al, bl):
 	a = bm.btd(al)
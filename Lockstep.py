@@ -0,0 +1,459 @@
+"""Lockstep.py -> Lockstep NumPy emulation of many Schön Core Alpha Pro instances running the same ROM
+
+Every instance, or lane, has its own registers, RAM, buffer, GPIO address and GPIO input, stored together as NumPy arrays:
+registers as (registers, lanes) arrays and RAM as a (lanes, ram_words) array
+Each step the running lanes are grouped by program counter, and every group runs the translated basic block at its program counter
+for all of its lanes at once, so a block of L instructions on n lanes is L * n instance-steps for one Python level dispatch
+Lanes taking different sides of a conditional branch end up in different groups and are run separately until they meet again
+
+Requires NumPy, which the rest of the emulator doesn't
+
+Differences to Emulator.SchonCore:
+
+RAM is ram_words words per lane instead of the whole address space, addresses past it are errors
+GPIO input is one list of words per lane, whatever the port, and GPIO output is kept per lane
+An error in a block, e.g. division by zero or exhausted input in any of its lanes, ends every lane of the group with exit code -1
+
+Major classes:
+
+LockstepCore(lanes, ram_words=lockstep_ram_words) -> Many CPU instances run in lockstep with run() and step()
+LaneGroup(core, lanes) -> Lanes of a LockstepCore at the same program counter, what the translated blocks run on
+
+Major functions:
+
+translate_block(rom_data, decoded_rom, pc) -> Translates the straight-line run of ROM words starting at pc into a function running on a LaneGroup
+"""
+
+#Import libraries
+import Emulator
+import time
+import logging as lgn			#Logging for custom exceptions
+import numpy as np
+from Emulator import RegType, ProtReg, ALUConfig, RuntimeVariables
+
+bw = Emulator.bw
+wm = Emulator.wm
+
+lockstep_ram_words = 1 << 16	#Words of RAM per lane
+word_type = np.uint64			#Register words, wide enough for the carry out of 32 bit additions
+
+#Microcode source code templates for lanes, in the form of Emulator.enable_pin_code and Emulator.set_pin_code,
+#{cpu} being the LaneGroup, every register a row of lanes and var either an array of lanes or a word for every lane
+#Reads copy, so var never changes with the register it was read from
+enable_pin_code = {
+	1: ["var = {prot}[%s].copy()" % (ProtReg.PROGRAMCOUNTER.value)],		#pc
+	2: ["var = {prot}[%s].copy()" % (ProtReg.AOR.value)],					#aor
+	5: ["var = {cpu}.ram_read({prot}[%s])" % (ProtReg.RAMADDRESS.value)],	#ramd
+	6: ["var = {cpu}.rom_read({prot}[%s])" % (ProtReg.ROMADDRESS.value)],	#romd
+	7: ["var = {prot}[%s].copy()" % (ProtReg.REGINTERMEDIATE.value)],		#Register intermediate data
+	8: ["var = {cpu}.gpio_read()"],											#gpi
+	9: ["var = {reg_a}.copy()"],											#rega
+	10: ["var = {reg_b}.copy()"],											#regb
+	11: ["var = {reg_c}.copy()"],											#regc
+	12: ["var = {prot}[%s].copy()" % (ProtReg.STACKPOINTER.value)],			#stack pointer
+}
+set_pin_code = [
+	(1, ["{prot}[%s] = var" % (ProtReg.PROGRAMCOUNTER.value)]),		#pc
+	(2, ["{cpu}.regs[%s][%s] = var" % (RegType.ALU.value, ALUConfig.BREGISTER.value)]),	#abr
+	(3, [															#conditional branch, each lane on its own flags
+		"if {var_b} & 1 == 1:",
+		"	{prot}[%s] = var" % (ProtReg.PROGRAMCOUNTER.value),
+		"else:",
+		"	{prot}[{pc}] = np.where({prot}[{flags}] & 0xF & {{var_a}} == 0, var, {prot}[{pc}])".format(pc=ProtReg.PROGRAMCOUNTER.value, flags=ProtReg.FLAGS.value, prot="{prot}"),
+	]),
+	(4, ["{cpu}.alu()"]),											#aor
+	(5, ["{prot}[%s] = var" % (ProtReg.RAMADDRESS.value)]),			#rama
+	(6, ["{cpu}.ram_write({prot}[%s], var)" % (ProtReg.RAMADDRESS.value)]),	#ramd
+	(7, ["{prot}[%s] = var" % (ProtReg.ROMADDRESS.value)]),			#roma
+	(8, ["{cpu}.gpio_address = var"]),								#gpoa
+	(9, ["{cpu}.pr(var, gui)"]),									#gpod
+	(11, ["{prot}[%s] = var" % (ProtReg.REGINTERMEDIATE.value)]),	#pid
+	(12, ["{reg_a} = var"]),										#rega
+	(13, ["{reg_b} = var"]),										#regb
+	(14, ["{reg_c} = var"]),										#regc
+	(15, ["{prot}[%s] = var" % (ProtReg.CONTROLUNITINPUT.value)]),	#cui
+	(16, ["{prot}[%s] = var" % (ProtReg.STACKPOINTER.value)]),		#sp
+]
+
+def shift(num, leng, ud=1):
+	"""shift(num, leng, ud=1) -> Emulator.shift() on arrays of lanes, shift lengths past the word giving the same results
+	Returns: shifted words, carry out bits
+	"""
+	one = word_type(1)
+	if ud == 1:
+		return num << np.minimum(leng, 63) & wm, num >> (bw - leng % bw) % bw & one
+	return num >> np.minimum(leng, 63), num >> (leng + bw - 1) % bw & one
+
+def divide(a, b, sf):
+	if np.any(b == 0):
+		raise ZeroDivisionError("ALU: Division by zero.")
+	return a // b, 0
+
+#Emulator.alu_functions on arrays of lanes, function(num_a, num_b, special function) -> (result, carry out)
+alu_functions = [
+	lambda a, b, sf: (a + b, a + b >> bw),								#Addition
+	lambda a, b, sf: (a + (~b & wm) + 1, a + (~b & wm) + 1 >> bw),		#Subraction
+	lambda a, b, sf: (a * b, 0),										#Multiplication, wrapping past 64 bits keeps the low word
+	divide,																#Divivision
+	lambda a, b, sf: (a & b, 0),										#Logical and
+	lambda a, b, sf: (a | b, 0),										#Logical or
+	lambda a, b, sf: (a ^ b, 0),										#Logical exclusive or
+	lambda a, b, sf: (~a, 0),											#Logical not
+	lambda a, b, sf: (np.where(sf == 1, shift(b, a, 0)[0], shift(b, a, 1)[0]), np.where(sf == 1, shift(b, a, 0)[1], shift(b, a, 1)[1])),	#Logical shift, down where the special function is 1
+	None, None, None, None, None, None,
+	lambda a, b, sf: (b, 0),											#Compare
+]
+
+def alu_flags(num_a, num_b, co):
+	"""alu_flags(num_a, num_b, co) -> Emulator.alu_flags() on arrays of lanes
+	"""
+	flags = np.where(num_a > num_b, word_type(0b001), np.where(num_a == num_b, word_type(0b010), word_type(0b100)))
+	return flags | np.asarray(co, dtype=word_type) << word_type(3)
+
+def lane_words(value, n):
+	"""lane_words(value, n) -> value, an array of lanes or a word for every lane, as an array of n words
+	"""
+	return np.broadcast_to(np.asarray(value, dtype=word_type), (n,))
+
+class LaneGroup:
+	"""LaneGroup(core, lanes) -> Lanes of a LockstepCore at the same program counter, gathering their registers, buffer and GPIO address
+	lanes being an array of lane indices or slice(None) for all of them, in which case the core's arrays are used without copying
+	store() writes the gathered state back to the core
+	"""
+
+	def __init__(self, core, lanes):
+		self.core = core
+		self.lanes = lanes
+		if isinstance(lanes, slice):
+			self.index = core.lane_index
+			self.regs = core.regs
+		else:
+			self.index = lanes
+			self.regs = [e[:, lanes] for e in core.regs]
+		self.n = len(self.index)
+		self.buffer = core.buffer[lanes]
+		self.gpio_address = core.gpio_address[lanes]
+
+	def store(self):
+		lanes = self.lanes
+		if not isinstance(lanes, slice):
+			for i, e in enumerate(self.core.regs):
+				e[:, lanes] = self.regs[i]
+		self.core.buffer[lanes] = self.buffer
+		self.core.gpio_address[lanes] = self.gpio_address
+
+	def alu(self):
+		"""alu() -> Emulator.SchonCore.alu() for every lane, each lane on its own ALU function register
+		"""
+		prot = self.regs[RegType.PROTECTED.value]
+		ena_list = int(prot[ProtReg.ENABLELIST.value][0])
+		set_list = int(prot[ProtReg.SETLIST.value][0])
+		num_a = lane_words(self.buffer, self.n)
+
+		if ena_list & Emulator.alu_increment_mask:
+			num_b = lane_words(1, self.n)
+		else:
+			num_b = self.regs[RegType.ALU.value][ALUConfig.BREGISTER.value]
+
+		if ena_list >> ALUConfig.INCREMENT.value & 1:
+			funcs = [(0b0000, None)]
+		elif ena_list >> ALUConfig.DECREMENT.value & 1:
+			funcs = [(0b0001, None)]
+		else:
+			func = self.regs[RegType.ALU.value][ALUConfig.ALUFUNCTION.value] & 0xF
+			funcs = [(int(e), func == e) for e in np.unique(func)]
+			if len(funcs) == 1:
+				funcs = [(funcs[0][0], None)]
+
+		q = np.zeros(self.n, dtype=word_type)
+		co = np.zeros(self.n, dtype=word_type)
+		for func, mask in funcs:
+			alu_function = alu_functions[func]
+			if alu_function == None:
+				lgn.critical("ALU: Invalid function call at line %s" % (prot[ProtReg.PROGRAMCOUNTER.value][0]))
+				raise Exception("ALU: Invalid function %s." % (func))
+			if mask is None:
+				q[:], co[:] = alu_function(num_a, num_b, prot[ALUConfig.SPECIALFUNCTION.value])
+			else:
+				result, carry = alu_function(num_a[mask], num_b[mask], prot[ALUConfig.SPECIALFUNCTION.value][mask])
+				q[mask], co[mask] = result, carry
+
+		prot[ProtReg.AOR.value] = q & wm
+		if set_list >> ALUConfig.SETFLAGS.value & 1:
+			prot[ProtReg.FLAGS.value] = alu_flags(num_a, num_b, co)
+		return 1
+
+	def ram_read(self, address):
+		return self.core.ram[self.index, address].astype(word_type)
+
+	def ram_write(self, address, value):
+		self.core.ram[self.index, address] = lane_words(value, self.n)
+
+	def rom_read(self, address):
+		return self.core.rom_words[address]
+
+	def gpio_read(self):
+		"""gpio_read() -> Next GPIO input word of every lane, raises EOFError if any lane has read all of its input
+		"""
+		position = self.core.input_position[self.index]
+		if np.any(position >= self.core.input_lengths[self.index]):
+			raise EOFError("GPIO: Input exhausted.")
+		self.core.input_position[self.index] = position + 1
+		return self.core.inputs[self.index, position] & wm
+
+	def pr(self, value, gui=False):
+		self.core.output_log.append((self.index, lane_words(self.gpio_address, self.n).copy(), lane_words(value, self.n).copy()))
+
+def translate_block(rom_data, decoded_rom, pc):
+	"""translate_block(rom_data, decoded_rom, pc) -> Translates the straight-line run of ROM words starting at pc into a compiled Python function running on a LaneGroup
+	The run ends the same way as Emulator.SchonCore.translate_block(), except GPIO input is translated,
+	and an instruction with register variables addressing protected registers is translated on its own
+	Parameters:
+
+	rom_data: ROM words
+	decoded_rom: rom_data decoded by Emulator.decode()
+	pc: program counter the block starts at
+
+	Returns: function(cpu, gui) running the block on the LaneGroup cpu, amount of instructions in it, or None, 0 if the word at pc isn't supported
+	"""
+	name = "lanes_block_%s" % (pc)
+	lines = [
+		"def %s(cpu, gui):" % (name),
+		"	regs = cpu.regs",
+		"	prot = regs[%s]" % (RegType.PROTECTED.value),
+	]
+	leng = 0
+	set_list = None
+	while leng < Emulator.max_block_length and pc < len(decoded_rom):
+		inp = rom_data[pc]
+		instruction_vars = decoded_rom[pc]
+		_ofs, meta_func = instruction_vars[len(Emulator.var_lengs):]
+		if inp == wm or _ofs == None:
+			break
+		registers = [instruction_vars[e.value] for e in (RuntimeVariables.REGISTERA, RuntimeVariables.REGISTERB, RuntimeVariables.REGISTERC)]
+		protected = RegType.PROTECTED.value in [e & 0b11 for e in registers]
+		if protected and leng > 0:
+			break
+		fields = {
+			"cpu": "cpu",
+			"prot": "prot",
+			"reg_a": "regs[%s][%s]" % (registers[0] & 0b11, registers[0] >> 2),
+			"reg_b": "regs[%s][%s]" % (registers[1] & 0b11, registers[1] >> 2),
+			"reg_c": "regs[%s][%s]" % (registers[2] & 0b11, registers[2] >> 2),
+			"var_a": str(instruction_vars[RuntimeVariables.VARIABLEA.value]),
+			"var_b": str(instruction_vars[RuntimeVariables.VARIABLEB.value]),
+		}
+
+		#Fetch
+		lines += [
+			"	#%s: %s" % (pc, Emulator.FunctionDefinitionMetaInfo[meta_func]),
+			"	prot[%s] = %s" % (ProtReg.ROMADDRESS.value, pc),
+			"	prot[%s] = %s" % (ProtReg.PROGRAMCOUNTER.value, pc + 1 & wm),
+			"	prot[%s] = %s" % (ProtReg.CONTROLUNITINPUT.value, inp),
+		]
+		if instruction_vars[RuntimeVariables.LOGICALALU.value] == 1:
+			lines.append("	regs[%s][%s] = %s" % (RegType.ALU.value, ALUConfig.ALUFUNCTION.value, instruction_vars[RuntimeVariables.FUNCTIONVARIABLE.value]))
+
+		#Micro-ops, the buffer and pins are stored where alu() reads them, at the end of the block and on every row
+		#of an instruction addressing protected registers, which may write the pins themselves
+		for i, set_list in enumerate(Emulator.FunctionDefinitions[0][_ofs]):
+			ena_list = Emulator.FunctionDefinitions[1][_ofs][i]
+			read_lines, write_lines = Emulator.micro_op_source(set_list, ena_list, fields, enable_pin_code, set_pin_code)
+			lines.append("	var = bz")
+			lines += ["	" + line for line in read_lines]
+			if set_list[4] or protected:	#aor
+				lines += [
+					"	cpu.buffer = var",
+					"	prot[%s] = %s" % (ProtReg.SETLIST.value, Emulator.bm.btd(set_list, len(set_list))),
+					"	prot[%s] = %s" % (ProtReg.ENABLELIST.value, Emulator.bm.btd(ena_list, len(ena_list))),
+				]
+			lines += ["	" + line for line in write_lines]
+		leng += 1
+		if protected or Emulator.ends_block(_ofs):
+			break
+		pc += Emulator.words_used(_ofs)
+
+	if leng == 0:
+		return None, 0
+	lines += [
+		"	cpu.buffer = var",
+		"	prot[%s] = %s" % (ProtReg.SETLIST.value, Emulator.bm.btd(set_list, len(set_list))),
+		"	prot[%s] = %s" % (ProtReg.ENABLELIST.value, Emulator.bm.btd(ena_list, len(ena_list))),
+	]
+	namespace = dict()
+	exec(compile("\n".join(lines) + "\n", "<%s>" % (name), "exec"), {"np": np, "bz": Emulator.bz, "wm": wm, "trace_log": Emulator.trace_log}, namespace)
+	return namespace[name], leng
+
+class LockstepCore:
+	"""LockstepCore(lanes, ram_words=lockstep_ram_words) -> lanes Schön Core Alpha Pro instances running the same ROM in lockstep
+	The state of every lane is public, e.g. ram[lane, address] may be preset before run()
+	Parameters:
+
+	lanes: amount of CPU instances
+	ram_words: words of RAM per lane
+	"""
+
+	def __init__(self, lanes, ram_words=lockstep_ram_words):
+		self.lanes = lanes
+		self.ram_words = ram_words
+		self.lane_index = np.arange(lanes)
+
+		self.rom_data = []
+		self.decoded_rom = []
+		self.rom_words = np.zeros(0, dtype=word_type)
+		self.block_cache = dict()	#Translated blocks as (function, amount of instructions), keyed by start program counter
+		self.dispatches = 0			#Blocks run on a group of lanes since the program was loaded
+
+		self.set_inputs([[]] * lanes)
+		self.cls()
+
+	def cls(self):
+		"""cls() -> Clears the registers, RAM, buffer, GPIO address, output and exit codes of every lane and rewinds their GPIO input
+		"""
+		self.regs = [
+			np.zeros((32, self.lanes), dtype=word_type),	#General Purpose Registers
+			np.zeros((32, self.lanes), dtype=word_type),	#Arithmetic/Logic Unit Registers
+			np.zeros((32, self.lanes), dtype=word_type),	#Stack Pointers
+			np.zeros((10, self.lanes), dtype=word_type),	#Special Purpose Internal CU Register
+		]
+		self.ram = np.zeros((self.lanes, self.ram_words), dtype=np.uint32)
+		self.buffer = np.zeros(self.lanes, dtype=word_type)
+		self.gpio_address = np.zeros(self.lanes, dtype=word_type)
+		self.input_position = np.zeros(self.lanes, dtype=np.int64)
+		self.output_log = []		#(lanes, ports, words) written by each GPIO output of a group
+		self.exit_codes = np.zeros(self.lanes, dtype=np.int8)	#0 for running, 1 for exited and -1 for error
+		self.errors = dict()		#Error message by lane
+		self.instruction_count = np.zeros(self.lanes, dtype=np.int64)
+		self.dispatches = 0
+
+	def set_inputs(self, input_vectors):
+		"""set_inputs(input_vectors) -> Sets the GPIO input words of every lane, one list per lane, read in order from the start
+		"""
+		input_vectors = [list(e) for e in input_vectors]
+		if len(input_vectors) != self.lanes:
+			lgn.critical("Lockstep: Error: %s input vectors for %s lanes." % (len(input_vectors), self.lanes))
+			raise ValueError("Lockstep: Expected %s input vectors." % (self.lanes))
+		self.input_lengths = np.array([len(e) for e in input_vectors], dtype=np.int64)
+		self.inputs = np.zeros((self.lanes, max(1, int(self.input_lengths.max(initial=0)))), dtype=word_type)
+		for lane, inputs in enumerate(input_vectors):
+			self.inputs[lane, :len(inputs)] = [int(e) & wm for e in inputs]
+		self.input_position = np.zeros(self.lanes, dtype=np.int64)
+
+	def load_rom_words(self, words):
+		"""load_rom_words(words) -> Uses words, an array or memoryview of integer words, as the ROM of every lane and decodes them
+		"""
+		self.rom_data = words
+		self.decoded_rom = [Emulator.decode(inp) for inp in words]
+		self.rom_words = np.array(words, dtype=word_type)
+		self.block_cache = dict()
+		self.instruction_count[:] = 0
+		return 1
+
+	def run(self, filename, input_vectors=None, gui=False, max_instructions=None):
+		"""run(filename, input_vectors=None, gui=False, max_instructions=None) -> Runs the executable program filename on every lane, see run_file()
+		"""
+		return self.run_file(Emulator.executable_path(filename), input_vectors, gui, max_instructions)
+
+	def run_file(self, file_path, input_vectors=None, gui=False, max_instructions=None, max_wall_time=None):
+		"""run_file(file_path, input_vectors=None, gui=False, max_instructions=None, max_wall_time=None) -> Runs the .schonexe1 or .schonbin file at file_path on every lane from a clear state
+		Parameters:
+
+		file_path: full path of the program
+		input_vectors: GPIO input words of every lane, one list per lane, none if None
+		gui: output format, same as in Emulator.run()
+		max_instructions: if given a lane stops once it has run this many instructions, at the end of the block reaching it
+		max_wall_time: if given every lane stops once this many seconds have passed, at the end of a step
+
+		Returns: exit codes of the lanes, 1 for exit signal, -1 for error and 0 for stopped by max_instructions or max_wall_time
+		"""
+		self.cls()
+		self.load_rom_words(Emulator.read_program(file_path))
+		if input_vectors != None:
+			self.set_inputs(input_vectors)
+		return self.resume(gui, max_instructions, max_wall_time)
+
+	def resume(self, gui=False, max_instructions=None, max_wall_time=None):
+		"""resume(gui=False, max_instructions=None, max_wall_time=None) -> Runs every lane from its current state until all of them have exited or failed,
+		or have run max_instructions instructions in total if given, those lanes keeping exit code 0,
+		or until max_wall_time seconds have passed if given, the lanes still running keeping exit code 0
+		Returns: exit codes of the lanes
+		"""
+		run_start = time.perf_counter()
+		while self.step(gui, max_instructions):
+			if max_wall_time != None and time.perf_counter() - run_start >= max_wall_time:
+				break
+		return self.exit_codes
+
+	def step(self, gui=False, max_instructions=None):
+		"""step(gui=False, max_instructions=None) -> Runs one block on every running lane, each group of lanes at the same program counter at once,
+		lanes having run max_instructions instructions if given not counting as running
+		Returns: amount of lanes still running before the step, 0 once every lane has exited or failed
+		"""
+		if max_instructions == None:
+			running = np.flatnonzero(self.exit_codes == 0)
+		else:
+			running = np.flatnonzero((self.exit_codes == 0) & (self.instruction_count < max_instructions))
+		if len(running) == 0:
+			return 0
+		pcs = self.regs[RegType.PROTECTED.value][ProtReg.PROGRAMCOUNTER.value][running]
+		if pcs.min() == pcs.max():
+			groups = [(int(pcs[0]), slice(None) if len(running) == self.lanes else running)]
+		else:
+			order = np.argsort(pcs, kind="stable")
+			pcs = pcs[order]
+			starts = np.flatnonzero(np.diff(pcs)) + 1
+			groups = [(int(pcs[e[0]]), running[order[e[0]:e[-1] + 1]]) for e in np.split(np.arange(len(pcs)), starts)]
+		for pc, lanes in groups:
+			self.run_group(pc, lanes, gui)
+		return len(running)
+
+	def run_group(self, pc, lanes, gui=False):
+		"""run_group(pc, lanes, gui=False) -> Runs the block at program counter pc on lanes, an array of lane indices or slice(None)
+		"""
+		if pc >= len(self.decoded_rom):
+			self.fail(lanes, "ROM: Error: Invalid program counter: %s" % (pc))
+			return
+		if self.rom_data[pc] == wm:
+			self.instruction_count[lanes] += 1
+			self.exit_codes[lanes] = 1
+			return
+		block = self.block_cache.get(pc)
+		if block == None:
+			block = translate_block(self.rom_data, self.decoded_rom, pc)
+			self.block_cache[pc] = block
+		if block[0] == None:
+			self.instruction_count[lanes] += 1
+			self.fail(lanes, "Offset: Error: Program Counter: %s: Invalid function number." % (pc))
+			return
+
+		group = LaneGroup(self, lanes)
+		try:
+			block[0](group, gui)
+		except Exception as e:
+			self.fail(lanes, "%s: %s" % (type(e).__name__, e))
+			return
+		group.store()
+		self.instruction_count[lanes] += block[1]
+		self.dispatches += 1
+
+	def fail(self, lanes, message):
+		lgn.debug("Lockstep: %s" % (message))
+		self.exit_codes[lanes] = -1
+		for lane in self.lane_index[lanes]:
+			self.errors[int(lane)] = message
+
+	def outputs(self):
+		"""outputs() -> GPIO output words of every lane, one list per lane in the order they were written
+		"""
+		if len(self.output_log) == 0:
+			return [[] for _ in range(self.lanes)]
+		lanes = np.concatenate([e[0] for e in self.output_log])
+		words = np.concatenate([e[2] for e in self.output_log])
+		order = np.argsort(lanes, kind="stable")
+		counts = np.bincount(lanes, minlength=self.lanes)
+		return [e.tolist() for e in np.split(words[order], np.cumsum(counts)[:-1])]
+
+	def output_lines(self, gui=False):
+		"""output_lines(gui=False) -> GPIO output of every lane as GPIO.format_output() lines
+		"""
+		return [[Emulator.GPIO.format_output(e, gui) for e in words] for words in self.outputs()]